@@ -0,0 +1,314 @@
+"""
+Read-replica session routing
+
+`get_read_db` is a drop-in replacement for `get_db` in read-only endpoints.
+It hands out sessions on a streaming replica when one is configured and
+healthy, and falls back to the primary (the regular `get_db` session) when
+the replica is unreachable, has lost its upstream connection, or lags more
+than DB_REPLICA_MAX_LAG_SECONDS behind. Replication lag is measured at most
+once per DB_REPLICA_LAG_CHECK_INTERVAL seconds per worker.
+
+A replica that has replayed everything it received reports zero lag, which
+is also what a replica cut off from the primary reports. The health check
+therefore also requires a running WAL receiver (and, when the database role
+can see it, i.e. has pg_monitor or pg_read_all_stats, a `streaming` status
+and a message from the primary within DB_REPLICA_MAX_SILENCE_SECONDS).
+
+Requests sent with ``X-Read-Consistency: primary`` always read from the
+primary. Clients send it when refetching after a realtime event (see
+services/realtime_hub.py), which may describe a write the replica has not
+replayed yet.
+
+If a replica query fails with an OperationalError after the health check
+passed, or no replica connection frees up within DB_REPLICA_POOL_TIMEOUT
+(a pool TimeoutError), the session marks the replica unhealthy and re-runs
+the statement on the primary, so the request still succeeds.
+
+Configuration (environment):
+
+    DATABASE_REPLICA_URL            replica connection URL; unset disables routing
+    DB_REPLICA_POOL_SIZE            pooled connections per worker (default 5)
+    DB_REPLICA_MAX_OVERFLOW         extra connections under load (default 10)
+    DB_REPLICA_POOL_TIMEOUT         seconds to wait for a connection (default 10)
+    DB_REPLICA_MAX_LAG_SECONDS      fallback threshold (default 5)
+    DB_REPLICA_LAG_CHECK_INTERVAL   seconds between lag checks (default 2)
+    DB_REPLICA_MAX_SILENCE_SECONDS  max time since the primary was last heard from
+                                    (default 60; the primary sends keepalives when idle)
+
+The replica pool records how long requests wait for a connection;
+`pool_metrics()` reports those figures along with the checkout state of
+both pools.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Generator, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from .database import engine as primary_engine, get_db
+
+logger = logging.getLogger(__name__)
+
+# Request header that pins a read to the primary (read-your-writes)
+READ_CONSISTENCY_HEADER = "X-Read-Consistency"
+
+# Lag is zero when the replica has replayed everything it received, so an idle
+# primary does not look like replication lag. That is only meaningful while
+# the WAL receiver is connected: receiver_pid is NULL when it is not running.
+# Status and last message time are NULL for roles without pg_read_all_stats.
+REPLICATION_LAG_SQL = text("""
+    SELECT
+        CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END AS lag,
+        receiver.pid AS receiver_pid,
+        receiver.status AS receiver_status,
+        EXTRACT(EPOCH FROM now() - receiver.last_msg_receipt_time) AS receiver_silence
+    FROM (SELECT 1) AS one
+    LEFT JOIN pg_stat_wal_receiver AS receiver ON true
+""")
+
+
+class PoolWaitMetrics:
+    """Running totals of time spent waiting for pooled connections"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def observe(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "timeouts": self.timeouts
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    metrics: Optional[PoolWaitMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.observe(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class ReplicaSession(Session):
+    """
+    Replica session that re-runs a statement on the primary when the replica
+    connection fails or the replica pool is exhausted. Query objects execute
+    through Session.execute, so ORM queries are covered too. Once it has
+    fallen back, the session stays on the primary.
+    """
+
+    _on_primary = False
+
+    def _with_fallback(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except (OperationalError, PoolTimeoutError) as e:
+            if self._on_primary:
+                raise
+            replica_router.mark_unhealthy(e)
+            self.rollback()
+            self.bind = primary_engine
+            self._on_primary = True
+            return method(*args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        return self._with_fallback(super().execute, *args, **kwargs)
+
+    def scalar(self, *args, **kwargs):
+        return self._with_fallback(super().scalar, *args, **kwargs)
+
+    def scalars(self, *args, **kwargs):
+        return self._with_fallback(super().scalars, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """Decides per request whether reads go to the replica or the primary"""
+
+    def __init__(
+        self,
+        replica_url: Optional[str],
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 10.0,
+        max_lag: float = 5.0,
+        lag_check_interval: float = 2.0,
+        max_silence: float = 60.0
+    ):
+        self.max_lag = max_lag
+        self.max_silence = max_silence
+        self.lag_check_interval = lag_check_interval
+        self.replica_metrics = PoolWaitMetrics()
+        self.replica_engine = None
+        self.ReplicaSession = None
+        if replica_url:
+            self.replica_engine = create_engine(
+                replica_url,
+                poolclass=TimedQueuePool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_pre_ping=True
+            )
+            self.replica_engine.pool.metrics = self.replica_metrics
+            self.ReplicaSession = sessionmaker(
+                bind=self.replica_engine, class_=ReplicaSession, autocommit=False, autoflush=False
+            )
+
+        self._check_lock = threading.Lock()
+        self._checked_at = 0.0
+        self._healthy = False
+        self.last_lag: Optional[float] = None
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self.query_fallbacks = 0
+
+    @classmethod
+    def from_env(cls) -> "ReplicaRouter":
+        return cls(
+            os.getenv("DATABASE_REPLICA_URL"),
+            pool_size=int(os.getenv("DB_REPLICA_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_REPLICA_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_REPLICA_POOL_TIMEOUT", "10")),
+            max_lag=float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5")),
+            lag_check_interval=float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "2")),
+            max_silence=float(os.getenv("DB_REPLICA_MAX_SILENCE_SECONDS", "60"))
+        )
+
+    def replica_usable(self) -> bool:
+        """True if the replica answered its last lag check within the threshold"""
+        if self.replica_engine is None:
+            return False
+        if time.monotonic() - self._checked_at >= self.lag_check_interval:
+            # One request per worker refreshes the lag; the rest use the last result
+            if self._check_lock.acquire(blocking=False):
+                try:
+                    self._check_lag()
+                finally:
+                    self._check_lock.release()
+        return self._healthy
+
+    def _check_lag(self) -> None:
+        try:
+            with self.replica_engine.connect() as connection:
+                row = connection.execute(REPLICATION_LAG_SQL).one()
+            lag = float(row.lag or 0.0)
+            if row.receiver_pid is None:
+                healthy, reason = False, "WAL receiver not running"
+            elif row.receiver_status is not None and row.receiver_status != "streaming":
+                healthy, reason = False, f"WAL receiver {row.receiver_status}"
+            elif row.receiver_silence is not None and float(row.receiver_silence) > self.max_silence:
+                healthy, reason = False, f"no message from primary for {float(row.receiver_silence):.0f}s"
+            else:
+                healthy, reason = lag <= self.max_lag, f"lag {lag:.2f}s"
+            if healthy != self._healthy:
+                logger.info(f"Read replica {'enabled' if healthy else 'disabled'} ({reason})")
+            self.last_lag = lag
+            self._healthy = healthy
+        except Exception as e:
+            if self._healthy:
+                logger.warning(f"Read replica unavailable, falling back to primary: {str(e)}")
+            self.last_lag = None
+            self._healthy = False
+        self._checked_at = time.monotonic()
+
+    def mark_unhealthy(self, error: Exception) -> None:
+        """Route reads to the primary until the next lag check"""
+        if self._healthy:
+            logger.warning(f"Read replica query failed, falling back to primary: {str(error)}")
+        self._healthy = False
+        self._checked_at = time.monotonic()
+        self.query_fallbacks += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "replica_configured": self.replica_engine is not None,
+            "replica_healthy": self._healthy,
+            "replication_lag_s": self.last_lag,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+            "query_fallbacks": self.query_fallbacks
+        }
+        if self.replica_engine is not None:
+            pool = self.replica_engine.pool
+            result["replica_pool"] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                **self.replica_metrics.snapshot()
+            }
+        result["primary_pool"] = {"status": primary_engine.pool.status()}
+        return result
+
+
+replica_router = ReplicaRouter.from_env()
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """
+    Session dependency for read-only endpoints: a replica session when the
+    replica is healthy and the request does not ask for primary reads,
+    otherwise the primary session from `get_db`.
+    """
+    wants_primary = request.headers.get(READ_CONSISTENCY_HEADER, "").lower() == "primary"
+    if not wants_primary and replica_router.replica_usable():
+        replica_router.replica_reads += 1
+        db = replica_router.ReplicaSession()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+
+    if replica_router.replica_engine is not None and not wants_primary:
+        replica_router.primary_fallbacks += 1
+    primary = get_db()
+    db = next(primary)
+    try:
+        yield db
+    finally:
+        primary.close()
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Replica routing state and connection pool wait-time metrics for this worker"""
+    return replica_router.metrics()
@@ -5,14 +5,14 @@ Dental Practice Management and Diagnostic AI Platform
 """
 
 import os
+import json
 import logging
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from fastapi.responses import JSONResponse
 from datetime import datetime
@@ -25,6 +25,8 @@ from .middleware.request_id_middleware import RequestIDMiddleware
 from .middleware.audit_log import setup_audit_logging
 from .middleware.logging_middleware import LoggingMiddleware
 from .middleware.auth_middleware import AuthMiddleware
+from .middleware.access_anomaly import AccessAnomalyMiddleware
+from .middleware.coverage_sampling import CoverageSampler, CoverageSamplingMiddleware, sampled_coverage_report
 
 # Import all routers
 from .routers.perio import router as perio_router
@@ -33,6 +35,7 @@ from .routers.diagnostics import router as diagnostics_router
 from .routers.treatments import router as treatments_router
 from .routers.admin import router as admin_router
 from .routers.patient_intake import router as patient_intake_router
+from .routers.profiling import router as profiling_router
 from .routes.notifications import router as notifications_router
 from .routes.patient_notifications import router as patient_notifications_router
 from .routes.patient_recalls import router as patient_recalls_router
@@ -48,16 +51,23 @@ from .routers import (
 )
 # Do not import the websocket router - causes import errors
 # from .routers import websocket  # This line is causing import errors, keep it commented out
+# Live patient updates are served by routers/realtime.py instead
+from .routers.realtime import router as realtime_router
 
 # Import services
 from .services.inference_service import inference_service
 from .services.notification_scheduler_service import notification_scheduler_service
-from .services.seed_educational_content import seed_educational_content
+from .services.worker_leader import WorkerLeader
+from .services.access_anomaly import access_anomaly_detector
+from .services.realtime_hub import realtime_hub
 
 # Import contract sync, generator, and coverage reporting
 from .utils.contract_sync import setup_contract_sync
 from .utils.ts_contract_generator import setup_contract_generator
 from .utils.contract_coverage import setup_coverage_reporting
+from .utils.static_files import PrecompressedStaticFiles
+from .utils.response_cache import CachedBody
+from .utils.profiling import PROFILE_HEADER, profiler, route_label, start_query_stats, stop_query_stats
 
 # Set up logging and ensure directories exist
 setup_logging()
@@ -87,9 +97,10 @@ app = FastAPI(
     title="DentaMind API",
     description="API for DentaMind dental practice management system",
     version="1.0.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json",
+    # The schema and docs are served by the cached routes defined below
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None,
     debug=settings.DEBUG,
     lifespan=lifespan
 )
@@ -109,10 +120,20 @@ app.add_middleware(RequestIDMiddleware)
 # Set up audit logging middleware
 setup_audit_logging(app)
 
+# Stream audited requests into the bulk record access detector
+app.add_middleware(AccessAnomalyMiddleware, detector=access_anomaly_detector)
+
 # Add custom middleware
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(AuthMiddleware)
 
+# Outside development, contract coverage is collected from a sample of requests
+DEV_CONTRACT_TOOLS = os.getenv("DENTAMIND_ENV", "development").lower() == "development"
+coverage_sampler: Optional[CoverageSampler] = None
+if not DEV_CONTRACT_TOOLS:
+    coverage_sampler = CoverageSampler(rate=float(os.getenv("DENTAMIND_COVERAGE_SAMPLE_RATE", "0.01")))
+    app.add_middleware(CoverageSamplingMiddleware, sampler=coverage_sampler)
+
 # Request timing middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
@@ -122,14 +143,31 @@ async def add_process_time_header(request: Request, call_next):
     # Log request details
     logger.info(f"Request: {request.method} {request.url.path} from {request.client.host}")
     
-    response = await call_next(request)
+    # Count and time SQL statements; requests with the profiling header are
+    # also stack-sampled
+    query_stats, query_stats_token = start_query_stats()
+    profiled = profiler.header_enabled and PROFILE_HEADER in request.headers
+    if profiled:
+        profiler.request_started()
+    try:
+        response = await call_next(request)
+    finally:
+        if profiled:
+            profiler.request_finished()
+        stop_query_stats(query_stats_token)
     
     # Calculate processing time
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
+    response.headers["X-DB-Query-Count"] = str(query_stats.count)
+    response.headers["X-DB-Query-Time"] = f"{query_stats.total_time:.6f}"
+    
+    route = request.scope.get("route")
+    if route is not None:
+        profiler.record_queries(route_label(route), query_stats)
     
     # Log response status
-    logger.info(f"Response: {response.status_code} in {process_time:.4f}s")
+    logger.info(f"Response: {response.status_code} in {process_time:.4f}s ({query_stats.count} queries)")
     
     return response
 
@@ -142,6 +180,8 @@ ROUTERS = [
     {"router": treatments_router, "tags": ["treatments"]},
     {"router": admin_router, "tags": ["admin"]},
     {"router": patient_intake_router, "tags": ["patient-intake"]},
+    {"router": profiling_router, "tags": ["profiling"]},
+    {"router": realtime_router, "tags": ["realtime"]},
     {"router": notifications_router, "tags": ["notifications"]},
     {"router": patient_notifications_router, "tags": ["patient-notifications"]},
     {"router": patient_recalls_router, "tags": ["patient-recalls"]},
@@ -182,6 +222,20 @@ if settings.ENV.lower() == "development":
     except Exception as e:
         logger.error(f"Error loading generated routers: {str(e)}")
 
+# Only one worker runs the notification scheduler; the others stand by and
+# take over if the leader goes away
+scheduler_leader = WorkerLeader(
+    "notification-scheduler",
+    on_elected=notification_scheduler_service.start,
+    on_demoted=notification_scheduler_service.stop
+)
+
+def scheduler_status() -> str:
+    """Report the scheduler state of this worker for health checks"""
+    if notification_scheduler_service.is_running:
+        return "online"
+    return "offline" if scheduler_leader.is_leader else "standby"
+
 # Startup event to preload models
 @app.on_event("startup")
 async def startup_event():
@@ -195,24 +249,37 @@ async def startup_event():
         logger.error(f"Error initializing inference service: {str(e)}")
         logger.warning("Using mock inference in fallback mode")
     
-    # Start notification scheduler
-    logger.info("Starting notification scheduler service...")
+    # Contend for notification scheduler leadership
+    logger.info("Starting notification scheduler leader election...")
+    try:
+        await scheduler_leader.start()
+        logger.info("Notification scheduler leader election started")
+    except Exception as e:
+        logger.error(f"Error starting notification scheduler leader election: {str(e)}")
+    
+    if coverage_sampler is not None:
+        await coverage_sampler.start()
+    
+    # Start fan-out of realtime patient events
     try:
-        await notification_scheduler_service.start()
-        logger.info("Notification scheduler service started successfully")
+        await realtime_hub.start()
+        logger.info(f"Realtime hub started ({type(realtime_hub.backend).__name__})")
     except Exception as e:
-        logger.error(f"Error starting notification scheduler: {str(e)}")
+        logger.error(f"Error starting realtime hub: {str(e)}")
+    
+    # Educational content is seeded once per deployment, not on worker boot:
+    #   python -m backend.api.services.content_seeding
     
-    # Seed educational content
-    logger.info("Checking and seeding educational content...")
+    # Let the profiler attribute samples to routes by their endpoint functions
+    profiler.register_routes(app.routes)
+    
+    # Build the OpenAPI schema now rather than on the first request
+    logger.info("Building OpenAPI schema...")
     try:
-        seeded = await seed_educational_content()
-        if seeded:
-            logger.info("Educational content seeded successfully")
-        else:
-            logger.info("Educational content already exists or seeding failed")
+        get_openapi_body()
+        logger.info("OpenAPI schema built")
     except Exception as e:
-        logger.error(f"Error seeding educational content: {str(e)}")
+        logger.error(f"Error building OpenAPI schema: {str(e)}")
     
     logger.info("Application startup complete")
 
@@ -222,13 +289,21 @@ async def shutdown_event():
     """Clean up resources on shutdown"""
     logger.info("Application shutting down...")
     
-    # Stop notification scheduler
+    # Stop notification scheduler (if this worker leads) and leave the election
     try:
-        await notification_scheduler_service.stop()
+        await scheduler_leader.stop()
         logger.info("Notification scheduler stopped")
     except Exception as e:
         logger.error(f"Error stopping notification scheduler: {str(e)}")
 
+    if coverage_sampler is not None:
+        await coverage_sampler.stop()
+
+    try:
+        await realtime_hub.stop()
+    except Exception as e:
+        logger.error(f"Error stopping realtime hub: {str(e)}")
+
     logger.info("Application shutdown complete")
 
 # Base endpoints
@@ -260,7 +335,7 @@ async def health() -> Dict[str, Any]:
             "database": "online", 
             "storage": "online",
             "inference": "online" if not inference_service.use_mock else "mock",
-            "notification_scheduler": "online" if notification_scheduler_service.is_running else "offline"
+            "notification_scheduler": scheduler_status()
         },
         "model": {
             "type": inference_service.model_type,
@@ -282,7 +357,7 @@ async def api_health() -> Dict[str, Any]:
             "database": "online", 
             "storage": "online",
             "inference": "online" if not inference_service.use_mock else "mock",
-            "notification_scheduler": "online" if notification_scheduler_service.is_running else "offline"
+            "notification_scheduler": scheduler_status()
         },
         "version": "1.0.0",
         "environment": settings.ENV
@@ -302,6 +377,14 @@ setup_contract_generator(app)
 # Setup contract coverage reporting
 setup_coverage_reporting(app)
 
+if coverage_sampler is not None:
+    @app.get("/api/_dev/coverage/report")
+    async def sampled_coverage() -> Dict[str, Any]:
+        """Contract coverage estimated from sampled production traffic"""
+        report = sampled_coverage_report(app, coverage_sampler.output_dir, max_age=3 * coverage_sampler.flush_interval)
+        report["sample_rate"] = coverage_sampler.rate
+        return report
+
 # Custom OpenAPI schema endpoint to include contract validation info
 def custom_openapi():
     if app.openapi_schema:
@@ -316,7 +399,8 @@ def custom_openapi():
     
     # Add info about contract validation
     openapi_schema["info"]["x-contract-validation"] = {
-        "enabled": os.getenv("DENTAMIND_ENV", "development").lower() == "development",
+        "enabled": DEV_CONTRACT_TOOLS,
+        "sample_rate": coverage_sampler.rate if coverage_sampler is not None else 1.0,
         "tools": [
             {
                 "name": "Contract Violation Reporting",
@@ -351,8 +435,34 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+OPENAPI_URL = "/api/openapi.json"
+
+# Serialized, precompressed schema; built once at startup
+openapi_body: Optional[CachedBody] = None
+
+def get_openapi_body() -> CachedBody:
+    """Return the OpenAPI schema as a cached body with gzip/brotli encodings and an ETag"""
+    global openapi_body
+    if openapi_body is None:
+        openapi_body = CachedBody.build(json.dumps(app.openapi(), separators=(",", ":")).encode())
+    return openapi_body
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi_json(request: Request):
+    """Serve the prebuilt OpenAPI schema"""
+    return get_openapi_body().response(request, cache_control="public, no-cache")
+
+@app.get("/api/docs", include_in_schema=False)
+async def swagger_ui_html():
+    return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=f"{app.title} - Swagger UI")
+
+@app.get("/api/redoc", include_in_schema=False)
+async def redoc_html():
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{app.title} - ReDoc")
+
+# Mount static files, serving .br/.gz siblings written by
+# `python -m backend.api.utils.precompress_static static/` at build time
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,193 @@
+"""
+Sampled contract coverage for production
+
+The development contract coverage hooks inspect every request, which is too
+expensive for production traffic. This module records route coverage from a
+random sample of requests instead:
+
+- CoverageSamplingMiddleware is a plain ASGI middleware. For unsampled
+  requests it costs one `random()` call; sampled requests add one dict
+  increment once the response has started. Counters are only touched from
+  the event loop thread, so no locks are needed.
+- A background task periodically folds the sampled counts, scaled by the
+  sampling rate, into a per-worker JSON file under `logs/coverage/`.
+- `sampled_coverage_report()` merges the files of live workers and compares
+  the observed routes with the routes the app defines. Each file holds its
+  worker's totals since that worker started; files not rewritten within
+  a few flush intervals belong to workers that are gone (restarts, earlier
+  deploys) and are deleted rather than summed with live ones.
+
+Sampled requests carry ``scope["coverage.sampled"] = True`` so contract
+validation can run on the same sample and report through
+`CoverageSampler.record_violation()`.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CounterKey = Tuple[str, str, int]
+
+
+class CoverageSampler:
+    """Holds sampled per-route counters and aggregates them periodically"""
+
+    def __init__(self, rate: float = 0.01, output_dir: str = "logs/coverage", flush_interval: float = 60.0):
+        if not 0 < rate <= 1:
+            raise ValueError("Sampling rate must be in (0, 1]")
+        self.rate = rate
+        self.output_dir = output_dir
+        self.flush_interval = flush_interval
+        self.counters: Dict[CounterKey, int] = {}
+        self.violations: Dict[Tuple[str, str, str], int] = {}
+        self.totals: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._path = os.path.join(output_dir, f"worker-{os.getpid()}.json")
+
+    def record(self, method: str, path: str, status_code: int) -> None:
+        key = (method, path, status_code)
+        self.counters[key] = self.counters.get(key, 0) + 1
+
+    def record_violation(self, method: str, path: str, kind: str) -> None:
+        key = (method, path, kind)
+        self.violations[key] = self.violations.get(key, 0) + 1
+
+    def fold(self) -> Dict[str, Dict[str, Any]]:
+        """Fold the sampled counters into the estimated totals; returns a copy to persist"""
+        counters, self.counters = self.counters, {}
+        violations, self.violations = self.violations, {}
+        scale = 1 / self.rate
+        for (method, path, status_code), count in counters.items():
+            route = self._route_totals(method, path)
+            route["estimated_requests"] += count * scale
+            route["status_codes"][str(status_code)] = route["status_codes"].get(str(status_code), 0.0) + count * scale
+        for (method, path, kind), count in violations.items():
+            route = self._route_totals(method, path)
+            route["violations"][kind] = route["violations"].get(kind, 0.0) + count * scale
+        return {
+            key: {
+                "estimated_requests": route["estimated_requests"],
+                "status_codes": dict(route["status_codes"]),
+                "violations": dict(route["violations"])
+            }
+            for key, route in self.totals.items()
+        }
+
+    def _route_totals(self, method: str, path: str) -> Dict[str, Any]:
+        return self.totals.setdefault(
+            f"{method} {path}", {"estimated_requests": 0.0, "status_codes": {}, "violations": {}}
+        )
+
+    def write(self, totals: Dict[str, Dict[str, Any]]) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"updated_at": time.time(), "rate": self.rate, "routes": totals}, f)
+        os.replace(tmp_path, self._path)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # Fold on the event loop (where counters live), write from a thread
+                totals = self.fold()
+                await asyncio.to_thread(self.write, totals)
+            except Exception as e:
+                logger.error(f"Error aggregating sampled coverage: {str(e)}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop, then write a final flush"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            totals = self.fold()
+            await asyncio.to_thread(self.write, totals)
+        except Exception as e:
+            logger.error(f"Error writing sampled coverage: {str(e)}")
+
+
+class CoverageSamplingMiddleware:
+    """ASGI middleware that records route coverage for a random sample of requests"""
+
+    def __init__(self, app, sampler: CoverageSampler):
+        self.app = app
+        self.sampler = sampler
+        self.rate = sampler.rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.rate:
+            await self.app(scope, receive, send)
+            return
+
+        scope["coverage.sampled"] = True
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # The router stores the matched route in the scope
+                route = scope.get("route")
+                path = getattr(route, "path", None) or "<unmatched>"
+                self.sampler.record(scope["method"], path, message["status"])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def sampled_coverage_report(app, output_dir: str = "logs/coverage", max_age: float = 180.0) -> Dict[str, Any]:
+    """
+    Merge live workers' sampled counts and compare them with the app's
+    routes. Worker files not updated within `max_age` seconds (a few flush
+    intervals) are from workers that no longer run and are removed.
+    """
+    observed: Dict[str, Dict[str, Any]] = {}
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(output_dir, "worker-*.json")):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data.get("updated_at", 0) < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        for route_key, route in data.get("routes", {}).items():
+            merged = observed.setdefault(route_key, {"estimated_requests": 0.0, "status_codes": {}, "violations": {}})
+            merged["estimated_requests"] += route["estimated_requests"]
+            for status_code, count in route["status_codes"].items():
+                merged["status_codes"][status_code] = merged["status_codes"].get(status_code, 0.0) + count
+            for kind, count in route.get("violations", {}).items():
+                merged["violations"][kind] = merged["violations"].get(kind, 0.0) + count
+
+    defined = set()
+    for route in app.routes:
+        for method in getattr(route, "methods", None) or []:
+            if method != "HEAD":
+                defined.add(f"{method} {route.path}")
+
+    covered = defined & set(observed)
+    return {
+        "mode": "sampled",
+        "total_routes": len(defined),
+        "covered_routes": len(covered),
+        "coverage_percent": round(100.0 * len(covered) / len(defined), 2) if defined else 0.0,
+        "uncovered": sorted(defined - covered),
+        "routes": {key: observed[key] for key in sorted(observed)}
+    }
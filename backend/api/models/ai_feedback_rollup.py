@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, DateTime, Integer, Float
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+class AISuggestionFeedbackRollup(Base):
+    """
+    Running totals of provider feedback on AI intake suggestions.
+    
+    One row per model version, suggestion key (the top-level key of
+    PatientIntakeAISuggestion.suggestions, e.g. "conditions") and confidence
+    bin (tenths of the suggestion's confidence score, 0-9). Rows are updated
+    in the same transaction as the feedback itself.
+    """
+    __tablename__ = "ai_suggestion_feedback_rollups"
+    
+    ai_model_version = Column(String, primary_key=True)
+    suggestion_key = Column(String, primary_key=True)
+    confidence_bin = Column(Integer, primary_key=True)
+    
+    presented_count = Column(Integer, default=0, nullable=False)  # Suggestions that received feedback
+    accepted_count = Column(Integer, default=0, nullable=False)   # ...and were applied
+    confidence_sum = Column(Float, default=0.0, nullable=False)   # For mean confidence per bin
+    
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return (f"<AISuggestionFeedbackRollup(ai_model_version={self.ai_model_version}, "
+                f"suggestion_key={self.suggestion_key}, confidence_bin={self.confidence_bin})>")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Integer, Text, Float, ARRAY
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Integer, Text, Float, ARRAY, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -16,6 +16,17 @@ class PatientIntakeForm(Base):
     queryability of important fields.
     """
     __tablename__ = "patient_intake_forms"
+    __table_args__ = (
+        # JSONB containment search (see services/intake_search.py). Expression
+        # indexes on hot keys are created in migration a3c7e1f09d42.
+        Index("ix_patient_intake_forms_medical_history_gin", "medical_history",
+              postgresql_using="gin", postgresql_ops={"medical_history": "jsonb_path_ops"}),
+        Index("ix_patient_intake_forms_dental_history_gin", "dental_history",
+              postgresql_using="gin", postgresql_ops={"dental_history": "jsonb_path_ops"}),
+        Index("ix_patient_intake_forms_insurance_info_gin", "insurance_info",
+              postgresql_using="gin", postgresql_ops={"insurance_info": "jsonb_path_ops"}),
+        Index("ix_patient_intake_forms_created_at_id", "created_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = Column(String, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -89,6 +100,10 @@ class PatientIntakeVersioning(Base):
     form data at that point, along with metadata about what changed and why.
     """
     __tablename__ = "patient_intake_versioning"
+    __table_args__ = (
+        # Keyset pagination of a form's history by version number
+        Index("ix_patient_intake_versioning_form_version", "intake_form_id", "version_num"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     intake_form_id = Column(String, ForeignKey("patient_intake_forms.id", ondelete="CASCADE"), nullable=False, index=True)
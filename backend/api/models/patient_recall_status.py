@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, DateTime, Date, Integer
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+class PatientRecallStatus(Base):
+    """
+    Recall state per patient and recall type, as of the last nightly run.
+    
+    Written in bulk by services/recall_engine.upsert_recalls; only rows whose
+    overdue bucket changed need to be rewritten.
+    """
+    __tablename__ = "patient_recall_status"
+    
+    patient_id = Column(String, primary_key=True)
+    recall_type = Column(String, primary_key=True)
+    
+    due_date = Column(Date, nullable=True)  # NULL when the patient was never seen
+    days_overdue = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, index=True)  # never_seen, not_due, due_soon, overdue_*
+    
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<PatientRecallStatus(patient_id={self.patient_id}, recall_type={self.recall_type}, status={self.status})>"
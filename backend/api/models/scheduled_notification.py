@@ -0,0 +1,43 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+class ScheduledNotification(Base):
+    """
+    A notification (e.g. an appointment reminder) waiting to be sent.
+    
+    Rows move from 'pending' to 'claimed' when a dispatcher takes them
+    (SELECT ... FOR UPDATE SKIP LOCKED), then to 'sent', back to 'pending'
+    with a later due_at for a retry, or to 'failed' after the last attempt.
+    See services/notification_queue.py.
+    """
+    __tablename__ = "scheduled_notifications"
+    __table_args__ = (
+        # Due-time queue: only pending rows are indexed, so sent history does not slow claiming
+        Index("ix_scheduled_notifications_due", "due_at", postgresql_where=text("status = 'pending'")),
+        # Expired claims of dispatchers that died mid-batch
+        Index("ix_scheduled_notifications_claimed", "claimed_at", postgresql_where=text("status = 'claimed'")),
+    )
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # Scheduling the same reminder twice is a no-op
+    dedupe_key = Column(String, unique=True, nullable=True)
+    patient_id = Column(String, nullable=True, index=True)
+    channel = Column(String, nullable=False)  # email, sms, push
+    template = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=True)
+    
+    due_at = Column(DateTime, nullable=False)
+    status = Column(String, default="pending", server_default="pending", nullable=False)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    claimed_at = Column(DateTime, nullable=True)
+    claimed_by = Column(String, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<ScheduledNotification(id={self.id}, channel={self.channel}, due_at={self.due_at}, status={self.status})>"
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+class SeedManifest(Base):
+    """
+    Records which version of a seed data set has been applied to the database.
+    
+    Seeding runs only when the content hash of a data set differs from the
+    one recorded here.
+    """
+    __tablename__ = "seed_manifests"
+    
+    name = Column(String, primary_key=True)
+    version = Column(String, nullable=False)
+    content_hash = Column(String, nullable=False)
+    applied_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<SeedManifest(name={self.name}, version={self.version}, content_hash={self.content_hash})>"
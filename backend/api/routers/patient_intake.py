@@ -1,13 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Path, Query
-from sqlalchemy.orm import Session
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import uuid
 import logging
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard encoder
+    orjson = None
+
 # Use absolute imports to avoid module not found errors
 from backend.api.database import get_db
+from backend.api.db_routing import get_read_db
 from backend.api.services.patient_intake_service import PatientIntakeService
+from backend.api.services.intake_search import IntakeSearchRequest, search_intake_forms
+from backend.api.services.intake_merge_patch import (
+    JSONB_SECTIONS,
+    NON_NULLABLE_SECTIONS,
+    apply_merge_patch,
+    changed_paths,
+    insert_version_snapshot
+)
+from backend.api.services.realtime_hub import realtime_hub
+from backend.api.services.ai_feedback_rollups import feedback_summary, record_feedback
 from backend.api.schemas.patient_intake import (
     PatientIntakeCreate,
     PatientCreate,
@@ -35,6 +54,48 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# Version history returned with an intake form is capped and keyset-paginated
+DEFAULT_VERSION_HISTORY_LIMIT = 20
+MAX_VERSION_HISTORY_LIMIT = 100
+
+def fast_json_response(content: Any, status_code: int = status.HTTP_200_OK) -> JSONResponse:
+    """
+    Serialize a response body directly, bypassing jsonable_encoder and
+    response_model validation.
+
+    Intended for routes that return large JSONB blobs which were already
+    validated on the way in. Uses orjson when available.
+    """
+    if orjson is not None:
+        return ORJSONResponse(content=content, status_code=status_code)
+    return JSONResponse(content=jsonable_encoder(content), status_code=status_code)
+
+def publish_intake_change(db: Session, patient_id: str, intake_id: str, version: int, changed_fields: List[str]) -> None:
+    """
+    Push a committed intake change to subscribed screens, plus an alert
+    change when the medical history (which alerts derive from) changed.
+    """
+    realtime_hub.publish_patient_event(
+        patient_id, "intake.version", db,
+        intake_id=intake_id, version=version, changed_fields=changed_fields
+    )
+    if any(field.split(".", 1)[0] == "medical_history" for field in changed_fields):
+        realtime_hub.publish_patient_event(patient_id, "alerts.changed", db, source="intake")
+
+def ensure_patient_exists(db: Session, patient_id: str) -> None:
+    """
+    Raise 404 unless the patient exists. This is the only check made
+    before an authenticated user reads a patient's intake data, over HTTP or
+    through a realtime subscription; there is no per-patient authorization
+    (any authenticated user may read any patient).
+    """
+    patient = db.query(Patient.id).filter(Patient.id == patient_id).first()
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Patient with ID {patient_id} not found"
+        )
+
 @router.post("/register", response_model=PatientResponse, status_code=status.HTTP_201_CREATED)
 async def register_new_patient(
     intake_data: PatientIntakeCreate,
@@ -47,14 +108,13 @@ async def register_new_patient(
     try:
         service = PatientIntakeService(db)
         
-        # Process patient data into the expected format for the service
-        patient_data = intake_data.patient.dict()
-        if intake_data.medical_history:
-            patient_data["medical_history"] = intake_data.medical_history.dict()
-        if intake_data.allergies:
-            patient_data["allergies"] = [allergy.dict() for allergy in intake_data.allergies]
-        if intake_data.medications:
-            patient_data["medications"] = [med.dict() for med in intake_data.medications]
+        # Convert the whole request model once and reshape it into the
+        # format expected by the service
+        intake_dict = intake_data.dict()
+        patient_data = intake_dict["patient"]
+        for section in ("medical_history", "allergies", "medications"):
+            if intake_dict.get(section):
+                patient_data[section] = intake_dict[section]
             
         patient = await service.process_new_patient(patient_data)
         return patient
@@ -72,7 +132,7 @@ async def register_new_patient(
 @router.get("/patient/{patient_id}", response_model=PatientResponse)
 async def get_patient(
     patient_id: str = Path(..., description="ID of the patient to retrieve"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
@@ -177,6 +237,7 @@ async def update_medical_history(
             medical_update_data
         )
         
+        realtime_hub.publish_patient_event(patient_id, "alerts.changed", db, source="medical_history")
         return updated_history
     except ValueError as e:
         raise HTTPException(
@@ -211,6 +272,7 @@ async def add_patient_allergies(
             allergies_data
         )
         
+        realtime_hub.publish_patient_event(patient_id, "alerts.changed", db, source="allergies")
         return added_allergies
     except ValueError as e:
         raise HTTPException(
@@ -245,6 +307,7 @@ async def add_patient_medications(
             medications_data
         )
         
+        realtime_hub.publish_patient_event(patient_id, "alerts.changed", db, source="medications")
         return added_medications
     except ValueError as e:
         raise HTTPException(
@@ -296,6 +359,41 @@ async def check_medication_allergies(
             detail=f"An error occurred: {str(e)}"
         )
 
+@router.post("/search", response_model=Dict[str, Any])
+async def search_patient_intake(
+    search_request: IntakeSearchRequest,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Search intake forms by their medical history, dental history and
+    insurance information.
+    
+    Filters compile to indexed JSONB containment and path queries, e.g. all
+    forms reporting diabetes and an anticoagulant medication. Results are
+    newest first; pass the returned `next_cursor` to fetch the next page.
+    """
+    try:
+        return fast_json_response(search_intake_forms(db, search_request))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/ai-feedback/summary", response_model=Dict[str, Any])
+async def get_ai_feedback_summary(
+    model_version: Optional[List[str]] = Query(None, description="Limit to these AI model versions"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Acceptance rate and confidence calibration of AI suggestions per model
+    version and suggestion key, read from the incrementally maintained
+    feedback rollups.
+    """
+    return fast_json_response(feedback_summary(db, model_version))
+
 @router.post("/{patient_id}", status_code=status.HTTP_201_CREATED, response_model=Dict[str, Any])
 async def create_patient_intake(
     patient_id: str = Path(..., description="The ID of the patient"),
@@ -350,6 +448,11 @@ async def create_patient_intake(
     db.add(version)
     db.commit()
     
+    publish_intake_change(
+        db, patient_id, form_id, 1,
+        [field for field in JSONB_SECTIONS if intake_data.get(field) is not None]
+    )
+    
     return {
         "status": "success",
         "message": "Patient intake form created successfully",
@@ -359,21 +462,20 @@ async def create_patient_intake(
 @router.get("/{patient_id}", response_model=Dict[str, Any])
 async def get_patient_intake(
     patient_id: str = Path(..., description="The ID of the patient"),
-    db: Session = Depends(get_db),
+    before_version: Optional[int] = Query(None, ge=1, description="Only include history entries older than this version"),
+    history_limit: int = Query(DEFAULT_VERSION_HISTORY_LIMIT, ge=1, le=MAX_VERSION_HISTORY_LIMIT,
+                               description="Maximum number of history entries to return"),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """
     Retrieve the latest patient intake form for a patient.
     
-    Returns the most recent intake form with all its data.
+    Returns the most recent intake form with all its data and a page of its
+    version history, newest first. Pass `version_history_next` as
+    `before_version` to fetch older entries.
     """
-    # Verify patient exists
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Patient with ID {patient_id} not found"
-        )
+    ensure_patient_exists(db, patient_id)
     
     # Get the latest intake form
     intake_form = db.query(PatientIntakeForm)\
@@ -387,12 +489,25 @@ async def get_patient_intake(
             detail=f"No intake form found for patient with ID {patient_id}"
         )
     
-    # Get form versions for history
-    versions = db.query(PatientIntakeVersioning)\
-        .filter(PatientIntakeVersioning.intake_form_id == intake_form.id)\
+    # Get one page of version metadata; form_data snapshots are never loaded here
+    versions_query = db.query(PatientIntakeVersioning)\
+        .options(load_only(
+            PatientIntakeVersioning.version_num,
+            PatientIntakeVersioning.created_at,
+            PatientIntakeVersioning.changed_by,
+            PatientIntakeVersioning.comment
+        ))\
+        .filter(PatientIntakeVersioning.intake_form_id == intake_form.id)
+    if before_version is not None:
+        versions_query = versions_query.filter(PatientIntakeVersioning.version_num < before_version)
+    versions = versions_query\
         .order_by(PatientIntakeVersioning.version_num.desc())\
+        .limit(history_limit + 1)\
         .all()
     
+    has_more_versions = len(versions) > history_limit
+    versions = versions[:history_limit]
+    
     version_history = [{
         "version": v.version_num,
         "created_at": v.created_at,
@@ -420,10 +535,60 @@ async def get_patient_intake(
         "created_at": intake_form.created_at,
         "updated_at": intake_form.updated_at,
         "version_history": version_history,
+        "version_history_next": versions[-1].version_num if has_more_versions else None,
         "has_ai_suggestions": ai_suggestions is not None
     }
     
-    return result
+    return fast_json_response(result)
+
+@router.get("/{patient_id}/versions/{version_num}", response_model=Dict[str, Any])
+async def get_patient_intake_version(
+    patient_id: str = Path(..., description="The ID of the patient"),
+    version_num: int = Path(..., ge=1, description="The version number to retrieve"),
+    intake_id: Optional[str] = Query(None, description="Optional specific intake form ID"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Retrieve the stored form data for a single version of a patient's intake form.
+    
+    Defaults to the latest intake form for the patient.
+    """
+    ensure_patient_exists(db, patient_id)
+    
+    intake_query = db.query(PatientIntakeForm.id).filter(PatientIntakeForm.patient_id == patient_id)
+    if intake_id:
+        intake_query = intake_query.filter(PatientIntakeForm.id == intake_id)
+    intake_form = intake_query.order_by(PatientIntakeForm.created_at.desc()).first()
+    
+    if not intake_form:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No intake form found for patient with ID {patient_id}"
+        )
+    
+    version = db.query(PatientIntakeVersioning)\
+        .filter(
+            PatientIntakeVersioning.intake_form_id == intake_form.id,
+            PatientIntakeVersioning.version_num == version_num
+        )\
+        .first()
+    
+    if not version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Version {version_num} not found for intake form with ID {intake_form.id}"
+        )
+    
+    return fast_json_response({
+        "intake_form_id": version.intake_form_id,
+        "version": version.version_num,
+        "form_data": version.form_data,
+        "changed_fields": version.changed_fields,
+        "created_at": version.created_at,
+        "changed_by": version.changed_by,
+        "comment": version.comment
+    })
 
 @router.put("/{patient_id}", response_model=Dict[str, Any])
 async def update_patient_intake(
@@ -478,12 +643,11 @@ async def update_patient_intake(
     intake_form.updated_by = current_user.id
     
     # Get latest version number
-    latest_version = db.query(PatientIntakeVersioning)\
+    latest_version_num = db.query(func.max(PatientIntakeVersioning.version_num))\
         .filter(PatientIntakeVersioning.intake_form_id == intake_form.id)\
-        .order_by(PatientIntakeVersioning.version_num.desc())\
-        .first()
+        .scalar()
     
-    new_version_num = (latest_version.version_num + 1) if latest_version else 1
+    new_version_num = (latest_version_num or 0) + 1
     
     # Create new version record
     version = PatientIntakeVersioning(
@@ -499,6 +663,8 @@ async def update_patient_intake(
     db.add(version)
     db.commit()
     
+    publish_intake_change(db, patient_id, intake_form.id, new_version_num, list(changed_fields))
+    
     return {
         "status": "success",
         "message": "Patient intake form updated successfully",
@@ -506,6 +672,119 @@ async def update_patient_intake(
         "version": new_version_num
     }
 
+@router.patch("/{patient_id}", response_model=Dict[str, Any])
+async def patch_patient_intake(
+    patient_id: str = Path(..., description="The ID of the patient"),
+    patch: Dict[str, Any] = Body(..., description="RFC 7396 JSON Merge Patch against the intake form"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Partially update the latest patient intake form with a JSON Merge Patch.
+    
+    Only the keys present in the patch are changed; `null` removes a key. The
+    patch is applied in the database, and the new version records a snapshot
+    of the patched form along with the exact paths it changed. Patches that
+    change nothing do not create a version.
+    """
+    # Validate the patch before touching the database
+    unknown = sorted(set(patch) - set(JSONB_SECTIONS) - {"consent", "is_completed", "version_comment"})
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown intake form fields: {', '.join(unknown)}"
+        )
+    for field in NON_NULLABLE_SECTIONS:
+        if field in patch and patch[field] is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"'{field}' cannot be removed"
+            )
+    for field in ["consent", "is_completed"]:
+        if field in patch and not isinstance(patch[field], bool):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"'{field}' must be a boolean"
+            )
+    
+    # Verify patient exists
+    patient = db.query(Patient.id).filter(Patient.id == patient_id).first()
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Patient with ID {patient_id} not found"
+        )
+    
+    # Get the latest intake form without loading its JSONB sections
+    intake_form = db.query(PatientIntakeForm.id, PatientIntakeForm.completion_date)\
+        .filter(PatientIntakeForm.patient_id == patient_id)\
+        .order_by(PatientIntakeForm.created_at.desc())\
+        .first()
+    
+    if not intake_form:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No intake form found for patient with ID {patient_id}"
+        )
+    
+    version_comment = patch.get("version_comment") or "Patched intake form"
+    section_patches = {field: patch[field] for field in JSONB_SECTIONS if field in patch}
+    values = {field: patch[field] for field in ["consent", "is_completed"] if field in patch}
+    
+    # Work out what actually changes before writing anything; flags that
+    # repeat their stored value are not changes
+    changed = changed_paths(db, intake_form.id, section_patches, values)
+    values = {field: value for field, value in values.items() if field in changed}
+    if values.get("is_completed") and not intake_form.completion_date:
+        values["completion_date"] = datetime.now()
+    
+    if not changed:
+        db.rollback()
+        return {
+            "status": "success",
+            "message": "No changes to apply",
+            "intake_id": intake_form.id,
+            "changed_fields": []
+        }
+    
+    values["updated_at"] = datetime.now()
+    values["updated_by"] = current_user.id
+    
+    try:
+        apply_merge_patch(db, intake_form.id, section_patches, values)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    latest_version_num = db.query(func.max(PatientIntakeVersioning.version_num))\
+        .filter(PatientIntakeVersioning.intake_form_id == intake_form.id)\
+        .scalar()
+    new_version_num = (latest_version_num or 0) + 1
+    
+    # Snapshot the patched form straight from the updated row
+    insert_version_snapshot(db, intake_form.id, {
+        "id": str(uuid.uuid4()),
+        "intake_form_id": intake_form.id,
+        "version_num": new_version_num,
+        "changed_fields": {path: True for path in changed},
+        "changed_by": current_user.id,
+        "comment": version_comment
+    })
+    db.commit()
+    
+    publish_intake_change(db, patient_id, intake_form.id, new_version_num, changed)
+    
+    return {
+        "status": "success",
+        "message": "Patient intake form updated successfully",
+        "intake_id": intake_form.id,
+        "version": new_version_num,
+        "changed_fields": changed
+    }
+
 @router.post("/{patient_id}/ai-suggest", response_model=AISuggestionResponse)
 async def generate_ai_suggestions(
     patient_id: str = Path(..., description="The ID of the patient"),
@@ -610,7 +889,7 @@ async def generate_ai_suggestions(
 async def get_ai_suggestions(
     patient_id: str = Path(..., description="The ID of the patient"),
     intake_id: Optional[str] = Query(None, description="Optional specific intake form ID"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -659,7 +938,7 @@ async def get_ai_suggestions(
             detail=f"No AI suggestions found for intake form with ID {intake_form.id}"
         )
     
-    return {
+    return fast_json_response({
         "id": ai_suggestion.id,
         "intake_form_id": ai_suggestion.intake_form_id,
         "patient_id": ai_suggestion.patient_id,
@@ -671,7 +950,7 @@ async def get_ai_suggestions(
         "fields_considered": ai_suggestion.fields_considered,
         "feedback": ai_suggestion.feedback,
         "applied_suggestions": ai_suggestion.applied_suggestions
-    }
+    })
 
 @router.post("/{patient_id}/ai-suggest/{suggestion_id}/feedback", response_model=Dict[str, Any])
 async def provide_ai_suggestion_feedback(
@@ -695,9 +974,10 @@ async def provide_ai_suggestion_feedback(
             detail=f"Patient with ID {patient_id} not found"
         )
     
-    # Get the AI suggestion
+    # Get the AI suggestion, locked so the feedback rollups see a consistent before/after
     ai_suggestion = db.query(PatientIntakeAISuggestion)\
         .filter(PatientIntakeAISuggestion.id == suggestion_id, PatientIntakeAISuggestion.patient_id == patient_id)\
+        .with_for_update()\
         .first()
     
     if not ai_suggestion:
@@ -706,9 +986,13 @@ async def provide_ai_suggestion_feedback(
             detail=f"AI suggestion with ID {suggestion_id} not found for patient {patient_id}"
         )
     
-    # Update the suggestion with feedback
-    ai_suggestion.feedback = feedback_data.get("feedback", {})
-    ai_suggestion.applied_suggestions = feedback_data.get("applied_suggestions", {})
+    # Update the suggestion with feedback and the per-model rollups
+    record_feedback(
+        db,
+        ai_suggestion,
+        feedback_data.get("feedback", {}),
+        feedback_data.get("applied_suggestions", {})
+    )
     
     db.commit()
     
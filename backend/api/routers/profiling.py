@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional, Dict, Any
+import logging
+
+from backend.api.auth.dependencies import get_current_user
+from backend.api.db_routing import pool_metrics
+from backend.api.utils.profiling import PROFILE_HEADER, profiler
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/_dev/profile",
+    tags=["Profiling"],
+    dependencies=[Depends(get_current_user)]
+)
+
+MAX_PROFILE_WINDOW_SECONDS = 300
+
+@router.get("", response_model=Dict[str, Any])
+async def get_profile_summary():
+    """
+    Per-route sample counts and SQL statistics (queries per request, query
+    time and statements repeated within a request).
+    """
+    summary = profiler.summary()
+    summary["header"] = PROFILE_HEADER
+    return summary
+
+@router.post("/start", response_model=Dict[str, Any])
+async def start_profile_window(
+    seconds: float = Query(30, gt=0, le=MAX_PROFILE_WINDOW_SECONDS, description="How long to sample for"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Sample all requests for a time window. To profile individual requests
+    instead, enable header mode and send the `X-Profile: 1` header.
+    """
+    profiler.start_window(seconds)
+    logger.info(f"Profiling window of {seconds}s started by {getattr(current_user, 'id', None)}")
+    return {"status": "started", "seconds": seconds}
+
+@router.post("/header", response_model=Dict[str, Any])
+async def set_header_mode(
+    enabled: bool = Query(..., description="Whether requests carrying the profiling header are sampled")
+):
+    """Switch header-triggered profiling on or off"""
+    profiler.header_enabled = enabled
+    return {"header": PROFILE_HEADER, "enabled": enabled}
+
+@router.post("/stop", response_model=Dict[str, Any])
+async def stop_profile_window():
+    """End the current sampling window early"""
+    profiler.stop_window()
+    return {"status": "stopped"}
+
+@router.delete("", response_model=Dict[str, Any])
+async def reset_profile():
+    """Discard collected samples and query statistics"""
+    profiler.reset()
+    return {"status": "reset"}
+
+@router.get("/collapsed", response_class=PlainTextResponse)
+async def get_collapsed_profile(
+    route: Optional[str] = Query(None, description='Only this route, e.g. "GET /api/patient-intake/{patient_id}"')
+):
+    """Collapsed stacks for flamegraph.pl, inferno or speedscope"""
+    return PlainTextResponse(profiler.collapsed(route))
+
+@router.get("/speedscope", response_model=Dict[str, Any])
+async def get_speedscope_profile(
+    route: Optional[str] = Query(None, description='Only this route, e.g. "GET /api/patient-intake/{patient_id}"')
+):
+    """Profile in speedscope's file format, one profile per route"""
+    return profiler.speedscope(route)
+
+@router.get("/db-pools", response_model=Dict[str, Any])
+async def get_db_pool_metrics():
+    """Read-replica routing state and connection pool wait times for this worker"""
+    return pool_metrics()
@@ -0,0 +1,177 @@
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query, status
+from starlette.concurrency import run_in_threadpool
+from typing import Any, List, Optional
+import asyncio
+import inspect
+import json
+import logging
+
+from backend.api.database import get_db
+from backend.api.auth.dependencies import get_current_user
+from backend.api.routers.patient_intake import ensure_patient_exists
+from backend.api.services.realtime_hub import Subscriber, patient_topic, realtime_hub
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    tags=["Realtime"]
+)
+
+HEARTBEAT_SECONDS = 30
+AUTH_TIMEOUT_SECONDS = 10
+MAX_TOPICS_PER_CONNECTION = 50
+
+def bearer_token(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    """Token from the `token` query parameter or an `Authorization: Bearer` header"""
+    if token:
+        return token
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    return credentials if scheme.lower() == "bearer" and credentials else None
+
+def _authenticate_sync(token: str) -> Optional[Any]:
+    db_generator = get_db()
+    db = next(db_generator)
+    try:
+        return get_current_user(token=token, db=db)
+    except HTTPException:
+        return None
+    finally:
+        db_generator.close()
+
+async def authenticate(token: str) -> Optional[Any]:
+    """
+    Validate a bearer token exactly as the HTTP routes' get_current_user
+    does. Blocking database work runs in the threadpool, as FastAPI does for
+    sync dependencies, so the event loop never waits on it.
+    """
+    if not inspect.iscoroutinefunction(get_current_user):
+        return await run_in_threadpool(_authenticate_sync, token)
+
+    # An async get_current_user runs on the loop, like an async dependency
+    db_generator = get_db()
+    db = await run_in_threadpool(next, db_generator)
+    try:
+        return await get_current_user(token=token, db=db)
+    except HTTPException:
+        return None
+    finally:
+        await run_in_threadpool(db_generator.close)
+
+def can_subscribe(user: Any, patient_id: str) -> bool:
+    """
+    Same check as GET /api/patient-intake/{patient_id}: any authenticated
+    user may follow an existing patient. Blocking; call it from the threadpool.
+    """
+    db_generator = get_db()
+    db = next(db_generator)
+    try:
+        ensure_patient_exists(db, patient_id)
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db_generator.close()
+
+@router.websocket("/api/ws/patients")
+async def patient_updates(
+    websocket: WebSocket,
+    patient_id: Optional[List[str]] = Query(None, description="Patients to subscribe to on connect"),
+    token: Optional[str] = Query(None, description="Bearer token (browsers cannot set headers on websockets)")
+):
+    """
+    Push intake and alert changes for subscribed patients.
+
+    Authenticate with the same bearer token as the HTTP API, passed as
+    `?token=...`, an `Authorization: Bearer` header, or a first message
+    `{"action": "auth", "token": "..."}` sent within 10 seconds. The
+    connection is closed with 1008 if the token is missing or invalid, and
+    only existing patients can be subscribed to (the same rule as the HTTP
+    routes).
+
+    Subscribe with `?patient_id=...` (repeatable) or by sending
+    `{"action": "subscribe", "patient_id": "..."}`; unsubscribe with
+    `{"action": "unsubscribe", "patient_id": "..."}`. Events look like
+    `{"topic": "patient:<id>", "type": "intake.version", "patient_id": ..., "version": 4}`
+    or `{"type": "alerts.changed", ...}`; refetch the affected resource when
+    one arrives, sending `X-Read-Consistency: primary` so the refetch is not
+    served by a read replica that has not replayed the change yet. A
+    `{"type": "ping"}` heartbeat is sent when idle.
+    """
+    await websocket.accept()
+
+    credentials = bearer_token(websocket, token)
+    if credentials is None:
+        try:
+            command = json.loads(await asyncio.wait_for(websocket.receive_text(), AUTH_TIMEOUT_SECONDS))
+            if isinstance(command, dict) and command.get("action") == "auth":
+                credentials = command.get("token") or None
+        except WebSocketDisconnect:
+            return
+        except (asyncio.TimeoutError, ValueError):
+            pass
+    user = await authenticate(credentials) if credentials else None
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    subscriber = Subscriber()
+
+    async def subscribe(requested_id: str) -> Optional[str]:
+        """Subscribe to a patient's topic; returns an error message on refusal"""
+        if len(subscriber.topics) >= MAX_TOPICS_PER_CONNECTION:
+            return "Too many subscriptions"
+        if not await run_in_threadpool(can_subscribe, user, requested_id):
+            return "Patient not found"
+        realtime_hub.subscribe(subscriber, patient_topic(requested_id))
+        return None
+
+    for requested_id in patient_id or []:
+        error = await subscribe(requested_id)
+        if error:
+            await websocket.send_text(json.dumps({"type": "error", "patient_id": requested_id, "detail": error}))
+
+    async def send_events():
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                message = '{"type":"ping"}'
+            if message is None:
+                # Dropped for falling behind, or the server is shutting down
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+            await websocket.send_text(message)
+
+    async def receive_commands():
+        while True:
+            try:
+                command = json.loads(await websocket.receive_text())
+                action = command.get("action")
+                requested_id = str(command.get("patient_id") or "")
+            except (ValueError, AttributeError):
+                await websocket.send_text('{"type":"error","detail":"Invalid command"}')
+                continue
+            if not requested_id or action not in ("subscribe", "unsubscribe"):
+                await websocket.send_text('{"type":"error","detail":"Unknown action or missing patient_id"}')
+            elif action == "subscribe":
+                error = await subscribe(requested_id)
+                if error:
+                    await websocket.send_text(json.dumps({"type": "error", "patient_id": requested_id, "detail": error}))
+                else:
+                    await websocket.send_text(json.dumps({"type": "subscribed", "patient_id": requested_id}))
+            else:
+                realtime_hub.unsubscribe(subscriber, patient_topic(requested_id))
+                await websocket.send_text(json.dumps({"type": "unsubscribed", "patient_id": requested_id}))
+
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(receive_commands())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning(f"Realtime connection closed with error: {str(error)}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        realtime_hub.unsubscribe(subscriber)
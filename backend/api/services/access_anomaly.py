@@ -0,0 +1,250 @@
+"""
+Streaming detection of bulk patient record access
+
+Every audited request is fed to AccessAnomalyDetector.record() with the
+acting user, client IP and (if any) the patient whose record was touched.
+For each user and each IP the detector keeps a sliding window made of
+fixed-size time buckets; each bucket holds a request count and a small
+HyperLogLog sketch of the distinct patients accessed.
+
+Per event the work is constant: one hash of the patient ID, one register
+update per subject and an incrementally maintained HLL harmonic sum, so the
+distinct-patient estimate is available without merging sketches. When a
+bucket expires the window registers are marked stale and rebuilt from the
+remaining buckets the next time an estimate is needed; since estimates are
+only needed once a subject's request count reaches the alert threshold,
+ordinary users never pay for the rebuild.
+
+Memory is bounded: each subject costs at most `buckets + 1` register arrays
+of 2**precision bytes, and only `max_subjects` subjects are tracked (least
+recently active subjects are evicted).
+
+Alerts are raised as soon as a subject crosses a threshold and are repeated
+for the same subject and rule at most once per cooldown.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Subject = Tuple[str, str]
+
+# 2 ** -rank for every possible register value
+INVERSE_POWERS = [2.0 ** -rank for rank in range(66)]
+
+
+def hash_identifier(value: str) -> int:
+    """64-bit hash used for the distinct-count sketches"""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+class SlidingHyperLogLog:
+    """HyperLogLog distinct counter and request counter over a sliding window of time buckets"""
+
+    def __init__(self, precision: int = 8, buckets: int = 10, bucket_seconds: float = 60.0):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self.buckets = buckets
+        self.bucket_seconds = bucket_seconds
+        # Registers are allocated only for buckets that saw a patient access
+        self._registers: List[Optional[bytearray]] = [None] * buckets
+        self._counts = [0] * buckets
+        self._window = bytearray(self.m)
+        self._harmonic_sum = float(self.m)
+        self._zero_registers = self.m
+        self._stale = False
+        self._current = None
+        self.requests = 0
+        self.alpha = 0.7213 / (1 + 1.079 / self.m) if self.m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[self.m]
+
+    def _advance(self, now: float) -> None:
+        index = int(now // self.bucket_seconds)
+        if self._current is None:
+            self._current = index
+            return
+        steps = index - self._current
+        if steps <= 0:
+            return
+        expired = False
+        for step in range(1, min(steps, self.buckets) + 1):
+            slot = (self._current + step) % self.buckets
+            self.requests -= self._counts[slot]
+            self._counts[slot] = 0
+            if self._registers[slot] is not None:
+                self._registers[slot] = None
+                expired = True
+        self._current = index
+        if expired:
+            self._stale = True
+
+    def _rebuild_window(self) -> None:
+        live = [registers for registers in self._registers if registers is not None]
+        if not live:
+            self._window = bytearray(self.m)
+            self._harmonic_sum = float(self.m)
+            self._zero_registers = self.m
+            self._stale = False
+            return
+        self._window = bytearray(map(max, *live)) if len(live) > 1 else bytearray(live[0])
+        self._harmonic_sum = sum(map(INVERSE_POWERS.__getitem__, self._window))
+        self._zero_registers = self._window.count(0)
+        self._stale = False
+
+    def add(self, item_hash: Optional[int], now: float) -> None:
+        """Count a request, and the item it touched if `item_hash` is given"""
+        self._advance(now)
+        slot = self._current % self.buckets
+        self._counts[slot] += 1
+        self.requests += 1
+        if item_hash is None:
+            return
+
+        j = item_hash & (self.m - 1)
+        remaining = item_hash >> self.precision
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+
+        registers = self._registers[slot]
+        if registers is None:
+            registers = self._registers[slot] = bytearray(self.m)
+        if rank > registers[j]:
+            registers[j] = rank
+            if self._stale:
+                return
+            previous = self._window[j]
+            if rank > previous:
+                self._window[j] = rank
+                self._harmonic_sum += INVERSE_POWERS[rank] - INVERSE_POWERS[previous]
+                if previous == 0:
+                    self._zero_registers -= 1
+
+    def distinct(self) -> float:
+        if self._stale:
+            self._rebuild_window()
+        estimate = self.alpha * self.m * self.m / self._harmonic_sum
+        if estimate <= 2.5 * self.m and self._zero_registers:
+            return self.m * math.log(self.m / self._zero_registers)
+        return estimate
+
+
+class AccessAnomalyDetector:
+    """Per-user and per-IP sliding-window detection of bulk record access"""
+
+    def __init__(
+        self,
+        window_seconds: float = 600.0,
+        buckets: int = 10,
+        precision: int = 8,
+        max_subjects: int = 10000,
+        distinct_patient_threshold: int = 100,
+        request_threshold: int = 3000,
+        cooldown: float = 900.0,
+        on_alert: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.bucket_seconds = window_seconds / buckets
+        self.precision = precision
+        self.max_subjects = max_subjects
+        self.distinct_patient_threshold = distinct_patient_threshold
+        self.request_threshold = request_threshold
+        self.cooldown = cooldown
+        self.on_alert = on_alert or self._log_alert
+        self._subjects: "OrderedDict[Subject, SlidingHyperLogLog]" = OrderedDict()
+        self._last_alert: Dict[Tuple[Subject, str], float] = {}
+        self._lock = threading.Lock()
+        self.alerts: Deque[Dict[str, Any]] = deque(maxlen=500)
+
+    @staticmethod
+    def _log_alert(alert: Dict[str, Any]) -> None:
+        logger.warning(
+            f"Security alert {alert['type']}: {alert['subject_type']} {alert['subject']} accessed "
+            f"~{alert['distinct_patients']:.0f} patients in {alert['requests']} requests "
+            f"within {alert['window_seconds']:.0f}s"
+        )
+
+    def record(
+        self,
+        user_id: Optional[str],
+        client_ip: Optional[str],
+        patient_id: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> None:
+        """Feed one audited request to the detector"""
+        now = time.time() if now is None else now
+        item_hash = hash_identifier(patient_id) if patient_id else None
+        raised = []
+        with self._lock:
+            for subject in (("user", user_id), ("ip", client_ip)):
+                if not subject[1]:
+                    continue
+                window = self._subjects.get(subject)
+                if window is None:
+                    window = self._subjects[subject] = SlidingHyperLogLog(
+                        self.precision, self.buckets, self.bucket_seconds
+                    )
+                    if len(self._subjects) > self.max_subjects:
+                        self._subjects.popitem(last=False)
+                else:
+                    self._subjects.move_to_end(subject)
+                window.add(item_hash, now)
+
+                # Distinct patients can never exceed requests, so the estimate
+                # is only computed once enough requests were seen
+                if item_hash is not None and window.requests >= self.distinct_patient_threshold:
+                    distinct = window.distinct()
+                    if distinct >= self.distinct_patient_threshold:
+                        raised.append(self._alert(subject, "bulk_record_access", window, distinct, now))
+                if window.requests >= self.request_threshold:
+                    raised.append(self._alert(subject, "high_request_rate", window, window.distinct(), now))
+
+        for alert in raised:
+            if alert is None:
+                continue
+            self.alerts.append(alert)
+            try:
+                self.on_alert(alert)
+            except Exception as e:
+                logger.error(f"Error dispatching security alert: {str(e)}")
+
+    def _alert(
+        self, subject: Subject, alert_type: str, window: SlidingHyperLogLog, distinct: float, now: float
+    ) -> Optional[Dict[str, Any]]:
+        key = (subject, alert_type)
+        if now - self._last_alert.get(key, float("-inf")) < self.cooldown:
+            return None
+        self._last_alert[key] = now
+        if len(self._last_alert) > self.max_subjects * 2:
+            cutoff = now - self.cooldown
+            self._last_alert = {k: t for k, t in self._last_alert.items() if t >= cutoff}
+        return {
+            "type": alert_type,
+            "severity": "high" if alert_type == "bulk_record_access" else "medium",
+            "subject_type": subject[0],
+            "subject": subject[1],
+            "distinct_patients": round(distinct),
+            "requests": window.requests,
+            "window_seconds": self.window_seconds,
+            "detected_at": datetime.fromtimestamp(now).isoformat()
+        }
+
+    def recent_alerts(self, limit: int = 100) -> List[Dict[str, Any]]:
+        return list(self.alerts)[-limit:][::-1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subjects": len(self._subjects),
+            "max_subjects": self.max_subjects,
+            "alerts": len(self.alerts)
+        }
+
+
+access_anomaly_detector = AccessAnomalyDetector()
@@ -0,0 +1,201 @@
+"""
+Incremental rollups of AI suggestion feedback
+
+Provider feedback is stored per suggestion row (`feedback` and
+`applied_suggestions` JSONB on PatientIntakeAISuggestion). To report
+acceptance per model version without scanning that table, every feedback
+write also applies a delta to `ai_suggestion_feedback_rollups`:
+
+- a suggestion row counts once it has received feedback;
+- each non-empty top-level key of its `suggestions` is "presented";
+- a key is "accepted" when `applied_suggestions` marks it as applied (a
+  truthy value under the key, or the key listed in an array).
+
+Feedback can be resubmitted, so the delta is the new contribution minus the
+old one, and the suggestion row must be locked (SELECT ... FOR UPDATE) while
+both are computed. Rows are binned by confidence score in tenths, which
+gives calibration (mean confidence against acceptance rate) per bin.
+
+Existing feedback written before the rollups existed is loaded with:
+
+    python -m backend.api.services.ai_feedback_rollups
+"""
+
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models.ai_feedback_rollup import AISuggestionFeedbackRollup
+from ..models.patient_intake import PatientIntakeAISuggestion
+
+logger = logging.getLogger(__name__)
+
+CONFIDENCE_BINS = 10
+UNKNOWN_MODEL_VERSION = "unknown"
+
+RollupKey = Tuple[str, str, int]
+
+
+def confidence_bin(confidence: Optional[float]) -> int:
+    if confidence is None:
+        return 0
+    return min(max(int(confidence * CONFIDENCE_BINS), 0), CONFIDENCE_BINS - 1)
+
+
+def is_applied(applied: Any, key: str) -> bool:
+    if isinstance(applied, dict):
+        return bool(applied.get(key))
+    if isinstance(applied, list):
+        return key in applied
+    return False
+
+
+def feedback_contribution(
+    suggestions: Optional[Dict[str, Any]],
+    feedback: Any,
+    applied: Any
+) -> Dict[str, Tuple[int, int]]:
+    """(presented, accepted) per suggestion key for one row in a given feedback state"""
+    if feedback is None and applied is None:
+        return {}
+    return {
+        key: (1, int(is_applied(applied, key)))
+        for key, value in (suggestions or {}).items()
+        if value
+    }
+
+
+def rollup_deltas(
+    suggestion: PatientIntakeAISuggestion,
+    old_feedback: Any,
+    old_applied: Any
+) -> Dict[RollupKey, Tuple[int, int, float]]:
+    """Change in (presented, accepted, confidence_sum) from the old to the current feedback"""
+    model_version = suggestion.ai_model_version or UNKNOWN_MODEL_VERSION
+    bin_index = confidence_bin(suggestion.confidence_score)
+    confidence = suggestion.confidence_score or 0.0
+
+    old = feedback_contribution(suggestion.suggestions, old_feedback, old_applied)
+    new = feedback_contribution(suggestion.suggestions, suggestion.feedback, suggestion.applied_suggestions)
+
+    deltas = {}
+    for key in set(old) | set(new):
+        presented = new.get(key, (0, 0))[0] - old.get(key, (0, 0))[0]
+        accepted = new.get(key, (0, 0))[1] - old.get(key, (0, 0))[1]
+        if presented or accepted:
+            deltas[(model_version, key, bin_index)] = (presented, accepted, presented * confidence)
+    return deltas
+
+
+def apply_rollup_deltas(db: Session, deltas: Dict[RollupKey, Tuple[int, int, float]]) -> None:
+    """Upsert deltas into the rollup table; the caller commits"""
+    if not deltas:
+        return
+    rows = [
+        {
+            "ai_model_version": model_version,
+            "suggestion_key": key,
+            "confidence_bin": bin_index,
+            "presented_count": presented,
+            "accepted_count": accepted,
+            "confidence_sum": confidence_sum
+        }
+        for (model_version, key, bin_index), (presented, accepted, confidence_sum) in sorted(deltas.items())
+    ]
+    table = AISuggestionFeedbackRollup.__table__
+    statement = insert(table).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.ai_model_version, table.c.suggestion_key, table.c.confidence_bin],
+        set_={
+            "presented_count": table.c.presented_count + statement.excluded.presented_count,
+            "accepted_count": table.c.accepted_count + statement.excluded.accepted_count,
+            "confidence_sum": table.c.confidence_sum + statement.excluded.confidence_sum,
+            "updated_at": func.now()
+        }
+    ))
+
+
+def record_feedback(
+    db: Session,
+    suggestion: PatientIntakeAISuggestion,
+    feedback: Any,
+    applied: Any
+) -> None:
+    """Store feedback on a (locked) suggestion row and update the rollups in the same transaction"""
+    old_feedback, old_applied = suggestion.feedback, suggestion.applied_suggestions
+    suggestion.feedback = feedback
+    suggestion.applied_suggestions = applied
+    apply_rollup_deltas(db, rollup_deltas(suggestion, old_feedback, old_applied))
+
+
+def feedback_summary(db: Session, model_versions: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Acceptance and calibration per model version and suggestion key, read
+    from the rollup table (at most CONFIDENCE_BINS rows per key).
+    """
+    query = db.query(AISuggestionFeedbackRollup)
+    if model_versions:
+        query = query.filter(AISuggestionFeedbackRollup.ai_model_version.in_(list(model_versions)))
+
+    summary: Dict[str, Dict[str, Any]] = defaultdict(dict)
+    for row in query.order_by(
+        AISuggestionFeedbackRollup.ai_model_version,
+        AISuggestionFeedbackRollup.suggestion_key,
+        AISuggestionFeedbackRollup.confidence_bin
+    ):
+        if not row.presented_count:
+            continue
+        entry = summary[row.ai_model_version].setdefault(row.suggestion_key, {
+            "presented": 0, "accepted": 0, "acceptance_rate": 0.0, "calibration": []
+        })
+        entry["presented"] += row.presented_count
+        entry["accepted"] += row.accepted_count
+        entry["acceptance_rate"] = entry["accepted"] / entry["presented"]
+        entry["calibration"].append({
+            "bin": row.confidence_bin,
+            "confidence_range": [row.confidence_bin / CONFIDENCE_BINS, (row.confidence_bin + 1) / CONFIDENCE_BINS],
+            "presented": row.presented_count,
+            "accepted": row.accepted_count,
+            "mean_confidence": row.confidence_sum / row.presented_count,
+            "acceptance_rate": row.accepted_count / row.presented_count
+        })
+    return {"model_versions": dict(summary)}
+
+
+def rebuild_feedback_rollups(db: Session, batch_size: int = 1000) -> int:
+    """Recompute all rollups from the suggestion table; returns the rows scanned"""
+    # Feedback writes queue behind this lock, so none is counted twice or missed
+    db.execute(text("LOCK TABLE ai_suggestion_feedback_rollups IN EXCLUSIVE MODE"))
+    totals: Dict[RollupKey, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+    scanned = 0
+    query = db.query(PatientIntakeAISuggestion)\
+        .filter((PatientIntakeAISuggestion.feedback.isnot(None)) |
+                (PatientIntakeAISuggestion.applied_suggestions.isnot(None)))\
+        .yield_per(batch_size)
+    for suggestion in query:
+        scanned += 1
+        for key, (presented, accepted, confidence_sum) in rollup_deltas(suggestion, None, None).items():
+            totals[key][0] += presented
+            totals[key][1] += accepted
+            totals[key][2] += confidence_sum
+
+    db.query(AISuggestionFeedbackRollup).delete()
+    apply_rollup_deltas(db, {key: tuple(values) for key, values in totals.items()})
+    db.commit()
+    return scanned
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    db_generator = get_db()
+    db = next(db_generator)
+    try:
+        scanned = rebuild_feedback_rollups(db)
+        logger.info(f"Rebuilt AI feedback rollups from {scanned} suggestions")
+    finally:
+        db_generator.close()
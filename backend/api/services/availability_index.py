@@ -0,0 +1,231 @@
+"""
+Bitmap availability index for appointment scheduling
+
+Each bookable resource (provider, hygienist, chair, room) has one bitmap
+covering the scheduling horizon at a fixed slot granularity: bit i is set
+when slot i is busy. Bitmaps are Python integers, so "free for all of these
+resources" is a handful of big-integer AND/NOT operations, and a run of N
+consecutive free slots is found with log2(N) shift-and-AND steps.
+
+The index is updated incrementally as appointments are booked or cancelled,
+so searches never scan appointment rows. Partial slots are rounded up, so
+adjacent appointments can share a slot; each resource therefore also keeps
+its booked ranges, and a cancel rebuilds that resource's bitmap from the
+ranges that remain instead of clearing the cancelled slots outright.
+
+When the horizon rolls forward, bookings on the newly added days are read
+through `load_bookings(start, end)`, which yields (resource_ids, start, end)
+for every booking or block overlapping that period.
+
+    index = AvailabilityIndex(horizon_start=date.today(), days=42, slot_minutes=15,
+                              open_hours=(time(7), time(19)))
+    index.book(["dr-1", "chair-3"], start, end)
+    slot = index.find_first(duration=timedelta(minutes=90),
+                            required=["chair-3"], any_of=[hygienist_ids])
+"""
+
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+BookingLoader = Callable[[datetime, datetime], Iterable[Tuple[Sequence[str], datetime, datetime]]]
+
+
+class AvailabilityIndex:
+    """Per-resource busy bitmaps over a rolling horizon"""
+
+    def __init__(
+        self,
+        horizon_start: date,
+        days: int = 42,
+        slot_minutes: int = 15,
+        open_hours: Tuple[time, time] = (time(7, 0), time(19, 0)),
+        closed_weekdays: Iterable[int] = (6,),
+        load_bookings: Optional[BookingLoader] = None
+    ):
+        if (24 * 60) % slot_minutes:
+            raise ValueError("slot_minutes must divide a day evenly")
+        self.horizon_start = horizon_start
+        self.days = days
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = 24 * 60 // slot_minutes
+        self.total_slots = days * self.slots_per_day
+        self.open_hours = open_hours
+        self.closed_weekdays = set(closed_weekdays)
+        self.load_bookings = load_bookings
+        self._busy: Dict[str, int] = {}
+        # Slot-range masks of live bookings and blocks per resource, with multiplicity
+        self._ranges: Dict[str, Counter] = {}
+        self._open_mask = self._build_open_mask()
+
+    def _build_open_mask(self) -> int:
+        """Bitmap of slots that fall inside opening hours on open days"""
+        open_slot = (self.open_hours[0].hour * 60 + self.open_hours[0].minute) // self.slot_minutes
+        close_slot = (self.open_hours[1].hour * 60 + self.open_hours[1].minute) // self.slot_minutes
+        day_mask = ((1 << (close_slot - open_slot)) - 1) << open_slot
+
+        mask = 0
+        for offset in range(self.days):
+            if (self.horizon_start + timedelta(days=offset)).weekday() not in self.closed_weekdays:
+                mask |= day_mask << (offset * self.slots_per_day)
+        return mask
+
+    def _slot_index(self, moment: datetime) -> int:
+        delta = moment - datetime.combine(self.horizon_start, time(0))
+        return int(delta.total_seconds() // 60) // self.slot_minutes
+
+    def _slot_index_ceil(self, moment: datetime) -> int:
+        """Index of the first slot starting at or after `moment`"""
+        delta = moment - datetime.combine(self.horizon_start, time(0))
+        return -(-int(delta.total_seconds()) // (self.slot_minutes * 60))
+
+    def _slot_range_mask(self, start: datetime, end: datetime) -> int:
+        first = max(self._slot_index(start), 0)
+        # Round partial trailing slots up so an appointment blocks every slot it touches
+        last = min(-(-int((end - datetime.combine(self.horizon_start, time(0))).total_seconds() // 60)
+                     // self.slot_minutes), self.total_slots)
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    def _slot_time(self, index: int) -> datetime:
+        return datetime.combine(self.horizon_start, time(0)) + timedelta(minutes=index * self.slot_minutes)
+
+    def book(self, resource_ids: Sequence[str], start: datetime, end: datetime) -> None:
+        mask = self._slot_range_mask(start, end)
+        if not mask:
+            return
+        for resource_id in resource_ids:
+            self._ranges.setdefault(resource_id, Counter())[mask] += 1
+            self._busy[resource_id] = self._busy.get(resource_id, 0) | mask
+
+    def cancel(self, resource_ids: Sequence[str], start: datetime, end: datetime) -> None:
+        """Remove one booking or block of exactly this range; slots still held by others stay busy"""
+        mask = self._slot_range_mask(start, end)
+        for resource_id in resource_ids:
+            ranges = self._ranges.get(resource_id)
+            if not ranges or not ranges[mask]:
+                continue
+            ranges[mask] -= 1
+            if not ranges[mask]:
+                del ranges[mask]
+            self._busy[resource_id] = self._union(ranges)
+
+    @staticmethod
+    def _union(ranges: Counter) -> int:
+        busy = 0
+        for mask in ranges:
+            busy |= mask
+        return busy
+
+    def block(self, resource_id: str, start: datetime, end: datetime) -> None:
+        """Mark time off, lunch or maintenance; same effect as a booking"""
+        self.book([resource_id], start, end)
+
+    def advance_to(self, new_start: date) -> None:
+        """
+        Roll the horizon forward, dropping past days and adding the new
+        future days with their existing bookings (if `load_bookings` is set)
+        """
+        shift_days = (new_start - self.horizon_start).days
+        if shift_days <= 0:
+            return
+        shift = shift_days * self.slots_per_day
+        full = (1 << self.total_slots) - 1
+        shifted_ranges = {}
+        for resource_id, ranges in self._ranges.items():
+            shifted = Counter()
+            for mask, count in ranges.items():
+                if mask >> shift:
+                    shifted[(mask >> shift) & full] += count
+            if shifted:
+                shifted_ranges[resource_id] = shifted
+        self._ranges = shifted_ranges
+        self._busy = {resource_id: self._union(ranges) for resource_id, ranges in shifted_ranges.items()}
+        self.horizon_start = new_start
+        self._open_mask = self._build_open_mask()
+
+        if self.load_bookings is not None:
+            added_from = datetime.combine(new_start, time(0)) + timedelta(days=max(self.days - shift_days, 0))
+            added_to = datetime.combine(new_start, time(0)) + timedelta(days=self.days)
+            for resource_ids, start, end in self.load_bookings(added_from, added_to):
+                # Slots before added_from are already covered by the shifted ranges
+                self.book(resource_ids, max(start, added_from), end)
+
+    def free_mask(self, resource_ids: Sequence[str]) -> int:
+        """Slots that are open and free for every one of `resource_ids`"""
+        free = self._open_mask
+        for resource_id in resource_ids:
+            free &= ~self._busy.get(resource_id, 0)
+        return free
+
+    @staticmethod
+    def _run_starts(free: int, length: int) -> int:
+        """
+        Bitmap of positions where `length` consecutive free slots begin.
+        Doubles the covered run each step: O(log length) big-int operations.
+        """
+        result = free
+        covered = 1
+        while covered < length:
+            step = min(covered, length - covered)
+            result &= result >> step
+            covered += step
+        return result
+
+    def find_first(
+        self,
+        duration: timedelta,
+        required: Sequence[str] = (),
+        any_of: Sequence[Sequence[str]] = (),
+        not_before: Optional[datetime] = None,
+        not_after: Optional[datetime] = None,
+        limit: int = 1
+    ) -> List[Dict[str, object]]:
+        """
+        Find the earliest start times where every `required` resource is free
+        and, for each group in `any_of`, at least one member is free, for the
+        whole `duration`, ending no later than `not_after`. Returns up to
+        `limit` options, earliest first.
+        """
+        length = -(-int(duration.total_seconds() // 60) // self.slot_minutes)
+        if length <= 0:
+            raise ValueError("duration must be positive")
+
+        # Bitmap of allowed start slots
+        window = (1 << self.total_slots) - 1
+        if not_before is not None:
+            # A not_before inside a slot excludes that slot, which has already begun
+            window &= ~((1 << max(self._slot_index_ceil(not_before), 0)) - 1)
+        if not_after is not None:
+            # The last allowed start is the one whose final slot ends at not_after
+            window &= (1 << max(self._slot_index(not_after) - length + 1, 0)) - 1
+
+        base = self.free_mask(required)
+
+        # For each any_of group, track which member is free at each start
+        group_starts: List[List[Tuple[str, int]]] = []
+        combined = self._run_starts(base, length) & window
+        for group in any_of:
+            member_starts = [(member, self._run_starts(base & ~self._busy.get(member, 0), length)) for member in group]
+            group_mask = 0
+            for _, starts in member_starts:
+                group_mask |= starts
+            combined &= group_mask
+            group_starts.append(member_starts)
+
+        options = []
+        while combined and len(options) < limit:
+            index = (combined & -combined).bit_length() - 1
+            combined &= combined - 1
+            chosen = [
+                next(member for member, starts in member_starts if starts >> index & 1)
+                for member_starts in group_starts
+            ]
+            start = self._slot_time(index)
+            options.append({
+                "start": start,
+                "end": start + timedelta(minutes=length * self.slot_minutes),
+                "resources": list(required) + chosen
+            })
+        return options
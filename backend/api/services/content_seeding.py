@@ -0,0 +1,117 @@
+"""
+One-shot, hash-guarded educational content seeding
+
+Run once per deployment instead of on every worker boot:
+
+    python -m backend.api.services.content_seeding
+
+The manifest for the educational content data set is identified by
+EDUCATIONAL_CONTENT_VERSION; bump it whenever the seeded content changes.
+Seeding runs only when the hash of that version differs from the one
+recorded in ``seed_manifests``, so comment or formatting edits to the seed
+code never trigger a re-seed. A transaction-level advisory lock makes
+concurrent runs (e.g. several deploy hooks) skip instead of seeding twice.
+
+When the manifest is missing or records another version, the seeder runs
+with ``upsert=True``. It inserts rows that are missing and updates rows that
+exist, so a version bump reaches content seeded by an earlier deploy, and a
+database seeded before manifests existed gets its manifest. Once the seeder
+returns, the content is at the target version and the manifest is recorded,
+whether or not any rows changed. If the seeder raises, the manifest is left
+untouched and the next deploy tries again.
+"""
+
+import asyncio
+import hashlib
+import logging
+import zlib
+from typing import Optional
+
+from sqlalchemy import text
+
+from ..database import get_db
+from ..models.seed_manifest import SeedManifest
+from . import seed_educational_content as seed_module
+
+logger = logging.getLogger(__name__)
+
+EDUCATIONAL_CONTENT_MANIFEST = "educational_content"
+# Bump whenever the content in seed_educational_content changes
+EDUCATIONAL_CONTENT_VERSION = "1"
+
+SEED_LOCK_KEY = zlib.crc32(b"seed:educational_content")
+
+
+def educational_content_hash() -> str:
+    """Hash recorded in the manifest for the current educational content version"""
+    return hashlib.sha256(f"{EDUCATIONAL_CONTENT_MANIFEST}:{EDUCATIONAL_CONTENT_VERSION}".encode()).hexdigest()
+
+
+def manifest_version(name: str) -> Optional[str]:
+    """
+    Shared content version of a seeded data set, for response caches in
+    every worker: the recorded hash plus the time it was applied, so a
+    re-seed of the same version also changes it.
+    """
+    db_generator = get_db()
+    db = next(db_generator)
+    try:
+        manifest = db.query(SeedManifest).filter(SeedManifest.name == name).first()
+        if manifest is None:
+            return None
+        return f"{manifest.content_hash}:{manifest.applied_at.isoformat() if manifest.applied_at else ''}"
+    finally:
+        db_generator.close()
+
+
+async def seed_educational_content_once() -> bool:
+    """
+    Bring educational content to EDUCATIONAL_CONTENT_VERSION if the manifest
+    records another version (or none).
+
+    Returns True if the manifest was written, False if it was already
+    current or another process holds the seeding lock. Seeder errors
+    propagate.
+    """
+    content_hash = educational_content_hash()
+
+    db_generator = get_db()
+    db = next(db_generator)
+    try:
+        # Held until this transaction ends; concurrent runs skip immediately
+        locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SEED_LOCK_KEY}).scalar()
+        if not locked:
+            logger.info("Educational content seeding already in progress elsewhere, skipping")
+            return False
+
+        manifest = db.query(SeedManifest).filter(SeedManifest.name == EDUCATIONAL_CONTENT_MANIFEST).first()
+        if manifest and manifest.content_hash == content_hash:
+            logger.info(f"Educational content is current (version {manifest.version})")
+            return False
+
+        # Upsert rather than insert-if-absent: existing rows may be from an older version
+        changed = await seed_module.seed_educational_content(upsert=True)
+        logger.info(
+            "Educational content upserted" if changed
+            else "Educational content already present at this version"
+        )
+
+        if manifest is None:
+            manifest = SeedManifest(name=EDUCATIONAL_CONTENT_MANIFEST)
+            db.add(manifest)
+        manifest.version = EDUCATIONAL_CONTENT_VERSION
+        manifest.content_hash = content_hash
+        db.commit()
+
+        logger.info(f"Educational content manifest updated to version {EDUCATIONAL_CONTENT_VERSION}")
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db_generator.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(seed_educational_content_once())
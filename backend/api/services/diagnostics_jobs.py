@@ -0,0 +1,187 @@
+"""
+Asynchronous batch diagnostics jobs
+
+A full-mouth series is submitted as one job. Images are analyzed
+concurrently (bounded per worker), and per-image progress and results are
+published as Server-Sent Events so the client does not hold a request open
+waiting for the whole batch.
+
+Results are cached by (image fingerprint, model version): re-analyzing an
+unchanged image with the same model returns the cached result immediately.
+
+Usage in a router:
+
+    jobs = DiagnosticsJobManager(analyze=analyze_image, fingerprint=image_checksum,
+                                 model_version=lambda: inference_service.model_version)
+
+    @router.post("/jobs", status_code=202)
+    async def submit(request: BatchAnalysisRequest):
+        job = jobs.submit(request.image_ids)
+        return {"job_id": job.id, "events": f"/api/diagnostics/jobs/{job.id}/events"}
+
+    @router.get("/jobs/{job_id}/events")
+    async def events(job_id: str, request: Request):
+        job = jobs.get(job_id)  # 404 here, before the stream's 200 headers go out
+        return StreamingResponse(jobs.stream(job, request), media_type="text/event-stream")
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException, Request, status
+
+logger = logging.getLogger(__name__)
+
+AnalyzeFn = Callable[[str], Awaitable[Dict[str, Any]]]
+FingerprintFn = Callable[[str], Awaitable[str]]
+
+# Finished jobs are kept this long so clients can reconnect and replay events
+JOB_RETENTION_SECONDS = 3600
+
+
+@dataclass
+class DiagnosticsJob:
+    id: str
+    image_ids: List[str]
+    created_at: float = field(default_factory=time.time)
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    finished_at: Optional[float] = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def completed(self) -> int:
+        return len(self.results) + len(self.errors)
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        self.events.append({"event": event, "data": data})
+        # Wake every listener, then re-arm for the next event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "total": len(self.image_ids),
+            "completed": self.completed,
+            "failed": len(self.errors),
+            "finished": self.finished_at is not None
+        }
+
+
+class DiagnosticsJobManager:
+    """Runs batch analysis jobs and streams their progress"""
+
+    def __init__(
+        self,
+        analyze: AnalyzeFn,
+        fingerprint: FingerprintFn,
+        model_version: Callable[[], str],
+        max_concurrency: int = 4,
+        max_cached_results: int = 10_000
+    ):
+        self.analyze = analyze
+        self.fingerprint = fingerprint
+        self.model_version = model_version
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._jobs: Dict[str, DiagnosticsJob] = {}
+        # Strong references to running jobs; the event loop only keeps weak ones
+        self._tasks: Set[asyncio.Task] = set()
+        self._results: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.max_cached_results = max_cached_results
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def submit(self, image_ids: List[str]) -> DiagnosticsJob:
+        if not image_ids:
+            raise ValueError("At least one image ID is required")
+
+        self._expire_jobs()
+        job = DiagnosticsJob(id=str(uuid.uuid4()), image_ids=list(dict.fromkeys(image_ids)))
+        self._jobs[job.id] = job
+        job.publish("queued", job.summary())
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return job
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Diagnostics job runner failed: {str(task.exception())}")
+
+    def get(self, job_id: str) -> DiagnosticsJob:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Diagnostics job {job_id} not found")
+        return job
+
+    async def _run(self, job: DiagnosticsJob) -> None:
+        await asyncio.gather(*(self._analyze_one(job, image_id) for image_id in job.image_ids))
+        job.finished_at = time.time()
+        job.publish("done", job.summary())
+
+    async def _analyze_one(self, job: DiagnosticsJob, image_id: str) -> None:
+        try:
+            cache_key = (await self.fingerprint(image_id), self.model_version())
+            result = self._results.get(cache_key)
+            cached = result is not None
+
+            if cached:
+                self.cache_hits += 1
+                self._results.move_to_end(cache_key)
+            else:
+                self.cache_misses += 1
+                async with self._semaphore:
+                    result = await self.analyze(image_id)
+                self._results[cache_key] = result
+                while len(self._results) > self.max_cached_results:
+                    self._results.popitem(last=False)
+
+            job.results[image_id] = result
+            job.publish("result", {"image_id": image_id, "cached": cached, "result": result, **job.summary()})
+        except Exception as e:
+            logger.error(f"Diagnostics job {job.id} failed for image {image_id}: {str(e)}")
+            job.errors[image_id] = str(e)
+            job.publish("error", {"image_id": image_id, "error": str(e), **job.summary()})
+
+    async def stream(self, job: DiagnosticsJob, request: Request, heartbeat_seconds: float = 15.0) -> AsyncIterator[str]:
+        """
+        Yield the job's events as SSE frames, starting after the client's
+        Last-Event-ID if it is reconnecting.
+
+        Takes the job rather than its ID: look it up with get() in the route
+        so an unknown ID is a 404 rather than an error after the stream's
+        200 headers have been sent.
+        """
+        last_event_id = request.headers.get("last-event-id")
+        position = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+        while True:
+            # Grab the wake-up event before yielding so no publish is missed
+            changed = job._changed
+            while position < len(job.events):
+                event = job.events[position]
+                yield f"id: {position}\nevent: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+                position += 1
+
+            if job.finished_at is not None or await request.is_disconnected():
+                return
+
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # Comment frames keep proxies from closing idle connections
+                yield ": keep-alive\n\n"
+
+    def _expire_jobs(self) -> None:
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,286 @@
+"""
+Buffered content engagement ingestion
+
+Accepts engagement events (views, clicks, watch time) into a bounded
+in-memory queue and writes them in batches instead of one row per request.
+While buffered, events are also rolled up per (content ID, event type,
+minute) so dashboards can read pre-aggregated counts.
+
+- Validation: `submit()` raises InvalidEngagementEvent (a ValueError, for a
+  422) if any event lacks a content ID, event type or parseable timestamp,
+  so one bad event never reaches a batch. Events read back from a spill
+  file are checked again, and malformed ones are dropped and counted rather
+  than failing the batch they are in.
+- Backpressure: `submit()` raises IngestionBackpressure when the queue is
+  full, which the route should turn into a 503 with Retry-After.
+- Crash safety: a batch that cannot be written is appended to a JSONL spill
+  file. Spilled batches are replayed on start, before new events are
+  flushed, and again by the flush loop every `spill_retry_interval` seconds,
+  so they are written once the sink recovers, not at the next restart.
+  Replay is at-least-once: a crash during replay leaves the
+  `.replay` file behind and it is replayed again on the next start, so a
+  batch may be written twice. On a clean shutdown the flush loop finishes
+  its current batch and everything still queued is flushed or spilled.
+- Loss window: events are only held in memory until they are flushed, so
+  a hard crash (kill -9, OOM) loses whatever was still queued, i.e. up to
+  `max_queue_size` events or roughly `flush_interval` seconds of traffic at
+  steady state. Engagement analytics tolerate that; lower both settings to
+  narrow the window.
+
+Persistence is delegated to a `sink` coroutine so the pipeline does not
+depend on a particular table layout:
+
+    async def sink(events: List[Dict], rollups: List[Dict]) -> None:
+        db.execute(insert(ContentEngagementEvent), events)
+        db.execute(upsert_rollups_statement, rollups)
+        db.commit()
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EngagementSink = Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], Awaitable[None]]
+
+
+class IngestionBackpressure(Exception):
+    """Raised when the ingestion queue is full"""
+
+
+class InvalidEngagementEvent(ValueError):
+    """Raised when a submitted event cannot be ingested"""
+
+
+def event_error(event: Any) -> Optional[str]:
+    """Why an event cannot be ingested, or None if it is valid"""
+    if not isinstance(event, dict):
+        return "event must be an object"
+    for field in ("content_id", "event_type", "occurred_at"):
+        if not event.get(field):
+            return f"missing '{field}'"
+    occurred_at = event["occurred_at"]
+    if isinstance(occurred_at, str):
+        try:
+            datetime.fromisoformat(occurred_at)
+        except ValueError:
+            return "'occurred_at' is not an ISO 8601 timestamp"
+    elif not isinstance(occurred_at, datetime):
+        return "'occurred_at' must be a timestamp"
+    watch_seconds = event.get("watch_seconds")
+    if watch_seconds is not None:
+        try:
+            float(watch_seconds)
+        except (TypeError, ValueError):
+            return "'watch_seconds' must be a number"
+    return None
+
+
+def rollup_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aggregate valid events (see `event_error`) into per (content_id, event_type, minute) rollups"""
+    rollups: Dict[Tuple[str, str, datetime], Dict[str, Any]] = defaultdict(
+        lambda: {"count": 0, "watch_seconds": 0.0, "patients": set()}
+    )
+    for event in events:
+        occurred_at = event["occurred_at"]
+        if isinstance(occurred_at, str):
+            occurred_at = datetime.fromisoformat(occurred_at)
+        bucket = occurred_at.replace(second=0, microsecond=0)
+
+        rollup = rollups[(event["content_id"], event["event_type"], bucket)]
+        rollup["count"] += 1
+        rollup["watch_seconds"] += float(event.get("watch_seconds") or 0)
+        if event.get("patient_id"):
+            rollup["patients"].add(event["patient_id"])
+
+    return [{
+        "content_id": content_id,
+        "event_type": event_type,
+        "bucket_start": bucket,
+        "event_count": rollup["count"],
+        "watch_seconds": rollup["watch_seconds"],
+        "unique_patients": len(rollup["patients"])
+    } for (content_id, event_type, bucket), rollup in rollups.items()]
+
+
+class EngagementIngestionPipeline:
+    """Bounded queue of engagement events flushed to a sink in batches"""
+
+    def __init__(
+        self,
+        sink: EngagementSink,
+        spill_path: str = "logs/engagement_spill.jsonl",
+        max_queue_size: int = 100_000,
+        batch_size: int = 5_000,
+        flush_interval: float = 2.0,
+        spill_retry_interval: float = 30.0
+    ):
+        self.sink = sink
+        self.spill_path = spill_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_retry_interval = spill_retry_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.events_accepted = 0
+        self.events_rejected = 0
+        self.events_flushed = 0
+        self.events_spilled = 0
+        self.events_invalid = 0
+
+    def submit(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Queue a batch of events without waiting. Either every event is
+        accepted, or InvalidEngagementEvent or IngestionBackpressure is
+        raised and none are.
+        """
+        for index, event in enumerate(events):
+            error = event_error(event)
+            if error:
+                self.events_rejected += len(events)
+                raise InvalidEngagementEvent(f"Event {index}: {error}")
+
+        free = self._queue.maxsize - self._queue.qsize()
+        if len(events) > free:
+            self.events_rejected += len(events)
+            raise IngestionBackpressure(f"Engagement queue full ({self._queue.qsize()} events pending)")
+
+        for event in events:
+            self._queue.put_nowait(event)
+        self.events_accepted += len(events)
+        return len(events)
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self._replay_spill()
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the flush loop and write out everything still queued. The loop
+        is signalled rather than cancelled, so a batch already handed to the
+        sink is never dropped mid-write.
+        """
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+        while not self._queue.empty():
+            await self._flush(self._drain())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_spill_retry = loop.time()
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            while not self._queue.empty():
+                await self._flush(self._drain())
+                if self._queue.qsize() < self.batch_size and not self._stopping.is_set():
+                    break
+
+            if loop.time() - last_spill_retry >= self.spill_retry_interval and not self._stopping.is_set():
+                last_spill_retry = loop.time()
+                if os.path.exists(self.spill_path):
+                    try:
+                        await self._replay_spill()
+                    except Exception as e:
+                        logger.error(f"Retrying spilled engagement events failed: {str(e)}")
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _flush(self, events: List[Dict[str, Any]]) -> bool:
+        valid = [event for event in events if event_error(event) is None]
+        if len(valid) < len(events):
+            # Only possible for replayed spills; never let them block the batch
+            self.events_invalid += len(events) - len(valid)
+            logger.warning(f"Dropping {len(events) - len(valid)} malformed engagement events")
+            events = valid
+        if not events:
+            return True
+        try:
+            await self.sink(events, rollup_events(events))
+            self.events_flushed += len(events)
+            return True
+        except asyncio.CancelledError:
+            # Cancelled mid-write (e.g. a forced shutdown); keep the batch
+            self._spill(events)
+            raise
+        except Exception as e:
+            logger.error(f"Engagement flush of {len(events)} events failed, spilling to disk: {str(e)}")
+            self._spill(events)
+            return False
+
+    def _spill(self, events: List[Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "a") as spill_file:
+            for event in events:
+                spill_file.write(json.dumps(event, default=str) + "\n")
+            spill_file.flush()
+            os.fsync(spill_file.fileno())
+        self.events_spilled += len(events)
+
+    async def _replay_spill(self) -> None:
+        """
+        Write out spilled events: on start, before new ones are accepted,
+        and periodically from the flush loop.
+
+        New spills are appended to the `.replay` file rather than replacing
+        it, so a replay file orphaned by a crash is never overwritten, and
+        the replay file is only removed once all of it has been flushed
+        (failed batches go back to the spill file).
+        """
+        replay_path = f"{self.spill_path}.replay"
+        if os.path.exists(self.spill_path):
+            # Move the spill aside so batches that fail again spill to a fresh file
+            with open(self.spill_path) as spill_file, open(replay_path, "a") as replay_file:
+                for line in spill_file:
+                    # Keep a line cut short by a crash from merging with the next
+                    replay_file.write(line if line.endswith("\n") else line + "\n")
+                replay_file.flush()
+                os.fsync(replay_file.fileno())
+            os.remove(self.spill_path)
+
+        if not os.path.exists(replay_path):
+            return
+
+        events = []
+        with open(replay_path) as replay_file:
+            for line_number, line in enumerate(replay_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash while spilling
+                    logger.warning(f"Skipping unreadable spilled engagement event at line {line_number}")
+
+        logger.info(f"Replaying {len(events)} spilled engagement events")
+        for start in range(0, len(events), self.batch_size):
+            await self._flush(events[start:start + self.batch_size])
+        os.remove(replay_path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "accepted": self.events_accepted,
+            "rejected": self.events_rejected,
+            "flushed": self.events_flushed,
+            "spilled": self.events_spilled,
+            "invalid": self.events_invalid
+        }
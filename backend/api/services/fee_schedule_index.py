@@ -0,0 +1,240 @@
+"""
+In-memory fee schedule and coverage index for treatment plan pricing
+
+Fee schedules and coverage rules are loaded once into dictionaries keyed by
+(CDT code, payer, plan, location), and a whole treatment plan is priced in a
+single call instead of one database lookup per procedure line.
+
+Lookups fall back from the most to the least specific schedule:
+
+    (code, payer, plan, location) -> (code, payer, plan, None)
+    -> (code, payer, None, None) -> (code, None, None, location)  # office UCR
+    -> (code, None, None, None)
+
+The index is an immutable snapshot. `reload()` builds a new snapshot from
+the loader and swaps it in atomically, so requests in flight keep pricing
+against a consistent schedule. After a fee update, `reprice_plans()`
+re-prices every open plan against the new snapshot in one pass.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FeeKey = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+CENT = Decimal("0.01")
+
+# Default benefit categories by CDT code range
+CDT_CATEGORIES = [
+    ("D0100", "D1999", "preventive"),
+    ("D2000", "D2699", "basic"),
+    ("D2700", "D2999", "major"),
+    ("D3000", "D4999", "basic"),
+    ("D5000", "D6999", "major"),
+    ("D7000", "D7999", "basic"),
+    ("D8000", "D8999", "orthodontic"),
+    ("D9000", "D9999", "basic"),
+]
+
+
+def cdt_category(code: str) -> str:
+    for start, end, category in CDT_CATEGORIES:
+        if start <= code <= end:
+            return category
+    return "basic"
+
+
+@dataclass(frozen=True)
+class CoverageRule:
+    """Coverage for one (payer, plan) and benefit category"""
+    coinsurance: Decimal  # share paid by insurance, 0-1
+    deductible_applies: bool = True
+
+
+@dataclass
+class FeeScheduleSnapshot:
+    version: str
+    fees: Dict[FeeKey, Decimal] = field(default_factory=dict)
+    coverage: Dict[Tuple[str, str, str], CoverageRule] = field(default_factory=dict)
+    # (payer, plan, code) -> code the payer reimburses instead (e.g. posterior composite -> amalgam)
+    alternate_benefits: Dict[Tuple[str, str, str], str] = field(default_factory=dict)
+
+    def fee(self, code: str, payer: Optional[str], plan: Optional[str], location: Optional[str]) -> Optional[Decimal]:
+        for key in (
+            (code, payer, plan, location),
+            (code, payer, plan, None),
+            (code, payer, None, None),
+            (code, None, None, location),
+            (code, None, None, None),
+        ):
+            fee = self.fees.get(key)
+            if fee is not None:
+                return fee
+        return None
+
+    def contracted_fee(self, code: str, payer: str, plan: Optional[str], location: Optional[str]) -> Optional[Decimal]:
+        """The payer's own (in-network) fee for `code`, without falling back to office UCR"""
+        for key in ((code, payer, plan, location), (code, payer, plan, None), (code, payer, None, None)):
+            fee = self.fees.get(key)
+            if fee is not None:
+                return fee
+        return None
+
+
+@dataclass
+class PlanLine:
+    code: str
+    tooth: Optional[str] = None
+    quantity: int = 1
+
+
+@dataclass
+class BenefitState:
+    """Remaining patient benefits at the time of pricing"""
+    deductible_remaining: Decimal = Decimal("0")
+    annual_max_remaining: Optional[Decimal] = None
+
+
+class FeeScheduleIndex:
+    """Holds the current fee schedule snapshot and prices plans against it"""
+
+    def __init__(self, loader: Callable[[], Awaitable[FeeScheduleSnapshot]]):
+        self.loader = loader
+        self.snapshot = FeeScheduleSnapshot(version="empty")
+        self._reload_lock = asyncio.Lock()
+
+    async def reload(self) -> bool:
+        """Load a new snapshot; returns True if the schedule version changed"""
+        async with self._reload_lock:
+            snapshot = await self.loader()
+            if snapshot.version == self.snapshot.version:
+                return False
+            self.snapshot = snapshot
+            logger.info(f"Fee schedule index loaded version {snapshot.version} ({len(snapshot.fees)} fees)")
+            return True
+
+    async def watch(self, interval: float = 60.0, on_change: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+        """Poll for schedule changes, optionally re-pricing open plans on each change"""
+        while True:
+            try:
+                if await self.reload() and on_change is not None:
+                    await on_change()
+            except Exception as e:
+                logger.error(f"Fee schedule reload failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def price_plan(
+        self,
+        lines: Iterable[PlanLine],
+        payer: Optional[str],
+        plan: Optional[str],
+        location: Optional[str],
+        benefits: Optional[BenefitState] = None
+    ) -> Dict[str, Any]:
+        """
+        Price every line of a treatment plan with one snapshot: office fee,
+        allowed amount, insurance and patient portions, plus alternate-benefit
+        downgrades. Deductible and annual maximum are consumed in line order.
+
+        When the payer has its own fee for a code (in network), the patient
+        owes that contracted fee less insurance; otherwise the office fee
+        less insurance.
+        """
+        snapshot = self.snapshot
+        benefits = benefits or BenefitState()
+        deductible = benefits.deductible_remaining
+        annual_max = benefits.annual_max_remaining
+
+        priced = []
+        totals = {"fee": Decimal("0"), "insurance": Decimal("0"), "patient": Decimal("0")}
+
+        for line in lines:
+            office_fee = snapshot.fee(line.code, None, None, location)
+            allowed = snapshot.fee(line.code, payer, plan, location)
+            if office_fee is None and allowed is None:
+                priced.append({"code": line.code, "tooth": line.tooth, "error": "No fee on schedule"})
+                continue
+            office_fee = (office_fee if office_fee is not None else allowed) * line.quantity
+            allowed = (allowed if allowed is not None else office_fee / line.quantity) * line.quantity
+
+            # In network the patient is billed the contracted fee, never the office fee
+            contracted = snapshot.contracted_fee(line.code, payer, plan, location) if payer else None
+            charge = contracted * line.quantity if contracted is not None else office_fee
+
+            benefit_code = line.code
+            insurance = Decimal("0")
+            if payer:
+                benefit_code = snapshot.alternate_benefits.get((payer, plan, line.code), line.code)
+                if benefit_code != line.code:
+                    alternate_fee = snapshot.fee(benefit_code, payer, plan, location)
+                    if alternate_fee is not None:
+                        allowed = min(allowed, alternate_fee * line.quantity)
+
+                rule = snapshot.coverage.get((payer, plan, cdt_category(benefit_code)))
+                if rule is not None:
+                    covered = allowed
+                    if rule.deductible_applies and deductible > 0:
+                        applied = min(deductible, covered)
+                        deductible -= applied
+                        covered -= applied
+                    insurance = covered * rule.coinsurance
+                    if annual_max is not None:
+                        insurance = min(insurance, annual_max)
+                        annual_max -= insurance
+
+            insurance = insurance.quantize(CENT, rounding=ROUND_HALF_UP)
+            patient = (charge - insurance).quantize(CENT, rounding=ROUND_HALF_UP)
+            totals["fee"] += office_fee
+            totals["insurance"] += insurance
+            totals["patient"] += patient
+            priced.append({
+                "code": line.code,
+                "tooth": line.tooth,
+                "fee": office_fee,
+                "allowed": allowed.quantize(CENT, rounding=ROUND_HALF_UP),
+                "benefit_code": benefit_code,
+                "insurance_portion": insurance,
+                "patient_portion": patient
+            })
+
+        return {
+            "schedule_version": snapshot.version,
+            "lines": priced,
+            "total_fee": totals["fee"].quantize(CENT),
+            "insurance_total": totals["insurance"].quantize(CENT),
+            "patient_total": totals["patient"].quantize(CENT),
+            "deductible_remaining": deductible,
+            "annual_max_remaining": annual_max
+        }
+
+    def price_alternatives(
+        self,
+        alternatives: Dict[str, List[PlanLine]],
+        payer: Optional[str],
+        plan: Optional[str],
+        location: Optional[str],
+        benefits: Optional[BenefitState] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Price several alternative treatment options against the same benefits"""
+        return {
+            name: self.price_plan(lines, payer, plan, location, benefits)
+            for name, lines in alternatives.items()
+        }
+
+    def reprice_plans(self, plans: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Re-price open plans in bulk. Each plan is a dict with ``id``,
+        ``lines``, ``payer``, ``plan``, ``location`` and optionally
+        ``benefits``; results carry the plan ID for a bulk UPDATE.
+        """
+        return [
+            {"id": plan["id"], **self.price_plan(
+                plan["lines"], plan.get("payer"), plan.get("plan"), plan.get("location"), plan.get("benefits")
+            )}
+            for plan in plans
+        ]
@@ -0,0 +1,224 @@
+"""
+Envelope encryption for patient fields
+
+Each field value is encrypted with AES-256-GCM under a data key (DEK). Data
+keys are stored only wrapped (AES key wrap) by a master key (KEK) that
+never leaves the key provider. Ciphertexts are self-describing:
+
+    base64url( version(1) | key_id length(1) | key_id | nonce(12) | ciphertext+tag )
+
+Unwrapped data keys are kept in a bounded, TTL'd cache, so decrypting a
+result set costs one unwrap per distinct key rather than one per field.
+`decrypt_many()` and `decrypt_rows()` process whole result sets, grouping
+values by key and reusing one AESGCM instance per key, and only touch the
+fields they are asked for. For queries that do not need a field, leave the
+column deferred or select `raw(column)` so the value is not decrypted at all.
+
+    cipher = FieldCipher(InMemoryKeyStore(), master_key=load_master_key())
+    cipher.rotate()                                  # create the first data key
+    token = cipher.encrypt("Jane")
+    rows = db.execute(select(Patient.id, raw(Patient.first_name), raw(Patient.last_name))).all()
+    patients = cipher.decrypt_rows(rows, ["first_name", "last_name"])
+"""
+
+import base64
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.keywrap import aes_key_unwrap, aes_key_wrap
+from sqlalchemy import Text, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+FORMAT_VERSION = 1
+NONCE_SIZE = 12
+
+
+class DecryptionError(ValueError):
+    """Raised when a ciphertext is malformed or does not authenticate"""
+
+
+class InMemoryKeyStore:
+    """Wrapped data keys by key ID; replace with a table- or KMS-backed store"""
+
+    def __init__(self):
+        self._keys: Dict[str, bytes] = {}
+        self.active_key_id: Optional[str] = None
+
+    def get_wrapped(self, key_id: str) -> bytes:
+        try:
+            return self._keys[key_id]
+        except KeyError:
+            raise DecryptionError(f"Unknown data key {key_id}")
+
+    def put_wrapped(self, key_id: str, wrapped: bytes, active: bool = True) -> None:
+        self._keys[key_id] = wrapped
+        if active:
+            self.active_key_id = key_id
+
+
+class DataKeyCache:
+    """Bounded LRU cache of unwrapped data keys with a time-to-live"""
+
+    def __init__(self, max_keys: int = 256, ttl: float = 300.0):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, AESGCM]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key_id: str) -> Optional[AESGCM]:
+        with self._lock:
+            entry = self._entries.get(key_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key_id: str, aead: AESGCM) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key_id] = (time.monotonic() + self.ttl, aead)
+            self._entries.move_to_end(key_id)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def load_master_key() -> bytes:
+    """Read the base64 key-encryption key from DENTAMIND_FIELD_MASTER_KEY"""
+    value = os.getenv("DENTAMIND_FIELD_MASTER_KEY")
+    if not value:
+        raise RuntimeError("DENTAMIND_FIELD_MASTER_KEY is not set")
+    key = base64.b64decode(value)
+    if len(key) != 32:
+        raise RuntimeError("DENTAMIND_FIELD_MASTER_KEY must decode to 32 bytes")
+    return key
+
+
+class FieldCipher:
+    """Encrypts and decrypts field values with cached envelope data keys"""
+
+    def __init__(self, key_store: InMemoryKeyStore, master_key: bytes, cache: Optional[DataKeyCache] = None):
+        self.key_store = key_store
+        self._master_key = master_key
+        self.cache = cache or DataKeyCache()
+
+    def rotate(self) -> str:
+        """Create a new data key, store it wrapped and make it the active key"""
+        key_id = secrets.token_hex(8)
+        data_key = AESGCM.generate_key(bit_length=256)
+        self.key_store.put_wrapped(key_id, aes_key_wrap(self._master_key, data_key), active=True)
+        self.cache.put(key_id, AESGCM(data_key))
+        return key_id
+
+    def _aead(self, key_id: str) -> AESGCM:
+        aead = self.cache.get(key_id)
+        if aead is None:
+            aead = AESGCM(aes_key_unwrap(self._master_key, self.key_store.get_wrapped(key_id)))
+            self.cache.put(key_id, aead)
+        return aead
+
+    def encrypt(self, plaintext: Optional[str]) -> Optional[str]:
+        if plaintext is None:
+            return None
+        key_id = self.key_store.active_key_id
+        if key_id is None:
+            raise RuntimeError("No active data key; call rotate() first")
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        header = bytes([FORMAT_VERSION, len(key_id)]) + key_id.encode()
+        # The header is authenticated so a ciphertext cannot be moved to another key
+        ciphertext = self._aead(key_id).encrypt(nonce, plaintext.encode(), header)
+        return base64.urlsafe_b64encode(header + nonce + ciphertext).decode()
+
+    @staticmethod
+    def _parse(token: str) -> Tuple[str, bytes, bytes, bytes]:
+        try:
+            blob = base64.urlsafe_b64decode(token)
+            if blob[0] != FORMAT_VERSION:
+                raise DecryptionError(f"Unsupported ciphertext version {blob[0]}")
+            header_end = 2 + blob[1]
+            key_id = blob[2:header_end].decode()
+        except DecryptionError:
+            raise
+        except (ValueError, IndexError, UnicodeDecodeError) as e:
+            raise DecryptionError(f"Malformed ciphertext: {str(e)}")
+        return key_id, blob[:header_end], blob[header_end:header_end + NONCE_SIZE], blob[header_end + NONCE_SIZE:]
+
+    def decrypt(self, token: Optional[str]) -> Optional[str]:
+        if token is None:
+            return None
+        key_id, header, nonce, ciphertext = self._parse(token)
+        aead = self._aead(key_id)
+        try:
+            return aead.decrypt(nonce, ciphertext, header).decode()
+        except Exception as e:
+            raise DecryptionError(f"Could not decrypt field: {type(e).__name__}")
+
+    def decrypt_many(self, tokens: Sequence[Optional[str]]) -> List[Optional[str]]:
+        """Decrypt a batch, resolving each distinct data key once"""
+        results: List[Optional[str]] = [None] * len(tokens)
+        keys: Dict[str, AESGCM] = {}
+        for i, token in enumerate(tokens):
+            if token is None:
+                continue
+            key_id, header, nonce, ciphertext = self._parse(token)
+            aead = keys.get(key_id)
+            if aead is None:
+                aead = keys[key_id] = self._aead(key_id)
+            try:
+                results[i] = aead.decrypt(nonce, ciphertext, header).decode()
+            except Exception as e:
+                raise DecryptionError(f"Could not decrypt field: {type(e).__name__}")
+        return results
+
+    def decrypt_rows(self, rows: Iterable[Any], fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Bulk-decrypt `fields` of a result set. Rows may be mappings or
+        SQLAlchemy rows; other columns are passed through untouched.
+        """
+        records = [dict(row._mapping) if hasattr(row, "_mapping") else dict(row) for row in rows]
+        for name in fields:
+            plaintexts = self.decrypt_many([record.get(name) for record in records])
+            for record, plaintext in zip(records, plaintexts):
+                if name in record:
+                    record[name] = plaintext
+        return records
+
+
+class EncryptedText(TypeDecorator):
+    """
+    Column type that encrypts on write and decrypts on load, one value at a
+    time. Keep such columns deferred in list queries and use `raw()` with
+    `FieldCipher.decrypt_rows()` for roster views and exports.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, cipher: FieldCipher, *args, **kwargs):
+        self.cipher = cipher
+        super().__init__(*args, **kwargs)
+
+    def process_bind_param(self, value, dialect):
+        return self.cipher.encrypt(value)
+
+    def process_result_value(self, value, dialect):
+        return self.cipher.decrypt(value)
+
+
+def raw(column, name: Optional[str] = None):
+    """Select an encrypted column's ciphertext without decrypting it"""
+    return type_coerce(column, Text).label(name or column.key)
+
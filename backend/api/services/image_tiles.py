@@ -0,0 +1,256 @@
+"""
+Multi-resolution tile and thumbnail cache for dental images
+
+When an image is uploaded, `schedule_pyramid()` builds, in a worker thread:
+
+- a JPEG thumbnail, and
+- a pyramid of downsampled levels (level 0 is full resolution, each further
+  level halves both dimensions until the image fits in one tile), stored as
+  uncompressed ``.npy`` arrays.
+
+Tiles are cut on demand from a memory-mapped level, so serving a tile reads
+only the rows it covers, whatever the size of the original. Encoded tiles are
+kept in a disk-backed LRU that evicts the least recently used tiles once the
+cache exceeds its byte budget.
+
+Viewers load the thumbnail first, then request tiles at the level matching
+their zoom, so load time does not depend on the original image size.
+
+Every pyramid build gets a new build ID (in meta.json), which is part of
+the tile cache key. A tile cut from an older pyramid while a rebuild
+was swapping it in is therefore stored under the old ID and never served
+for the new pyramid.
+
+The shared cache is created on first use by `get_image_tile_cache()`, so
+importing this module touches no directories.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256
+THUMBNAIL_SIZE = 256
+TILE_FORMAT = "JPEG"
+TILE_QUALITY = 85
+
+
+class DiskLRU:
+    """Tracks cached files by last access and evicts the oldest over `max_bytes`"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._total += size
+
+    def get(self, path: str) -> Optional[bytes]:
+        with self._lock:
+            if path not in self._entries:
+                return None
+            self._entries.move_to_end(path)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._total -= self._entries.pop(path, 0)
+            return None
+
+    def put(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total += len(data) - self._entries.pop(path, 0)
+            self._entries[path] = len(data)
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                evicted, size = self._entries.popitem(last=False)
+                self._total -= size
+                try:
+                    os.remove(evicted)
+                except FileNotFoundError:
+                    pass
+
+    def discard_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for path in [p for p in self._entries if p.startswith(prefix)]:
+                self._total -= self._entries.pop(path)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+
+class ImageTileCache:
+    """Builds image pyramids and serves thumbnails and tiles from them"""
+
+    def __init__(self, root: str = "storage/image_tiles", max_tile_bytes: int = 2 * 1024 ** 3):
+        self.pyramid_root = os.path.join(root, "pyramids")
+        self.tiles = DiskLRU(os.path.join(root, "tiles"), max_tile_bytes)
+        os.makedirs(self.pyramid_root, exist_ok=True)
+
+    def _pyramid_dir(self, image_id: str) -> str:
+        if os.sep in image_id or image_id in ("", ".", ".."):
+            raise ValueError(f"Invalid image ID: {image_id}")
+        return os.path.join(self.pyramid_root, image_id)
+
+    def build_pyramid(self, image_id: str, source_path: str) -> Dict[str, Any]:
+        """Build the thumbnail and pyramid levels for an image (blocking)"""
+        directory = self._pyramid_dir(image_id)
+        tmp_directory = f"{directory}.building"
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+
+        with Image.open(source_path) as source:
+            if source.mode in ("I", "I;16", "F"):
+                # High bit-depth radiographs: stretch to 8 bits for display tiles
+                pixels = np.asarray(source, dtype=np.float32)
+                low, high = float(pixels.min()), float(pixels.max())
+                pixels = (pixels - low) * (255.0 / max(high - low, 1.0))
+                image = Image.fromarray(pixels.astype(np.uint8), mode="L")
+            else:
+                image = source.convert("L" if source.mode == "L" else "RGB")
+
+        width, height = image.size
+        thumbnail = image.copy()
+        thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        thumbnail.save(os.path.join(tmp_directory, "thumbnail.jpg"), TILE_FORMAT, quality=TILE_QUALITY)
+
+        level = 0
+        while True:
+            np.save(os.path.join(tmp_directory, f"level_{level}.npy"), np.asarray(image))
+            if max(image.size) <= TILE_SIZE:
+                break
+            image = image.reduce(2)
+            level += 1
+
+        meta = {
+            "width": width,
+            "height": height,
+            "levels": level + 1,
+            "tile_size": TILE_SIZE,
+            "build_id": uuid.uuid4().hex
+        }
+        with open(os.path.join(tmp_directory, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # Swap the finished pyramid into place and drop tiles cut from an older one
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_directory, directory)
+        self.tiles.discard_prefix(os.path.join(self.tiles.directory, image_id) + os.sep)
+        return meta
+
+    def schedule_pyramid(self, image_id: str, source_path: str) -> asyncio.Task:
+        """Build a pyramid in a worker thread without blocking the upload request"""
+        async def build() -> None:
+            try:
+                await asyncio.to_thread(self.build_pyramid, image_id, source_path)
+            except Exception as e:
+                logger.error(f"Failed to build image pyramid for {image_id}: {str(e)}")
+        return asyncio.create_task(build())
+
+    def metadata(self, image_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._pyramid_dir(image_id), "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def thumbnail(self, image_id: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self._pyramid_dir(image_id), "thumbnail.jpg"), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def tile(self, image_id: str, level: int, column: int, row: int) -> Optional[bytes]:
+        """
+        Return the encoded tile at (column, row) of `level`, or None if the
+        pyramid is not ready or the tile is out of range. Blocking; call it
+        through asyncio.to_thread from async routes.
+        """
+        pyramid_dir = self._pyramid_dir(image_id)
+        meta = self.metadata(image_id)
+        if meta is None:
+            return None
+        # Keyed by build: a tile cut while a rebuild swaps the pyramid can only land under the old ID
+        cache_path = os.path.join(
+            self.tiles.directory, image_id, meta.get("build_id", "0"), str(level), f"{column}_{row}.jpg"
+        )
+        cached = self.tiles.get(cache_path)
+        if cached is not None:
+            return cached
+
+        try:
+            pixels = np.load(os.path.join(pyramid_dir, f"level_{level}.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        bounds = self._tile_bounds(pixels.shape, column, row)
+        if bounds is None:
+            return None
+        top, bottom, left, right = bounds
+
+        # Slicing the memory map reads only the rows covered by this tile
+        tile = Image.fromarray(np.ascontiguousarray(pixels[top:bottom, left:right]))
+        buffer = io.BytesIO()
+        tile.save(buffer, TILE_FORMAT, quality=TILE_QUALITY)
+        data = buffer.getvalue()
+
+        self.tiles.put(cache_path, data)
+        return data
+
+    @staticmethod
+    def _tile_bounds(shape: Tuple[int, ...], column: int, row: int) -> Optional[Tuple[int, int, int, int]]:
+        height, width = shape[0], shape[1]
+        left, top = column * TILE_SIZE, row * TILE_SIZE
+        if column < 0 or row < 0 or left >= width or top >= height:
+            return None
+        return top, min(top + TILE_SIZE, height), left, min(left + TILE_SIZE, width)
+
+
+image_tile_cache: Optional[ImageTileCache] = None
+_image_tile_cache_lock = threading.Lock()
+
+
+def get_image_tile_cache() -> ImageTileCache:
+    """The shared tile cache, created (with its directories) on first use"""
+    global image_tile_cache
+    if image_tile_cache is None:
+        with _image_tile_cache_lock:
+            if image_tile_cache is None:
+                image_tile_cache = ImageTileCache()
+    return image_tile_cache
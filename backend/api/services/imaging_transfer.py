@@ -0,0 +1,193 @@
+"""
+Streaming transfers for large imaging files
+
+Radiographs and CBCT volumes can be hundreds of megabytes, so uploads are
+written to disk chunk by chunk while their checksum is computed, and
+downloads are served from disk in chunks with byte-range support. No
+transfer ever holds a whole file in memory.
+
+The number of concurrent transfers per worker is bounded by a
+TransferLimiter; requests beyond the limit fail fast with a 503 instead of
+queueing up and exhausting memory or disk bandwidth.
+
+Usage in a router:
+
+    @router.put("/{image_id}/content")
+    async def upload_image(image_id: str, request: Request):
+        async with upload_limiter.slot():
+            stored = await stream_body_to_file(request, image_path(image_id))
+        return {"size": stored.size, "sha256": stored.sha256}
+
+    @router.get("/{image_id}/content")
+    async def download_image(image_id: str):
+        return ranged_file_response(image_path(image_id), limiter=download_limiter)
+"""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, Request, status
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 1024 * 1024
+MAX_IMAGE_BYTES = 2 * 1024 * 1024 * 1024  # CBCT volumes can exceed 1GB
+
+
+@dataclass
+class StoredFile:
+    path: str
+    size: int
+    sha256: str
+
+
+class TransferLimiter:
+    """
+    Caps the number of concurrent transfers in this worker. A plain counter
+    is enough because it is only touched from the event loop.
+    """
+
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.active = 0
+
+    def acquire(self) -> None:
+        if self.active >= self.max_concurrent:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Too many concurrent {self.name} transfers, please retry shortly",
+                headers={"Retry-After": "5"}
+            )
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+async def _write_chunks(
+    chunks: AsyncIterator[bytes],
+    destination: str,
+    max_bytes: int,
+    expected_sha256: Optional[str] = None
+) -> StoredFile:
+    """
+    Write chunks to a temporary file and move it into place only once the
+    size and checksum are known to be good, so a failed upload never
+    replaces an existing image.
+    """
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    tmp_path = f"{destination}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(tmp_path, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds the maximum size of {max_bytes} bytes"
+                    )
+                digest.update(chunk)
+                # Disk writes run in a thread so the event loop keeps serving
+                await asyncio.to_thread(f.write, chunk)
+            await asyncio.to_thread(os.fsync, f.fileno())
+        if expected_sha256 and expected_sha256.lower() != digest.hexdigest():
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Uploaded file does not match the expected SHA-256 checksum"
+            )
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return StoredFile(path=destination, size=size, sha256=digest.hexdigest())
+
+
+async def stream_body_to_file(
+    request: Request,
+    destination: str,
+    max_bytes: int = MAX_IMAGE_BYTES,
+    expected_sha256: Optional[str] = None
+) -> StoredFile:
+    """
+    Stream a raw request body (application/octet-stream) to disk. If
+    `expected_sha256` is given the upload is rejected when it does not
+    match, and any existing file at `destination` is left untouched.
+
+    This is the streaming ingestion path. Multipart uploads (UploadFile) are
+    spooled to a temporary file by the framework before the handler runs, so
+    large images should be sent as a raw body instead.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the maximum size of {max_bytes} bytes"
+        )
+
+    return await _write_chunks(request.stream(), destination, max_bytes, expected_sha256)
+
+
+class LimitedFileResponse(FileResponse):
+    """
+    FileResponse that holds a transfer slot only while it is being sent, and
+    releases it when sending ends, even on disconnect. A response that is
+    built but never sent never takes a slot.
+    """
+
+    def __init__(self, *args, limiter: TransferLimiter, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Raised before anything is sent, so the 503 still reaches the client
+        self.limiter.acquire()
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+
+def ranged_file_response(
+    path: str,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+    limiter: Optional[TransferLimiter] = None
+) -> FileResponse:
+    """
+    Serve a stored image from disk. FileResponse streams the file in chunks,
+    answers Range requests with 206 responses, and uses the server's
+    zero-copy pathsend extension when available.
+
+    With a `limiter`, the transfer slot is held until the body has been sent.
+    """
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image file not found")
+
+    options = {
+        "filename": filename,
+        "media_type": media_type or "application/octet-stream",
+        "headers": {"Accept-Ranges": "bytes"}
+    }
+    if limiter is None:
+        return FileResponse(path, **options)
+
+    return LimitedFileResponse(path, limiter=limiter, **options)
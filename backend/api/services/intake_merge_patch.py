@@ -0,0 +1,166 @@
+"""
+JSON Merge Patch (RFC 7396) support for patient intake forms
+
+Merge patches are compiled into SQL expressions built from the JSONB ``||``
+and ``-`` operators and ``jsonb_set`` so the database applies them in place;
+the full form document never round-trips through the application.
+
+Changed paths are detected by comparing the patch's leaf values in SQL, which
+is enough to record exactly what a patch changed and to skip no-op writes.
+The version snapshot is copied from the updated row with INSERT ... SELECT,
+so it is complete without reading the form back either.
+"""
+
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import String, case, func, insert, literal, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import Session
+
+from backend.api.models.patient_intake import PatientIntakeForm, PatientIntakeVersioning
+
+# Top-level JSONB sections a merge patch may touch
+JSONB_SECTIONS = ("personal_info", "medical_history", "dental_history", "insurance_info", "emergency_contact")
+NON_NULLABLE_SECTIONS = ("personal_info",)
+# Form columns recorded in each version snapshot
+SNAPSHOT_FIELDS = JSONB_SECTIONS + ("consent", "is_completed")
+
+
+def _jsonb(value: Any):
+    return literal(value, type_=JSONB)
+
+
+def merge_patch_expression(target, patch: Any):
+    """
+    Build a SQL expression equal to MergePatch(target, patch) as defined in
+    RFC 7396, where `target` is a JSONB SQL expression.
+    """
+    if not isinstance(patch, dict):
+        return _jsonb(patch)
+
+    # A non-object target is replaced by an empty object before merging
+    result = case(
+        (func.jsonb_typeof(target) == "object", target),
+        else_=_jsonb({})
+    )
+
+    removed = [key for key, value in patch.items() if value is None]
+    replaced = {key: value for key, value in patch.items() if value is not None and not isinstance(value, dict)}
+    nested = {key: value for key, value in patch.items() if isinstance(value, dict)}
+
+    if removed:
+        result = result.op("-", return_type=JSONB)(literal(removed, type_=ARRAY(String)))
+    if replaced:
+        result = result.op("||", return_type=JSONB)(_jsonb(replaced))
+    for key, value in nested.items():
+        child = merge_patch_expression(target.op("->", return_type=JSONB)(key), value)
+        result = func.jsonb_set(result, literal([key], type_=ARRAY(String)), child, True, type_=JSONB)
+
+    return result
+
+
+def leaf_paths(patch: Dict[str, Any], prefix: Tuple[str, ...] = ()) -> List[Tuple[Tuple[str, ...], Any]]:
+    """List the (path, value) pairs a merge patch sets or removes"""
+    leaves = []
+    for key, value in patch.items():
+        path = prefix + (key,)
+        if isinstance(value, dict) and value:
+            leaves.extend(leaf_paths(value, path))
+        else:
+            leaves.append((path, value))
+    return leaves
+
+
+def changed_paths(
+    db: Session,
+    intake_form_id: str,
+    section_patches: Dict[str, Any],
+    values: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """
+    Return the dotted paths whose value a merge patch would actually change,
+    followed by the plain columns in `values` whose stored value differs.
+
+    The comparison runs in the database, so only one boolean per leaf path is
+    read back. The form row stays locked until the surrounding transaction ends.
+    """
+    leaves = []
+    for section, patch in section_patches.items():
+        if isinstance(patch, dict) and patch:
+            leaves.extend(((section,) + path, value) for path, value in leaf_paths(patch))
+        else:
+            leaves.append(((section,), patch))
+
+    values = values or {}
+    if not leaves and not values:
+        return []
+
+    comparisons = []
+    for path, value in leaves:
+        column = getattr(PatientIntakeForm, path[0])
+        current = column[path[1:]] if len(path) > 1 else column
+        if value is None:
+            # Removing a key also changes the document when a parent the patch
+            # descends through is not an object: merge patch replaces it with {}
+            parents = [column[path[1:depth]] if depth > 1 else column for depth in range(1, len(path))]
+            comparisons.append(or_(
+                current.isnot(None),
+                *[func.jsonb_typeof(parent).is_distinct_from("object") for parent in parents]
+            ))
+        elif value == {}:
+            # An empty object only changes a value that is not already an object
+            comparisons.append(func.jsonb_typeof(current).is_distinct_from("object"))
+        else:
+            comparisons.append(current.is_distinct_from(_jsonb(value)))
+    for field, value in values.items():
+        comparisons.append(getattr(PatientIntakeForm, field).is_distinct_from(value))
+
+    flags = db.execute(
+        select(*comparisons)
+        .where(PatientIntakeForm.id == intake_form_id)
+        .with_for_update()
+    ).one()
+
+    names = [".".join(path) for path, _ in leaves] + list(values)
+    return [name for name, changed in zip(names, flags) if changed]
+
+
+def apply_merge_patch(db: Session, intake_form_id: str, section_patches: Dict[str, Any], values: Dict[str, Any]) -> None:
+    """
+    Apply per-section merge patches, plus plain column `values`, to an intake
+    form with a single UPDATE statement.
+    """
+    for section, patch in section_patches.items():
+        if patch is None and section in NON_NULLABLE_SECTIONS:
+            raise ValueError(f"'{section}' cannot be removed")
+
+    update_values = dict(values)
+    for section, patch in section_patches.items():
+        update_values[section] = merge_patch_expression(getattr(PatientIntakeForm, section), patch) \
+            if patch is not None else None
+
+    db.query(PatientIntakeForm)\
+        .filter(PatientIntakeForm.id == intake_form_id)\
+        .update(update_values, synchronize_session=False)
+
+
+def insert_version_snapshot(db: Session, intake_form_id: str, version_values: Dict[str, Any]) -> None:
+    """
+    Insert a PatientIntakeVersioning row whose `form_data` is a snapshot of
+    the form as it stands in this transaction (i.e. after the patch).
+    """
+    columns = PatientIntakeVersioning.__table__.c
+    snapshot = func.jsonb_build_object(*chain.from_iterable(
+        (literal(field), getattr(PatientIntakeForm, field)) for field in SNAPSHOT_FIELDS
+    ))
+    names = list(version_values)
+    db.execute(
+        insert(PatientIntakeVersioning).from_select(
+            names + ["form_data"],
+            select(
+                *[literal(version_values[name], type_=columns[name].type) for name in names],
+                snapshot
+            ).where(PatientIntakeForm.id == intake_form_id)
+        )
+    )
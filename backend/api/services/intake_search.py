@@ -0,0 +1,191 @@
+"""
+Patient intake search
+
+Compiles a small filter language over the JSONB sections of
+PatientIntakeForm into SQL. ``eq`` and ``in`` filters are served by the GIN
+and expression indexes created in migration a3c7e1f09d42; ``exists`` is not
+(see below).
+
+A filter addresses a value with a dotted path whose first segment is the
+section name. A ``[]`` suffix on a segment means "any element of this array":
+
+    {"field": "medical_history.has_diabetes", "op": "eq", "value": true}
+    {"field": "medical_history.medications[].is_anticoagulant", "value": true}
+    {"field": "insurance_info.provider", "op": "in", "value": ["Delta Dental", "Cigna"]}
+    {"field": "dental_history.last_cleaning_date", "op": "exists"}
+
+``eq`` and ``in`` compile to JSONB containment (``@>``), which is served by
+the ``jsonb_path_ops`` GIN index on each section. Equality on the hot keys
+listed in EXPRESSION_INDEXED_PATHS compiles to a ``->>`` comparison instead so
+the btree expression indexes are used. Scalar values match exactly and
+case-sensitively. Object and array values match by containment, so the
+stored value may have extra keys or elements:
+``{"field": "medical_history.medications[]", "value": {"name": "Warfarin"}}``
+matches any medication entry named Warfarin, whatever its other keys.
+
+``exists`` compiles to a ``#>`` path lookup, which no index serves. The
+``jsonb_path_ops`` GIN index has no entries for bare keys, so ``@?`` cannot
+use it either. Combined with an indexed filter under match='all', it is
+checked only on the rows that filter finds. On its own, or under
+match='any', it scans the whole table.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.orm import Query, Session, load_only
+
+from backend.api.models.patient_intake import PatientIntakeForm
+
+SEARCHABLE_SECTIONS = ("medical_history", "dental_history", "insurance_info")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# (section, key) pairs backed by a btree expression index on (section ->> key)
+EXPRESSION_INDEXED_PATHS = {
+    ("medical_history", "has_diabetes"),
+    ("insurance_info", "provider"),
+    ("insurance_info", "member_id"),
+}
+
+
+class IntakeSearchFilter(BaseModel):
+    """A single predicate over an intake JSONB section"""
+    field: str = Field(..., description="Dotted path, e.g. 'medical_history.medications[].name'")
+    op: Literal["eq", "in", "exists"] = "eq"
+    value: Any = None
+
+
+class IntakeSearchRequest(BaseModel):
+    """Search request body; all filters must match unless match='any'"""
+    filters: List[IntakeSearchFilter] = Field(..., min_items=1)
+    match: Literal["all", "any"] = "all"
+    limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = Field(None, description="next_cursor from the previous page")
+
+
+def _parse_field(field: str) -> Tuple[str, List[Tuple[str, bool]]]:
+    """Split a dotted path into its section and (key, is_array) segments"""
+    parts = field.split(".")
+    section = parts[0]
+    if section not in SEARCHABLE_SECTIONS:
+        raise ValueError(
+            f"Field '{field}' must start with one of: {', '.join(SEARCHABLE_SECTIONS)}"
+        )
+
+    segments = []
+    for part in parts[1:]:
+        is_array = part.endswith("[]")
+        key = part[:-2] if is_array else part
+        if not key:
+            raise ValueError(f"Field '{field}' contains an empty path segment")
+        segments.append((key, is_array))
+
+    if not segments:
+        raise ValueError(f"Field '{field}' must reference a key inside '{section}'")
+    return section, segments
+
+
+def _containment_document(segments: List[Tuple[str, bool]], value: Any) -> Dict[str, Any]:
+    """Build the JSONB document that contains `value` at the given path"""
+    document = value
+    for key, is_array in reversed(segments):
+        document = {key: [document] if is_array else document}
+    return document
+
+
+def _equals(section: str, segments: List[Tuple[str, bool]], value: Any):
+    """Compile an equality predicate, preferring an expression index when one exists"""
+    column = getattr(PatientIntakeForm, section)
+    if len(segments) == 1 and not segments[0][1] and (section, segments[0][0]) in EXPRESSION_INDEXED_PATHS:
+        # ->> renders booleans as 'true'/'false' and strings unquoted
+        if isinstance(value, bool):
+            return column[segments[0][0]].astext == ("true" if value else "false")
+        if isinstance(value, str):
+            return column[segments[0][0]].astext == value
+    return column.contains(_containment_document(segments, value))
+
+
+def compile_filters(filters: List[IntakeSearchFilter], match: str = "all"):
+    """Compile search filters into a SQLAlchemy boolean clause"""
+    clauses = []
+
+    for search_filter in filters:
+        section, segments = _parse_field(search_filter.field)
+        column = getattr(PatientIntakeForm, section)
+
+        if search_filter.op == "exists":
+            if any(is_array for _, is_array in segments):
+                raise ValueError("'exists' filters cannot traverse arrays")
+            clauses.append(column[tuple(key for key, _ in segments)].isnot(None))
+        elif search_filter.op == "in":
+            if not isinstance(search_filter.value, list) or not search_filter.value:
+                raise ValueError(f"'in' filter on '{search_filter.field}' requires a non-empty list")
+            clauses.append(or_(*[_equals(section, segments, option) for option in search_filter.value]))
+        else:
+            clauses.append(_equals(section, segments, search_filter.value))
+
+    return and_(*clauses) if match == "all" else or_(*clauses)
+
+
+def encode_cursor(created_at: datetime, form_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{form_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        created_at, form_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), form_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid pagination cursor")
+
+
+def build_search_query(db: Session, request: IntakeSearchRequest) -> Query:
+    """
+    Build the search query, newest forms first, keyset-paginated on
+    (created_at, id). Only summary columns are loaded.
+    """
+    query = db.query(PatientIntakeForm)\
+        .options(load_only(
+            PatientIntakeForm.id,
+            PatientIntakeForm.patient_id,
+            PatientIntakeForm.is_completed,
+            PatientIntakeForm.created_at,
+            PatientIntakeForm.updated_at
+        ))\
+        .filter(compile_filters(request.filters, request.match))
+
+    if request.cursor:
+        created_at, form_id = decode_cursor(request.cursor)
+        query = query.filter(
+            tuple_(PatientIntakeForm.created_at, PatientIntakeForm.id) < tuple_(created_at, form_id)
+        )
+
+    return query\
+        .order_by(PatientIntakeForm.created_at.desc(), PatientIntakeForm.id.desc())\
+        .limit(request.limit + 1)
+
+
+def search_intake_forms(db: Session, request: IntakeSearchRequest) -> Dict[str, Any]:
+    """Run an intake search and return one page of results"""
+    rows = build_search_query(db, request).all()
+
+    has_more = len(rows) > request.limit
+    rows = rows[:request.limit]
+
+    return {
+        "results": [{
+            "id": form.id,
+            "patient_id": form.patient_id,
+            "is_completed": form.is_completed,
+            "created_at": form.created_at,
+            "updated_at": form.updated_at
+        } for form in rows],
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    }
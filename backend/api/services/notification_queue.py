@@ -0,0 +1,259 @@
+"""
+Claimed due-time queue for scheduled notifications
+
+Reminders are rows in ``scheduled_notifications`` (see
+models/scheduled_notification.py), indexed on due_at for pending rows only,
+so finding due work costs the same with ten rows or ten million.
+
+A dispatcher repeatedly:
+
+1. claims up to `batch_size` due rows in one statement
+   (``SELECT ... ORDER BY due_at LIMIT n FOR UPDATE SKIP LOCKED`` feeding an
+   ``UPDATE ... SET status = 'claimed'``), so concurrent dispatchers never
+   take the same row and never wait on each other;
+2. confirms it still leads (when run under a WorkerLeader) and releases the
+   batch untouched if it does not, so a demoted worker sends nothing;
+3. hands the whole batch to `send` and records the outcome with one UPDATE
+   for the sent rows and one for the failures (retried with exponential
+   backoff until `max_attempts`).
+
+When nothing is due it sleeps until the next due_at (read from the same
+partial index) or `max_idle` seconds, whichever is sooner. Claims older than
+`lease_seconds` belong to a dispatcher that died mid-batch and are returned
+to the queue, so delivery is at least once.
+
+    dispatcher = NotificationDispatcher(send=deliver_batch, leader=scheduler_leader)
+    await dispatcher.start()
+    ...
+    dispatcher.stats()  # lag, throughput and totals for health checks
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database import engine
+from ..models.scheduled_notification import ScheduledNotification
+from .worker_leader import WorkerLeader
+
+logger = logging.getLogger(__name__)
+
+# Returns {notification id: error message} for the rows that could not be sent
+SendBatch = Callable[[List[Dict[str, Any]]], Awaitable[Dict[int, str]]]
+
+CLAIM_SQL = text("""
+    WITH due AS (
+        SELECT id FROM scheduled_notifications
+        WHERE status = 'pending' AND due_at <= now()
+        ORDER BY due_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE scheduled_notifications AS n
+    SET status = 'claimed', claimed_at = now(), claimed_by = :worker, attempts = n.attempts + 1
+    FROM due
+    WHERE n.id = due.id
+    RETURNING n.id, n.patient_id, n.channel, n.template, n.payload, n.due_at, n.attempts,
+              EXTRACT(EPOCH FROM now() - n.due_at) AS lag_seconds
+""")
+
+MARK_SENT_SQL = text("""
+    UPDATE scheduled_notifications
+    SET status = 'sent', sent_at = now(), last_error = NULL
+    WHERE id = ANY(:ids) AND status = 'claimed' AND claimed_by = :worker
+""")
+
+MARK_FAILED_SQL = text("""
+    UPDATE scheduled_notifications AS n
+    SET status = CASE WHEN n.attempts >= :max_attempts THEN 'failed' ELSE 'pending' END,
+        due_at = CASE WHEN n.attempts >= :max_attempts THEN n.due_at
+                      ELSE now() + make_interval(secs => :backoff * power(2, n.attempts - 1)) END,
+        claimed_at = NULL,
+        claimed_by = NULL,
+        last_error = f.error
+    FROM unnest(CAST(:ids AS bigint[]), CAST(:errors AS text[])) AS f(id, error)
+    WHERE n.id = f.id AND n.status = 'claimed' AND n.claimed_by = :worker
+""")
+
+RELEASE_SQL = text("""
+    UPDATE scheduled_notifications
+    SET status = 'pending', claimed_at = NULL, claimed_by = NULL, attempts = attempts - 1
+    WHERE id = ANY(:ids) AND status = 'claimed' AND claimed_by = :worker
+""")
+
+RECLAIM_EXPIRED_SQL = text("""
+    UPDATE scheduled_notifications
+    SET status = 'pending', claimed_at = NULL, claimed_by = NULL
+    WHERE status = 'claimed' AND claimed_at < now() - make_interval(secs => :lease)
+""")
+
+NEXT_DUE_SQL = text("""
+    SELECT EXTRACT(EPOCH FROM min(due_at) - now())
+    FROM scheduled_notifications
+    WHERE status = 'pending'
+""")
+
+
+def schedule_notifications(db: Session, notifications: Iterable[Dict[str, Any]]) -> None:
+    """
+    Enqueue notifications in one INSERT; the caller commits. Rows with a
+    `dedupe_key` that is already queued are skipped.
+    """
+    rows = list(notifications)
+    if not rows:
+        return
+    statement = insert(ScheduledNotification.__table__).values(rows)
+    db.execute(statement.on_conflict_do_nothing(index_elements=["dedupe_key"]))
+
+
+class NotificationDispatcher:
+    """Claims due notifications in batches and sends them"""
+
+    def __init__(
+        self,
+        send: SendBatch,
+        leader: Optional[WorkerLeader] = None,
+        batch_size: int = 500,
+        max_idle: float = 5.0,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 5,
+        retry_backoff: float = 60.0,
+        throughput_window: float = 60.0
+    ):
+        self.send = send
+        self.leader = leader
+        self.batch_size = batch_size
+        self.max_idle = max_idle
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.throughput_window = throughput_window
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.sent_total = 0
+        self.failed_total = 0
+        self.batches_total = 0
+        self.last_lag_seconds = 0.0
+        self._sent_times: Deque[Tuple[float, int]] = deque()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop after the batch in flight (if any) has been recorded"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        last_reclaim = 0.0
+        while True:
+            try:
+                if self.leader is not None and not await self.leader.still_leader():
+                    await asyncio.sleep(self.max_idle)
+                    continue
+
+                if time.monotonic() - last_reclaim > self.lease_seconds / 2:
+                    reclaimed = await asyncio.to_thread(self._execute, RECLAIM_EXPIRED_SQL, {"lease": self.lease_seconds})
+                    if reclaimed:
+                        logger.warning(f"Returned {reclaimed} expired notification claims to the queue")
+                    last_reclaim = time.monotonic()
+
+                batch = await asyncio.to_thread(self._claim)
+                if not batch:
+                    await asyncio.sleep(await asyncio.to_thread(self._idle_delay))
+                    continue
+
+                # Leadership can be lost while claiming; a demoted worker sends nothing
+                if self.leader is not None and not await self.leader.still_leader():
+                    await asyncio.to_thread(
+                        self._execute, RELEASE_SQL, {"ids": [row["id"] for row in batch], "worker": self.worker_id}
+                    )
+                    continue
+
+                await self._dispatch(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification dispatch failed: {str(e)}")
+                await asyncio.sleep(self.max_idle)
+
+    async def _dispatch(self, batch: List[Dict[str, Any]]) -> None:
+        self.batches_total += 1
+        self.last_lag_seconds = max(float(row["lag_seconds"] or 0.0) for row in batch)
+        try:
+            failures = await self.send(batch) or {}
+        except Exception as e:
+            logger.error(f"Notification batch of {len(batch)} failed: {str(e)}")
+            failures = {row["id"]: str(e) for row in batch}
+
+        sent_ids = [row["id"] for row in batch if row["id"] not in failures]
+        # Record the outcome even if we are being cancelled, or the rows wait out their lease
+        await asyncio.shield(asyncio.to_thread(self._complete, sent_ids, failures))
+
+        self.sent_total += len(sent_ids)
+        self.failed_total += len(failures)
+        now = time.monotonic()
+        self._sent_times.append((now, len(sent_ids)))
+        while self._sent_times and self._sent_times[0][0] < now - self.throughput_window:
+            self._sent_times.popleft()
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        with engine.begin() as connection:
+            result = connection.execute(CLAIM_SQL, {"limit": self.batch_size, "worker": self.worker_id})
+            return [dict(row) for row in result.mappings()]
+
+    def _complete(self, sent_ids: List[int], failures: Dict[int, str]) -> None:
+        with engine.begin() as connection:
+            if sent_ids:
+                connection.execute(MARK_SENT_SQL, {"ids": sent_ids, "worker": self.worker_id})
+            if failures:
+                connection.execute(MARK_FAILED_SQL, {
+                    "ids": list(failures),
+                    "errors": [failures[notification_id] for notification_id in failures],
+                    "max_attempts": self.max_attempts,
+                    "backoff": self.retry_backoff,
+                    "worker": self.worker_id
+                })
+
+    def _idle_delay(self) -> float:
+        """Seconds until the next pending notification is due, capped at max_idle"""
+        with engine.connect() as connection:
+            seconds = connection.execute(NEXT_DUE_SQL).scalar()
+        if seconds is None:
+            return self.max_idle
+        return min(max(float(seconds), 0.0), self.max_idle)
+
+    @staticmethod
+    def _execute(statement, params: Dict[str, Any]) -> int:
+        with engine.begin() as connection:
+            return connection.execute(statement, params).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        recent = sum(count for at, count in self._sent_times if at >= now - self.throughput_window)
+        return {
+            "running": self.is_running,
+            "batches": self.batches_total,
+            "sent": self.sent_total,
+            "failed_attempts": self.failed_total,
+            "lag_seconds": round(self.last_lag_seconds, 3),
+            "sent_per_second": round(recent / self.throughput_window, 3)
+        }
@@ -0,0 +1,238 @@
+"""
+Realtime push hub
+
+WebSocket connections subscribe to per-patient topics (``patient:<id>``).
+Write paths publish small events to a topic, such as a new intake version
+or a change to a patient's medical alerts. Connected screens refetch only
+when something actually changed instead of polling.
+
+Events go through a broadcast backend so that every API worker sees every
+event:
+
+- InProcessBackend delivers directly to this worker's subscribers (single
+  worker, development).
+- PostgresNotifyBackend publishes with NOTIFY on one channel and runs a
+  LISTEN loop on a dedicated connection in every worker. Each worker
+  delivers what it receives to its own subscribers, including events it
+  published itself.
+
+Select the backend with DENTAMIND_REALTIME_BACKEND=memory|postgres.
+
+Events only say what changed. Clients refetch the resource, and the
+refetch must read from the primary (see db_routing.get_read_db), because a
+read replica may not have replayed the change yet.
+
+Each subscriber has a bounded queue. A subscriber that falls behind is
+disconnected rather than allowed to slow down publishers; on reconnect its
+screen refetches once.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..database import engine, get_db
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "dentamind_realtime"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD = 7900
+
+
+def patient_topic(patient_id: str) -> str:
+    return f"patient:{patient_id}"
+
+
+class Subscriber:
+    """One connection's queue of serialized events"""
+
+    def __init__(self, max_pending: int = 100):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.topics: Set[str] = set()
+        self.closed = False
+
+    def offer(self, message: str) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind; the screen refetches once it reconnects
+            self.close()
+
+    def close(self) -> None:
+        """Discard pending events and wake the connection with a None sentinel"""
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class InProcessBackend:
+    """Delivers published events to this worker only"""
+
+    def __init__(self):
+        self.hub: Optional["RealtimeHub"] = None
+
+    async def start(self, hub: "RealtimeHub") -> None:
+        self.hub = hub
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, topic: str, message: str, db: Optional[Session] = None) -> None:
+        self.hub.deliver(topic, message)
+
+
+class PostgresNotifyBackend:
+    """Fans events out to all workers through PostgreSQL LISTEN/NOTIFY"""
+
+    def __init__(self, channel: str = NOTIFY_CHANNEL, poll_interval: float = 1.0):
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.hub: Optional["RealtimeHub"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    async def start(self, hub: "RealtimeHub") -> None:
+        self.hub = hub
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="realtime-listener", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, self.poll_interval * 2)
+            self._thread = None
+
+    def publish(self, topic: str, message: str, db: Optional[Session] = None) -> None:
+        payload = json.dumps({"topic": topic, "message": message}, separators=(",", ":"))
+        if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+            logger.error(f"Realtime event for {topic} too large for NOTIFY ({len(payload)} bytes); dropped")
+            return
+        owns_session = db is None
+        db_generator = get_db() if owns_session else None
+        if owns_session:
+            db = next(db_generator)
+        try:
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+            db.commit()
+        finally:
+            if owns_session:
+                db_generator.close()
+
+    def _listen(self) -> None:
+        """LISTEN on a dedicated raw connection; reconnects after errors"""
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                dbapi_connection = connection.dbapi_connection if hasattr(connection, "dbapi_connection") else connection.connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                logger.info(f"Realtime listener subscribed to {self.channel}")
+
+                while not self._stopping.is_set():
+                    if select.select([dbapi_connection], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notify = dbapi_connection.notifies.pop(0)
+                        event = json.loads(notify.payload)
+                        self._loop.call_soon_threadsafe(self.hub.deliver, event["topic"], event["message"])
+            except Exception as e:
+                logger.warning(f"Realtime listener error, reconnecting: {str(e)}")
+                self._stopping.wait(self.poll_interval)
+            finally:
+                if connection is not None:
+                    # The session is still listening; do not hand it back to the pool
+                    try:
+                        connection.invalidate()
+                    except Exception:
+                        pass
+
+
+class RealtimeHub:
+    """Topic subscriptions for this worker plus a broadcast backend"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or InProcessBackend()
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self.delivered = 0
+        self.dropped_subscribers = 0
+
+    @classmethod
+    def from_env(cls) -> "RealtimeHub":
+        kind = os.getenv("DENTAMIND_REALTIME_BACKEND", "memory").lower()
+        return cls(PostgresNotifyBackend() if kind == "postgres" else InProcessBackend())
+
+    async def start(self) -> None:
+        await self.backend.start(self)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+        for subscribers in list(self._topics.values()):
+            for subscriber in list(subscribers):
+                subscriber.close()
+        self._topics.clear()
+
+    def subscribe(self, subscriber: Subscriber, topic: str) -> None:
+        self._topics.setdefault(topic, set()).add(subscriber)
+        subscriber.topics.add(topic)
+
+    def unsubscribe(self, subscriber: Subscriber, topic: Optional[str] = None) -> None:
+        for name in [topic] if topic else list(subscriber.topics):
+            subscribers = self._topics.get(name)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[name]
+            subscriber.topics.discard(name)
+
+    def deliver(self, topic: str, message: str) -> None:
+        """Hand a serialized event to this worker's subscribers of `topic`"""
+        for subscriber in list(self._topics.get(topic, ())):
+            subscriber.offer(message)
+            if subscriber.closed:
+                self.dropped_subscribers += 1
+                self.unsubscribe(subscriber)
+            else:
+                self.delivered += 1
+
+    def publish(self, topic: str, event: Dict[str, Any], db: Optional[Session] = None) -> None:
+        """
+        Publish an event to every worker. Call after the write has been
+        committed; errors are logged so a failed push never fails the write.
+        """
+        try:
+            message = json.dumps({"topic": topic, **event}, default=str, separators=(",", ":"))
+            self.backend.publish(topic, message, db)
+        except Exception as e:
+            logger.error(f"Error publishing realtime event to {topic}: {str(e)}")
+
+    def publish_patient_event(self, patient_id: str, event_type: str, db: Optional[Session] = None, **data) -> None:
+        self.publish(patient_topic(patient_id), {"type": event_type, "patient_id": patient_id, **data}, db)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "topics": len(self._topics),
+            "subscriptions": sum(len(subscribers) for subscribers in self._topics.values()),
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped_subscribers
+        }
+
+
+realtime_hub = RealtimeHub.from_env()
@@ -0,0 +1,146 @@
+"""
+Worker leader election
+
+Elects a single leader among all API workers, across processes and hosts,
+by holding a PostgreSQL session-level advisory lock on a dedicated database
+connection. Followers periodically retry, so leadership moves to another worker
+when the leader exits or loses its database connection.
+
+Used to run singleton background services such as the notification
+scheduler in exactly one worker.
+
+All database calls run in a thread so the event loop never waits on the
+lock connection. The leader checks its connection every
+`heartbeat_interval` seconds and steps down on the first failure. Once the
+connection is gone, another worker can take the lock before the old leader
+notices, so singleton jobs should call `still_leader()` before each unit of
+work instead of relying on `is_leader` alone.
+"""
+
+import asyncio
+import logging
+import threading
+import zlib
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+
+from ..database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerLeader:
+    """Runs `on_elected` in the one worker that holds the named advisory lock"""
+
+    def __init__(
+        self,
+        name: str,
+        on_elected: Callable[[], Awaitable[None]],
+        on_demoted: Callable[[], Awaitable[None]],
+        check_interval: float = 15.0,
+        heartbeat_interval: float = 5.0
+    ):
+        self.name = name
+        # Advisory locks are keyed by a 64-bit integer
+        self.lock_key = zlib.crc32(name.encode())
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.check_interval = check_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.is_leader = False
+        self._connection = None
+        # The connection is used from worker threads; one call at a time
+        self._connection_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start contending for leadership in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop contending, stepping down first if this worker is the leader"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._step_down()
+
+    async def still_leader(self) -> bool:
+        """Confirm the lock connection is alive before doing leader-only work"""
+        if not self.is_leader:
+            return False
+        try:
+            await asyncio.to_thread(self._heartbeat)
+            return True
+        except Exception as e:
+            logger.warning(f"Lost leader connection for '{self.name}': {str(e)}")
+            await self._step_down()
+            return False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self.is_leader:
+                    await asyncio.to_thread(self._heartbeat)
+                elif await asyncio.to_thread(self._try_acquire):
+                    self.is_leader = True
+                    logger.info(f"Elected leader for '{self.name}'")
+                    await self.on_elected()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Leader check for '{self.name}' failed: {str(e)}")
+                await self._step_down()
+
+            await asyncio.sleep(self.heartbeat_interval if self.is_leader else self.check_interval)
+
+    def _heartbeat(self) -> None:
+        with self._connection_lock:
+            if self._connection is None:
+                raise RuntimeError("Leader connection was released")
+            # The lock is held for as long as the connection lives
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+
+    def _try_acquire(self) -> bool:
+        with self._connection_lock:
+            if self._connection is None:
+                # Keep one connection checked out so the session-level lock stays with this worker
+                self._connection = engine.connect()
+
+            acquired = self._connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            # Do not hold a transaction open while following or leading
+            self._connection.commit()
+            return bool(acquired)
+
+    async def _step_down(self) -> None:
+        if self.is_leader:
+            self.is_leader = False
+            logger.info(f"Stepping down as leader for '{self.name}'")
+            try:
+                await self.on_demoted()
+            except Exception as e:
+                logger.error(f"Error while stepping down for '{self.name}': {str(e)}")
+
+        if self._connection is not None:
+            await asyncio.to_thread(self._release)
+
+    def _release(self) -> None:
+        with self._connection_lock:
+            connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        # Invalidate rather than return the connection to the pool, which
+        # ends the database session and releases any lock it still holds
+        try:
+            connection.invalidate()
+            connection.close()
+        except Exception:
+            pass
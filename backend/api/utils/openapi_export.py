@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Export the OpenAPI schema to disk
+
+Imports the application (without starting a server), writes its OpenAPI
+schema as JSON and adds ``.gz``/``.br`` siblings. Run it as a build step so
+contract tooling can read the file instead of booting the app:
+
+    python -m backend.api.utils.openapi_export --output build/openapi.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Optional
+
+from .precompress_static import precompress_file
+
+
+def export_openapi(output: str, indent: Optional[int] = None) -> int:
+    """Write the schema to `output`; returns the number of bytes written"""
+    from ..main import app
+
+    body = json.dumps(app.openapi(), indent=indent, separators=None if indent else (",", ":")).encode()
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+    os.replace(tmp_path, output)
+
+    precompress_file(output)
+    return len(body)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write the DentaMind OpenAPI schema to a file")
+    parser.add_argument("--output", default="openapi.json", help="Path of the JSON file to write")
+    parser.add_argument("--indent", type=int, default=None, help="Pretty-print with this indent")
+    args = parser.parse_args()
+
+    size = export_openapi(args.output, args.indent)
+    print(f"Wrote {args.output} ({size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Precompress static assets
+
+Writes ``.gz`` and ``.br`` siblings next to every compressible file in a
+static directory, for PrecompressedStaticFiles to serve. Siblings that are
+newer than their source are left alone, and siblings that would not be
+smaller than the source are not written. Stale siblings are removed: those
+of files now below the minimum size, and ``.br`` siblings older than their
+source when brotli is unavailable to refresh them. Brotli output requires
+the optional ``brotli`` package.
+
+Usage:
+    python -m backend.api.utils.precompress_static static/
+"""
+
+import argparse
+import gzip
+import os
+import sys
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only .gz siblings are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".html", ".css", ".js", ".mjs", ".map", ".json", ".svg", ".txt", ".xml", ".wasm", ".ico", ".csv"
+}
+MIN_SIZE = 1024
+SIBLING_SUFFIXES = (".gz", ".br")
+
+
+def _write_if_smaller(path: str, data: bytes, source_size: int) -> bool:
+    if len(data) >= source_size:
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def remove_siblings(path: str, suffixes=SIBLING_SUFFIXES, older_than: Optional[float] = None) -> None:
+    """Delete compressed siblings of `path`, or only those older than `older_than`"""
+    for suffix in suffixes:
+        target = path + suffix
+        try:
+            if older_than is None or os.stat(target).st_mtime < older_than:
+                os.remove(target)
+        except FileNotFoundError:
+            pass
+
+
+def precompress_file(path: str) -> Dict[str, bool]:
+    """Write compressed siblings for one file; returns which ones were written"""
+    source_stat = os.stat(path)
+    written = {}
+
+    encoders = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders[".br"] = lambda data: brotli.compress(data, quality=11)
+    else:
+        # Cannot be refreshed, so it must not outlive its source
+        remove_siblings(path, [".br"], older_than=source_stat.st_mtime)
+
+    data = None
+    for suffix, encode in encoders.items():
+        target = path + suffix
+        if os.path.exists(target) and os.stat(target).st_mtime >= source_stat.st_mtime:
+            continue
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        written[suffix] = _write_if_smaller(target, encode(data), source_stat.st_size)
+    return written
+
+
+def precompress_directory(directory: str, min_size: int = MIN_SIZE) -> Dict[str, int]:
+    totals = {"files": 0, ".gz": 0, ".br": 0}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            extension = os.path.splitext(name)[1].lower()
+            if extension not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) < min_size:
+                remove_siblings(path)
+                continue
+
+            totals["files"] += 1
+            for suffix, was_written in precompress_file(path).items():
+                totals[suffix] += int(was_written)
+    return totals
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write .gz and .br siblings for static assets")
+    parser.add_argument("directory", nargs="?", default="static")
+    parser.add_argument("--min-size", type=int, default=MIN_SIZE, help="Skip files smaller than this many bytes")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Static directory not found: {args.directory}", file=sys.stderr)
+        return 1
+
+    if brotli is None:
+        print("brotli is not installed; writing .gz siblings only", file=sys.stderr)
+
+    totals = precompress_directory(args.directory, args.min_size)
+    print(f"Processed {totals['files']} files: {totals['.gz']} .gz and {totals['.br']} .br written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+On-demand sampling profiler and per-request SQL statistics
+
+SamplingProfiler runs a background thread that periodically reads the stacks
+of all threads with `sys._current_frames()`. A stack is attributed to a route
+when it contains that route's endpoint function, which works for async
+endpoints on the event loop as well as sync endpoints in the thread pool;
+stacks without an endpoint frame (idle loop, middleware) are not recorded.
+Samples are aggregated per route as collapsed stacks and can be exported in
+collapsed ("flamegraph.pl") or speedscope format.
+
+Sampling is active only while a time window is open or while at least one
+request carrying the profiling header is in flight, so it costs nothing
+otherwise. The header is ignored until header mode is switched on through
+the authenticated profiling endpoints.
+
+Query statistics come from SQLAlchemy Engine events: every statement
+executed while handling a request is counted and timed against that
+request, and statements repeated within one request (typical N+1 patterns)
+are reported per route.
+"""
+
+import contextvars
+import inspect
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_HEADER = "X-Profile"
+MAX_STACK_DEPTH = 128
+# Statements executed at least this often in one request are reported as repeated
+REPEATED_STATEMENT_THRESHOLD = 5
+
+FrameKey = Tuple[str, str, int]
+
+
+@dataclass
+class QueryStats:
+    """SQL statements executed while handling one request"""
+    count: int = 0
+    total_time: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+
+current_query_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "current_query_stats", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_query_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    if stats is None:
+        return
+    start_times = conn.info.get("query_start_time")
+    if start_times:
+        stats.total_time += time.perf_counter() - start_times.pop()
+    stats.count += 1
+    stats.statements[statement] += 1
+
+
+def start_query_stats() -> Tuple[QueryStats, contextvars.Token]:
+    """Begin collecting query statistics for the current request context"""
+    stats = QueryStats()
+    return stats, current_query_stats.set(stats)
+
+
+def stop_query_stats(token: contextvars.Token) -> None:
+    current_query_stats.reset(token)
+
+
+def route_label(route) -> str:
+    """Label a route by its methods and path, e.g. "GET /api/ping" """
+    methods = ",".join(sorted(m for m in (getattr(route, "methods", None) or []) if m != "HEAD"))
+    return f"{methods} {route.path}".strip()
+
+
+@dataclass
+class RouteQueryTotals:
+    requests: int = 0
+    queries: int = 0
+    query_time: float = 0.0
+    max_queries: int = 0
+    repeated_statements: Counter = field(default_factory=Counter)
+
+
+class SamplingProfiler:
+    """Stack-sampling profiler with per-route aggregation"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._window_until = 0.0
+        self._header_requests = 0
+        self.header_enabled = False
+        self._endpoint_routes: Dict[Any, str] = {}
+        self.samples: Dict[str, Counter] = defaultdict(Counter)
+        self.frames: Dict[FrameKey, int] = {}
+        self.query_totals: Dict[str, RouteQueryTotals] = defaultdict(RouteQueryTotals)
+        self.started_at: Optional[float] = None
+
+    def register_routes(self, routes) -> None:
+        """Map endpoint code objects to route labels such as "GET /api/ping" """
+        for route in routes:
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(inspect.unwrap(endpoint), "__code__", None) if endpoint else None
+            if code is None:
+                continue
+            self._endpoint_routes[code] = route_label(route)
+
+    @property
+    def active(self) -> bool:
+        return self._header_requests > 0 or time.monotonic() < self._window_until
+
+    def start_window(self, seconds: float) -> None:
+        with self._lock:
+            self._window_until = max(self._window_until, time.monotonic() + seconds)
+        self._ensure_thread()
+
+    def stop_window(self) -> None:
+        with self._lock:
+            self._window_until = 0.0
+
+    def request_started(self) -> None:
+        """Called for requests carrying the profiling header"""
+        with self._lock:
+            self._header_requests += 1
+        self._ensure_thread()
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self._header_requests -= 1
+
+    def record_queries(self, route: str, stats: QueryStats) -> None:
+        totals = self.query_totals[route]
+        totals.requests += 1
+        totals.queries += stats.count
+        totals.query_time += stats.total_time
+        totals.max_queries = max(totals.max_queries, stats.count)
+        for statement, count in stats.statements.items():
+            if count >= REPEATED_STATEMENT_THRESHOLD:
+                totals.repeated_statements[statement] = max(totals.repeated_statements[statement], count)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = defaultdict(Counter)
+            self.frames = {}
+            self.query_totals = defaultdict(RouteQueryTotals)
+            self.started_at = None
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self.started_at is None:
+                self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            # Checked under the lock so a request starting now either sees this
+            # thread alive or starts a new one
+            with self._lock:
+                if not self.active:
+                    self._thread = None
+                    return
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._sample(frame)
+            time.sleep(self.interval)
+
+    def _sample(self, frame) -> None:
+        stack: List[FrameKey] = []
+        route = None
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            route = self._endpoint_routes.get(code)
+            if route is not None:
+                break
+            frame = frame.f_back
+        if route is None:
+            return
+
+        with self._lock:
+            frame_ids = []
+            for key in reversed(stack):
+                frame_id = self.frames.get(key)
+                if frame_id is None:
+                    frame_id = self.frames[key] = len(self.frames)
+                frame_ids.append(frame_id)
+            self.samples[route][tuple(frame_ids)] += 1
+
+    def _snapshot(self, route: Optional[str]) -> Tuple[List[FrameKey], Dict[str, Counter]]:
+        """Copy frames (indexed by ID) and the selected routes' samples under the lock"""
+        with self._lock:
+            frames: List[FrameKey] = [None] * len(self.frames)
+            for key, frame_id in self.frames.items():
+                frames[frame_id] = key
+            samples = {
+                label: Counter(stacks) for label, stacks in self.samples.items()
+                if route is None or label == route
+            }
+        return frames, samples
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """Brendan Gregg's collapsed stack format, one "route;frame;frame count" per line"""
+        frames, samples = self._snapshot(route)
+        names = [f"{name} ({filename}:{line})" for name, filename, line in frames]
+        lines = []
+        for label, stacks in samples.items():
+            for stack, count in stacks.most_common():
+                lines.append(";".join([label] + [names[i] for i in stack]) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, route: Optional[str] = None) -> Dict[str, Any]:
+        """Speedscope file format with one sampled profile per route"""
+        frames, samples = self._snapshot(route)
+
+        profiles = []
+        for label, stacks in samples.items():
+            weights = [count * self.interval * 1000 for count in stacks.values()]
+            profiles.append({
+                "type": "sampled",
+                "name": label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": [list(stack) for stack in stacks],
+                "weights": weights
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name, "file": filename, "line": line} for name, filename, line in frames]},
+            "profiles": profiles,
+            "name": "DentaMind API profile",
+            "exporter": "backend.api.utils.profiling"
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        _, samples = self._snapshot(None)
+        routes = {}
+        for label in set(samples) | set(self.query_totals):
+            totals = self.query_totals.get(label) or RouteQueryTotals()
+            routes[label] = {
+                "samples": sum(samples[label].values()) if label in samples else 0,
+                "requests": totals.requests,
+                "avg_queries": totals.queries / totals.requests if totals.requests else 0.0,
+                "max_queries": totals.max_queries,
+                "avg_query_time_ms": totals.query_time / totals.requests * 1000 if totals.requests else 0.0,
+                "repeated_statements": [
+                    {"statement": statement, "max_per_request": count}
+                    for statement, count in totals.repeated_statements.most_common(10)
+                ]
+            }
+        return {
+            "active": self.active,
+            "interval_ms": self.interval * 1000,
+            "started_at": self.started_at,
+            "routes": dict(sorted(routes.items(), key=lambda item: -item[1]["samples"]))
+        }
+
+
+profiler = SamplingProfiler()
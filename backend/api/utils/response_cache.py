@@ -0,0 +1,223 @@
+"""
+Versioned in-process response cache
+
+Caches fully rendered JSON response bodies together with gzip and brotli
+encodings and a strong ETag, so read-mostly endpoints (such as educational
+content) are served from memory without touching the database or
+re-encoding anything.
+
+Every entry is stored under a content version. When the version changes
+(for example when content is re-seeded or edited), all older entries become
+misses. Each worker process has its own cache, so the version must come from
+a source every process sees. `SharedVersion` re-reads it from such a source
+(e.g. the ``seed_manifests`` row written by the deploy-time seed job) at most
+once per TTL. Workers therefore pick up a change within that TTL, without
+querying the database on every request. `set_version()` and `invalidate()`
+only affect the calling process.
+
+Usage in a router:
+
+    content_cache = VersionedResponseCache(
+        "educational-content",
+        version=SharedVersion(lambda: manifest_version(EDUCATIONAL_CONTENT_MANIFEST), ttl=30)
+    )
+
+    @router.get("/articles")
+    async def list_articles(request: Request, db: Session = Depends(get_db)):
+        return content_cache.respond(request, "articles", lambda: load_articles(db))
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def negotiate_encoding(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """
+    Pick the best content coding from `available` (in order of preference)
+    that the client accepts, honouring q=0 exclusions. Returns None for identity.
+    """
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+
+    for coding in available:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > 0:
+            return coding
+    return None
+
+
+@dataclass
+class CachedBody:
+    """A rendered response body with its precomputed encodings"""
+    identity: bytes
+    encoded: Dict[str, bytes]
+    etag: str
+    media_type: str = "application/json"
+
+    @classmethod
+    def build(cls, body: bytes, media_type: str = "application/json") -> "CachedBody":
+        encoded = {"gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            encoded["br"] = brotli.compress(body, quality=11)
+        # Only keep encodings that are actually smaller
+        encoded = {coding: data for coding, data in encoded.items() if len(data) < len(body)}
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return cls(identity=body, encoded=encoded, etag=etag, media_type=media_type)
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if self.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+        coding = negotiate_encoding(request.headers.get("accept-encoding", ""), ["br", "gzip"])
+        if coding in self.encoded:
+            headers["Content-Encoding"] = coding
+            return Response(content=self.encoded[coding], media_type=self.media_type, headers=headers)
+        return Response(content=self.identity, media_type=self.media_type, headers=headers)
+
+
+class SharedVersion:
+    """
+    Content version read from a shared source (database, Redis, ...) and
+    memoised for `ttl` seconds. If a refresh fails, the last known version
+    is kept and the source is retried after another TTL.
+    """
+
+    def __init__(self, load: Callable[[], Optional[str]], ttl: float = 30.0):
+        self.load = load
+        self.ttl = ttl
+        self._value: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> str:
+        now = time.monotonic()
+        if now < self._expires_at:
+            return self._value
+        with self._lock:
+            if now >= self._expires_at:
+                try:
+                    self._value = self.load() or ""
+                except Exception as e:
+                    logger.error(f"Error refreshing shared content version: {str(e)}")
+                self._expires_at = now + self.ttl
+        return self._value or ""
+
+    def refresh(self) -> None:
+        """Force the next call to re-read the shared source"""
+        self._expires_at = 0.0
+
+
+class VersionedResponseCache:
+    """
+    Bounded LRU of rendered responses keyed by (content version, key).
+
+    `version` may be a string or a zero-argument callable returning the
+    current content version (typically a `SharedVersion`). Entries of an
+    older version are dropped as soon as a new version is seen.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        version: Union[str, Callable[[], str]],
+        max_entries: int = 1024,
+        cache_control: str = "public, max-age=300, must-revalidate"
+    ):
+        self.name = name
+        self._version = version
+        self.max_entries = max_entries
+        self.cache_control = cache_control
+        self._entries: "OrderedDict[tuple, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seen_version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> str:
+        return self._version() if callable(self._version) else self._version
+
+    def set_version(self, version: str) -> None:
+        """Switch this process to a fixed content version and drop all cached bodies"""
+        with self._lock:
+            self._version = version
+            self._entries.clear()
+
+    def invalidate(self) -> None:
+        """
+        Drop this process's cached bodies. Other workers are unaffected;
+        change the shared version to invalidate everywhere.
+        """
+        with self._lock:
+            self._entries.clear()
+        if isinstance(self._version, SharedVersion):
+            self._version.refresh()
+
+    def get_or_render(self, key: str, render: Callable[[], Any]) -> CachedBody:
+        version = self.version
+        cache_key = (version, key)
+        with self._lock:
+            if version != self._seen_version:
+                self._entries.clear()
+                self._seen_version = version
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Render outside the lock; concurrent misses for one key are harmless
+        body = json.dumps(jsonable_encoder(render()), separators=(",", ":")).encode()
+        entry = CachedBody.build(body)
+
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request: Request, key: str, render: Callable[[], Any]) -> Response:
+        """Serve `key` from the cache, rendering it with `render` on a miss"""
+        return self.get_or_render(key, render).response(request, self.cache_control)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
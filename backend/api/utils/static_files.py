@@ -0,0 +1,90 @@
+"""
+Static file serving with precompressed variants and long-lived caching
+
+PrecompressedStaticFiles is a drop-in replacement for StaticFiles that:
+
+- serves a ``.br`` or ``.gz`` sibling of the requested file (generated by
+  ``python -m backend.api.utils.precompress_static``) when the client's
+  Accept-Encoding allows it, with ``Vary: Accept-Encoding``. A sibling
+  older than its source is stale (the source was edited without rerunning
+  the build step) and is ignored;
+- marks fingerprinted assets (e.g. ``app.3f9a1c2e.js``) as immutable for a
+  year and makes everything else revalidate via its ETag.
+
+Byte ranges, ETags and conditional requests are handled by Starlette's
+FileResponse, which also uses the server's zero-copy ``pathsend`` extension
+when available. Range requests are always served from the uncompressed file.
+"""
+
+import mimetypes
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .response_cache import negotiate_encoding
+
+# Encodings in order of preference, with the suffix of their precompressed sibling
+PRECOMPRESSED_ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+# name.<8+ hex chars>.ext or name-<8+ hex chars>.ext, as emitted by bundlers
+FINGERPRINT_PATTERN = re.compile(r"[.-][0-9a-fA-F]{8,}\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that prefers precompressed siblings and sets cache headers"""
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL
+            if FINGERPRINT_PATTERN.search(os.path.basename(full_path)) else REVALIDATE_CACHE_CONTROL
+        }
+
+        sibling_stats = {}
+        for coding, suffix in PRECOMPRESSED_ENCODINGS.items():
+            try:
+                sibling_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if sibling_stat.st_mtime >= stat_result.st_mtime:
+                sibling_stats[coding] = sibling_stat
+        available = list(sibling_stats)
+        if available:
+            headers["Vary"] = "Accept-Encoding"
+
+        coding = None
+        if available and "range" not in request_headers:
+            coding = negotiate_encoding(request_headers.get("accept-encoding", ""), available)
+
+        if coding is not None:
+            encoded_path = full_path + PRECOMPRESSED_ENCODINGS[coding]
+            headers["Content-Encoding"] = coding
+            response = FileResponse(
+                encoded_path,
+                status_code=status_code,
+                headers=headers,
+                # Content type of the original file, not of the .br/.gz sibling
+                media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+                stat_result=sibling_stats[coding]
+            )
+        else:
+            response = FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Availability index benchmark
+
+Builds an availability index for thousands of providers and chairs with a
+realistic booking density, then times multi-resource searches such as
+"next 90-minute slot with any hygienist and chair 3 in the next 6 weeks".
+
+Usage:
+    python -m backend.benchmarks.bench_availability_index --providers 2000 --chairs 1000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from backend.api.services.availability_index import AvailabilityIndex
+
+
+def populate(index: AvailabilityIndex, resources, utilization: float, rng: random.Random) -> int:
+    """Book random 30-120 minute appointments until each resource reaches `utilization`"""
+    bookings = 0
+    open_minutes_per_day = 12 * 60
+    for resource_id in resources:
+        for day in range(index.days):
+            day_start = datetime.combine(index.horizon_start + timedelta(days=day), datetime.min.time()) + timedelta(hours=7)
+            booked = 0
+            while booked < open_minutes_per_day * utilization:
+                length = rng.choice([30, 45, 60, 90, 120])
+                start = day_start + timedelta(minutes=rng.randrange(0, open_minutes_per_day - length, 15))
+                index.book([resource_id], start, start + timedelta(minutes=length))
+                booked += length
+                bookings += 1
+    return bookings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark multi-resource availability searches")
+    parser.add_argument("--providers", type=int, default=2000)
+    parser.add_argument("--chairs", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=42)
+    parser.add_argument("--utilization", type=float, default=0.7)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--group-size", type=int, default=20, help="Hygienists per 'any of' group")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    index = AvailabilityIndex(horizon_start=date.today(), days=args.days)
+    providers = [f"provider-{i}" for i in range(args.providers)]
+    chairs = [f"chair-{i}" for i in range(args.chairs)]
+
+    start = time.perf_counter()
+    bookings = populate(index, providers + chairs, args.utilization, rng)
+    build_seconds = time.perf_counter() - start
+    print(f"Indexed {bookings:,} bookings for {len(providers) + len(chairs):,} resources "
+          f"in {build_seconds:.2f}s ({bookings / build_seconds:,.0f} bookings/s)")
+
+    timings = []
+    found = 0
+    for _ in range(args.searches):
+        chair = rng.choice(chairs)
+        hygienists = rng.sample(providers, args.group_size)
+        start = time.perf_counter()
+        options = index.find_first(timedelta(minutes=90), required=[chair], any_of=[hygienists])
+        timings.append(time.perf_counter() - start)
+        found += bool(options)
+
+    timings.sort()
+    print(f"{args.searches} searches ({found} with a result): "
+          f"p50 {statistics.median(timings) * 1000:.3f}ms, "
+          f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.3f}ms, "
+          f"max {timings[-1] * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Coverage sampling overhead benchmark
+
+Drives a minimal ASGI app standing in for `/api/ping` directly (no server,
+no sockets) with and without CoverageSamplingMiddleware and reports the
+added per-request cost. The budget is 20µs per request.
+
+Usage:
+    python -m backend.benchmarks.bench_coverage_sampling --rate 0.01
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+
+from backend.api.middleware.coverage_sampling import CoverageSampler, CoverageSamplingMiddleware
+
+BUDGET_US = 20.0
+
+
+class PingRoute:
+    path = "/api/ping"
+
+
+async def ping_app(scope, receive, send):
+    scope["route"] = PingRoute
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b'{"status":"ok"}'})
+
+
+async def drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/api/ping"}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure coverage sampling overhead per request")
+    parser.add_argument("--rate", type=float, default=0.01)
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        sampler = CoverageSampler(rate=args.rate, output_dir=output_dir)
+        sampled = CoverageSamplingMiddleware(ping_app, sampler)
+
+        baseline_us = asyncio.run(drive(ping_app, args.requests))
+        sampled_us = asyncio.run(drive(sampled, args.requests))
+        always = CoverageSamplingMiddleware(ping_app, CoverageSampler(rate=1.0, output_dir=output_dir))
+        always_us = asyncio.run(drive(always, args.requests))
+
+        totals = sampler.fold()
+
+    overhead = sampled_us - baseline_us
+    print(f"baseline      {baseline_us:.2f}µs/request")
+    print(f"rate={args.rate:<8} {sampled_us:.2f}µs/request (+{overhead:.2f}µs)")
+    print(f"rate=1.0      {always_us:.2f}µs/request (+{always_us - baseline_us:.2f}µs)")
+    print(f"estimated /api/ping requests: {totals.get('GET /api/ping', {}).get('estimated_requests', 0):,.0f} "
+          f"of {args.requests:,}")
+
+    if overhead > BUDGET_US:
+        print(f"FAIL: overhead exceeds {BUDGET_US}µs budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Encrypted field decryption benchmark
+
+Encrypts a synthetic patient roster and times reading it back. The batching
+comparison decrypts the same roster fields every time: row by row with the
+data key unwrapped for every value (no key cache), row by row with the
+data-key cache, and in bulk. Field pruning (decrypting only the fields a
+roster view needs instead of all of them) is reported separately.
+
+Usage:
+    python -m backend.benchmarks.bench_field_decryption --rows 10000 --keys 4
+"""
+
+import argparse
+import random
+import time
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from backend.api.services.field_encryption import DataKeyCache, FieldCipher, InMemoryKeyStore
+
+FIELDS = ["first_name", "last_name", "date_of_birth", "phone", "email", "address", "ssn_last4"]
+ROSTER_FIELDS = ["first_name", "last_name", "date_of_birth"]
+
+
+def build_rows(cipher: FieldCipher, rows: int, keys: int, rng: random.Random):
+    """Encrypt `rows` patients, rotating the data key `keys` times along the way"""
+    encrypted = []
+    rotate_every = max(1, rows // keys)
+    for i in range(rows):
+        if i % rotate_every == 0:
+            cipher.rotate()
+        encrypted.append({"id": i, **{
+            name: cipher.encrypt(f"{name}-{rng.randint(0, 10**9)}") for name in FIELDS
+        }})
+    return encrypted
+
+
+def timed(label: str, fn, rows: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40}{elapsed * 1000:>10.1f}ms{rows / elapsed:>12,.0f} rows/s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark per-row versus bulk field decryption")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--keys", type=int, default=4, help="Distinct data keys across the roster")
+    args = parser.parse_args()
+
+    store = InMemoryKeyStore()
+    master_key = AESGCM.generate_key(bit_length=256)
+    cipher = FieldCipher(store, master_key)
+    rows = build_rows(cipher, args.rows, args.keys, random.Random(42))
+
+    def per_row(field_cipher: FieldCipher, fields):
+        return lambda: [{name: field_cipher.decrypt(row[name]) for name in fields} for row in rows]
+
+    print("Batching (roster fields only)")
+    uncached = FieldCipher(store, master_key, cache=DataKeyCache(ttl=0))
+    baseline = timed("per-row, no key cache", per_row(uncached, ROSTER_FIELDS), args.rows)
+
+    cipher.cache.clear()
+    cached = timed("per-row, key cache", per_row(cipher, ROSTER_FIELDS), args.rows)
+
+    cipher.cache.clear()
+    bulk = timed("bulk", lambda: cipher.decrypt_rows(rows, ROSTER_FIELDS), args.rows)
+
+    print(f"Bulk is {baseline / bulk:.1f}x faster than per-row without the key cache and "
+          f"{cached / bulk:.1f}x faster than per-row with it "
+          f"(cache: {cipher.cache.hits} hits, {cipher.cache.misses} misses)")
+
+    print(f"\nField pruning (bulk, {len(FIELDS)} versus {len(ROSTER_FIELDS)} fields)")
+    all_fields = timed("bulk, all fields", lambda: cipher.decrypt_rows(rows, FIELDS), args.rows)
+    roster = timed("bulk, roster fields", lambda: cipher.decrypt_rows(rows, ROSTER_FIELDS), args.rows)
+    print(f"Decrypting only the roster fields is {all_fields / roster:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Imaging transfer memory benchmark
+
+Streams synthetic uploads of increasing size through the imaging transfer
+helpers and reports peak RSS for each. Each size runs in a fresh process so
+peaks do not carry over. Peak RSS should stay flat as the file size grows.
+
+Usage:
+    python -m backend.benchmarks.bench_imaging_transfer --sizes-mb 16 256 1024
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from backend.api.services.imaging_transfer import CHUNK_SIZE, _write_chunks
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def synthetic_chunks(total_bytes: int):
+    chunk = os.urandom(CHUNK_SIZE)
+    sent = 0
+    while sent < total_bytes:
+        size = min(CHUNK_SIZE, total_bytes - sent)
+        sent += size
+        yield chunk[:size]
+
+
+def run_single(size_mb: int) -> None:
+    baseline = peak_rss_mb()
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        stored = asyncio.run(_write_chunks(
+            synthetic_chunks(size_mb * 1024 * 1024),
+            os.path.join(directory, "volume.dcm"),
+            max_bytes=size_mb * 1024 * 1024
+        ))
+        elapsed = time.perf_counter() - start
+    print(f"{size_mb:>8} {peak_rss_mb():>14.1f} {peak_rss_mb() - baseline:>12.1f} "
+          f"{size_mb / elapsed:>10.1f}  {stored.sha256[:12]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark peak RSS of streaming imaging uploads")
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[16, 128, 512, 1024])
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        run_single(args.single)
+        return
+
+    print(f"{'size MB':>8} {'peak RSS MB':>14} {'delta MB':>12} {'MB/s':>10}  sha256")
+    for size_mb in args.sizes_mb:
+        subprocess.run(
+            [sys.executable, "-m", "backend.benchmarks.bench_imaging_transfer", "--single", str(size_mb)],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
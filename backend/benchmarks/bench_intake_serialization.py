@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Patient intake serialization benchmark
+
+Measures the time it takes to render a patient intake response of a given
+size through the default FastAPI path (jsonable_encoder + JSONResponse)
+versus the fast path used by the patient intake router (ORJSONResponse).
+
+Usage:
+    python -m backend.benchmarks.bench_intake_serialization --sizes 10 100 1000
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+
+def build_intake_payload(num_entries: int) -> Dict[str, Any]:
+    """Build a synthetic intake response with `num_entries` items per JSONB list"""
+    now = datetime.now()
+    conditions = [{
+        "name": f"Condition {i}",
+        "icd_code": f"E{i % 100:02d}.{i % 10}",
+        "is_controlled": i % 2 == 0,
+        "diagnosed_at": now.isoformat(),
+        "dental_considerations": ["Monitor for delayed healing", "Increased risk of infection"]
+    } for i in range(num_entries)]
+    medications = [{
+        "name": f"Medication {i}",
+        "dosage": f"{(i % 20) * 5 + 5}mg",
+        "frequency": "daily",
+        "is_anticoagulant": i % 7 == 0
+    } for i in range(num_entries)]
+
+    return {
+        "id": str(uuid.uuid4()),
+        "patient_id": str(uuid.uuid4()),
+        "personal_info": {
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "date_of_birth": "1980-01-01",
+            "address": {"street": "1 Main St", "city": "Boston", "state": "MA", "zip": "02110"}
+        },
+        "medical_history": {
+            "has_diabetes": True,
+            "conditions": conditions,
+            "medications": medications
+        },
+        "dental_history": {
+            "procedures": [{"code": f"D{1000 + i}", "date": now.isoformat()} for i in range(num_entries)]
+        },
+        "insurance_info": {"provider": "Delta Dental", "member_id": "ABC123"},
+        "emergency_contact": {"name": "John Doe", "phone": "555-0100"},
+        "consent": True,
+        "is_completed": True,
+        "completion_date": now,
+        "created_at": now,
+        "updated_at": now,
+        "version_history": [{
+            "version": v,
+            "created_at": now,
+            "changed_by": "user-1",
+            "comment": "Updated intake form"
+        } for v in range(num_entries, 0, -1)],
+        "has_ai_suggestions": True
+    }
+
+
+def render_default(content: Dict[str, Any]) -> bytes:
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def render_fast(content: Dict[str, Any]) -> bytes:
+    return ORJSONResponse(content=content).body
+
+
+def time_renderer(renderer: Callable[[Dict[str, Any]], bytes], payload: Dict[str, Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        renderer(payload)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark patient intake response serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000],
+                        help="Number of entries per JSONB list in the synthetic payload")
+    parser.add_argument("--repeat", type=int, default=50, help="Iterations per size and renderer")
+    args = parser.parse_args()
+
+    print(f"{'entries':>8} {'bytes':>10} {'default (ms)':>14} {'fast (ms)':>12} {'speedup':>8}")
+    for size in args.sizes:
+        payload = build_intake_payload(size)
+        body_size = len(render_fast(payload))
+
+        default_ms = statistics.median(time_renderer(render_default, payload, args.repeat)) * 1000
+        fast_ms = statistics.median(time_renderer(render_fast, payload, args.repeat)) * 1000
+
+        print(f"{size:>8} {body_size:>10} {default_ms:>14.3f} {fast_ms:>12.3f} {default_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
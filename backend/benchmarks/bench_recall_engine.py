@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Recall engine benchmark
+
+Measures how the whole nightly recall pipeline scales with the number of
+patients, stage by stage:
+
+- build: `build_batch` from row-oriented query results (lists of ids,
+  recall types and dates, as a database driver returns them)
+- compute: `compute_recalls`
+- columns: `recall_columns`, the write-side conversion used by
+  `upsert_recalls`
+- upsert: `upsert_recalls` into ``patient_recall_status``, only with
+  --database-url; the transaction is rolled back
+- rows: `recall_rows` (one dict per row), shown for reference and not
+  part of the pipeline total
+
+Usage:
+    python -m backend.benchmarks.bench_recall_engine --patients 10000 100000 1000000
+    python -m backend.benchmarks.bench_recall_engine --patients 100000 --database-url postgresql://...
+"""
+
+import argparse
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.api.services.recall_engine import (
+    DEFAULT_RECALL_INTERVALS,
+    build_batch,
+    compute_recalls,
+    recall_columns,
+    recall_rows,
+    upsert_recalls
+)
+
+
+def build_synthetic_rows(num_patients: int, seed: int = 42) -> Tuple[List[str], List[str], List[Optional[date]]]:
+    """One row per patient and recall type, with ~2% of rows never seen"""
+    rng = np.random.default_rng(seed)
+    recall_types = list(DEFAULT_RECALL_INTERVALS)
+    rows = num_patients * len(recall_types)
+
+    last_visit = np.datetime64(date.today(), "D") - rng.integers(0, 2000, size=rows).astype("timedelta64[D]")
+    last_visit[rng.random(rows) < 0.02] = np.datetime64("NaT")
+
+    patient_ids = np.repeat(np.arange(num_patients), len(recall_types)).astype(str).tolist()
+    return patient_ids, recall_types * num_patients, last_visit.tolist()
+
+
+def median_time(run: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def time_upsert(database_url: str, batch, result) -> float:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    with Session(create_engine(database_url)) as db:
+        start = time.perf_counter()
+        upsert_recalls(db, batch, result)
+        db.flush()
+        elapsed = time.perf_counter() - start
+        db.rollback()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the batch recall pipeline")
+    parser.add_argument("--patients", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", help="Also time upsert_recalls against this PostgreSQL database")
+    args = parser.parse_args()
+
+    stages = ["build", "compute", "columns"] + (["upsert"] if args.database_url else [])
+    print(f"{'patients':>10} {'rows':>10} " + " ".join(f"{stage + ' (ms)':>14}" for stage in stages)
+          + f" {'total (ms)':>12} {'rows/s':>14} {'rows (ms)':>12}")
+
+    for num_patients in args.patients:
+        patient_ids, recall_types, last_visits = build_synthetic_rows(num_patients)
+        batch = build_batch(patient_ids, recall_types, last_visits)
+        result = compute_recalls(batch, date.today())
+
+        timings: Dict[str, float] = {
+            "build": median_time(lambda: build_batch(patient_ids, recall_types, last_visits), args.repeat),
+            "compute": median_time(lambda: compute_recalls(batch, date.today()), args.repeat),
+            "columns": median_time(lambda: recall_columns(batch, result), args.repeat)
+        }
+        if args.database_url:
+            timings["upsert"] = time_upsert(args.database_url, batch, result)
+        rows_time = median_time(lambda: recall_rows(batch, result), 1)
+
+        total = sum(timings.values())
+        print(f"{num_patients:>10} {len(batch):>10} "
+              + " ".join(f"{timings[stage] * 1000:>14.1f}" for stage in stages)
+              + f" {total * 1000:>12.1f} {len(batch) / total:>14,.0f} {rows_time * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
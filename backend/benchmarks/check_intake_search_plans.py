@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Patient intake search plan check
+
+Runs EXPLAIN on representative intake search queries against a database
+and verifies that each one is served by the indexes created in migration
+a3c7e1f09d42 rather than a sequential scan. Exits non-zero otherwise.
+
+``exists`` filters are not indexable, so they are only checked together
+with an indexed filter, which must still drive the plan.
+
+The database should hold a realistic number of intake forms; on a nearly
+empty table PostgreSQL will correctly prefer a sequential scan.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m backend.benchmarks.check_intake_search_plans
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from backend.api.services.intake_search import (
+    IntakeSearchFilter,
+    IntakeSearchRequest,
+    build_search_query
+)
+
+SAMPLE_SEARCHES = {
+    "diabetes and anticoagulants": IntakeSearchRequest(filters=[
+        IntakeSearchFilter(field="medical_history.has_diabetes", value=True),
+        IntakeSearchFilter(field="medical_history.medications[].is_anticoagulant", value=True)
+    ]),
+    "condition by name": IntakeSearchRequest(filters=[
+        IntakeSearchFilter(field="medical_history.conditions[].name", value="Hypertension")
+    ]),
+    "insurance provider": IntakeSearchRequest(filters=[
+        IntakeSearchFilter(field="insurance_info.provider", op="in", value=["Delta Dental", "Cigna"])
+    ]),
+    "dental history containment": IntakeSearchRequest(filters=[
+        IntakeSearchFilter(field="dental_history.has_dentures", value=True)
+    ]),
+    "exists with indexed filter": IntakeSearchRequest(filters=[
+        IntakeSearchFilter(field="insurance_info.provider", value="Cigna"),
+        IntakeSearchFilter(field="dental_history.last_cleaning_date", op="exists")
+    ]),
+}
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) wrapper that keeps the statement's bind parameters"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def collect_index_names(plan: Dict[str, Any], found: Set[str]) -> Set[str]:
+    """Collect every index referenced anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    if "Index Name" in plan:
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        collect_index_names(child, found)
+    return found
+
+
+def has_seq_scan(plan: Dict[str, Any], table: str) -> bool:
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table:
+        return True
+    return any(has_seq_scan(child, table) for child in plan.get("Plans", []))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verify intake search queries use their indexes")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="PostgreSQL URL")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+
+    engine = create_engine(args.database_url)
+    failures: List[str] = []
+
+    with Session(engine) as db:
+        for name, search_request in SAMPLE_SEARCHES.items():
+            statement = build_search_query(db, search_request).statement
+            row = db.execute(Explain(statement)).scalar()
+            plan = (json.loads(row) if isinstance(row, str) else row)[0]["Plan"]
+
+            indexes = sorted(collect_index_names(plan, set()))
+            ok = bool(indexes) and not has_seq_scan(plan, "patient_intake_forms")
+            print(f"[{'OK' if ok else 'FAIL'}] {name}: {', '.join(indexes) or 'no index used'}")
+            if not ok:
+                failures.append(name)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Patient intake load test and latency regression check
+
+Seeds synthetic patients, intake forms and form versions through the API,
+then drives a weighted mix of intake, medical-profile, alerts and
+AI-suggest requests with a fixed number of concurrent clients. Reports
+throughput and p50/p95/p99 latency per endpoint, optionally saves the
+result as a JSON baseline, and exits non-zero when a p95/p99 latency or
+throughput regression against a saved baseline exceeds the threshold.
+
+By default the app runs in-process (no server or sockets) against the
+PostgreSQL database given by --database-url; authentication dependencies are
+replaced by a fixed benchmark user. httpx's ASGITransport does not send
+lifespan events, so the app's lifespan (including its startup and shutdown
+handlers) is entered explicitly around the run. Point --base-url at a running server
+(with --token) to measure a full deployment instead. The intake tables use
+JSONB and GIN indexes, so the database must be PostgreSQL; a throwaway local
+instance (`initdb` + `pg_ctl start`) is enough.
+
+Usage:
+    python -m backend.benchmarks.load_test --database-url postgresql://localhost/dentamind_bench \\
+        --patients 500 --versions 10 --concurrency 32 --requests 20000 --save-baseline baseline.json
+    python -m backend.benchmarks.load_test --database-url ... --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# Endpoint name -> (method, path template, weight). Any status outside 2xx
+# counts as an error and is left out of the latency figures, so fast 404s or
+# validation errors cannot flatter the percentiles or hide a broken scenario.
+SCENARIOS = {
+    "get_intake": ("GET", "/api/patient-intake/{patient_id}", 35),
+    "get_medical_profile": ("GET", "/api/patient-intake/patient/{patient_id}/medical-profile", 20),
+    "get_alerts": ("GET", "/api/patient-intake/patient/{patient_id}/alerts", 20),
+    "post_ai_suggest": ("POST", "/api/patient-intake/{patient_id}/ai-suggest", 10),
+    "get_ai_suggest": ("GET", "/api/patient-intake/{patient_id}/ai-suggest", 10),
+    "patch_intake": ("PATCH", "/api/patient-intake/{patient_id}", 5),
+}
+
+CONDITIONS = ["Hypertension", "Asthma", "Type 2 diabetes", "Hypothyroidism", "GERD", "Osteoporosis"]
+MEDICATIONS = ["Lisinopril", "Metformin", "Albuterol", "Warfarin", "Levothyroxine", "Alendronate"]
+PROVIDERS = ["Delta Dental", "MetLife", "Cigna", "Aetna", "Guardian"]
+
+
+class BenchmarkUser:
+    """Stands in for the authenticated user; supports attribute and key access"""
+
+    def __init__(self):
+        self.id = "load-test-user"
+        self.email = "load-test@dentamind.local"
+        self.role = "admin"
+        self.is_active = True
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+
+def build_intake(rng: random.Random, index: int) -> Dict[str, Any]:
+    conditions = rng.sample(CONDITIONS, rng.randint(0, 3))
+    medications = rng.sample(MEDICATIONS, rng.randint(0, 3))
+    return {
+        "personal_info": {
+            "first_name": f"Load{index}",
+            "last_name": "Test",
+            "date_of_birth": f"{rng.randint(1940, 2010)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "phone": f"555-{rng.randint(0, 9999):04d}"
+        },
+        "medical_history": {
+            "has_diabetes": "Type 2 diabetes" in conditions,
+            "conditions": [{"name": name, "is_controlled": rng.random() < 0.7} for name in conditions],
+            "medications": [{"name": name, "dosage": f"{rng.choice([5, 10, 20, 50])}mg"} for name in medications]
+        },
+        "dental_history": {"last_visit": f"{rng.randint(2015, 2025)}-01-01", "bleeding_gums": rng.random() < 0.2},
+        "insurance_info": {"provider": rng.choice(PROVIDERS), "member_id": f"M{rng.randint(0, 10**8):08d}"},
+        "emergency_contact": {"name": "Emergency Contact", "phone": "555-0100"},
+        "consent": True,
+        "is_completed": True
+    }
+
+
+def build_patch(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "dental_history": {"bleeding_gums": rng.random() < 0.2, "sensitivity": rng.choice(["none", "cold", "hot"])},
+        "insurance_info": {"member_id": f"M{rng.randint(0, 10**8):08d}"},
+        "version_comment": "Load test update"
+    }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def build_client(args) -> Tuple[httpx.AsyncClient, Any]:
+    """The HTTP client, plus the in-process app (None when targeting a server)"""
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.base_url:
+        return httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=30.0), None
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    from backend.api.auth.dependencies import get_current_active_user, get_current_user
+    from backend.api.main import app
+
+    user = BenchmarkUser()
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://load-test", headers=headers, timeout=30.0), app
+
+
+async def run_bounded(concurrency: int, jobs) -> List[Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            return await job()
+
+    return await asyncio.gather(*(run(job) for job in jobs))
+
+
+async def seed(client: httpx.AsyncClient, args) -> List[str]:
+    """
+    Register patients, submit an intake form each, patch it into `versions`
+    versions and generate one AI suggestion, so every scenario has data.
+    """
+    async def seed_patient(index: int) -> Optional[str]:
+        local_rng = random.Random(args.seed * 1_000_003 + index)
+        intake = build_intake(local_rng, index)
+        response = await client.post("/api/patient-intake/register", json={"patient": {
+            "first_name": intake["personal_info"]["first_name"],
+            "last_name": intake["personal_info"]["last_name"],
+            "date_of_birth": intake["personal_info"]["date_of_birth"],
+            "email": f"load{index}@dentamind.local",
+            "phone": intake["personal_info"]["phone"]
+        }})
+        if response.status_code != 201:
+            print(f"Seeding patient {index} failed: {response.status_code} {response.text[:200]}", file=sys.stderr)
+            return None
+        patient_id = response.json()["id"]
+
+        response = await client.post(f"/api/patient-intake/{patient_id}", json=intake)
+        if response.status_code != 201:
+            print(f"Seeding intake for {patient_id} failed: {response.status_code}", file=sys.stderr)
+            return None
+        for _ in range(args.versions - 1):
+            await client.patch(f"/api/patient-intake/{patient_id}", json=build_patch(local_rng))
+        response = await client.post(f"/api/patient-intake/{patient_id}/ai-suggest",
+                                     json={"current_form_data": intake})
+        if response.status_code >= 300:
+            print(f"Seeding AI suggestion for {patient_id} failed: {response.status_code}", file=sys.stderr)
+            return None
+        return patient_id
+
+    start = time.perf_counter()
+    patient_ids = await run_bounded(args.concurrency, [lambda i=i: seed_patient(i) for i in range(args.patients)])
+    patient_ids = [patient_id for patient_id in patient_ids if patient_id]
+    print(f"Seeded {len(patient_ids)} patients with {args.versions} intake versions each "
+          f"in {time.perf_counter() - start:.1f}s")
+    return patient_ids
+
+
+async def drive(client: httpx.AsyncClient, args, patient_ids: List[str], rng: random.Random) -> Dict[str, Any]:
+    names = list(SCENARIOS)
+    weights = [SCENARIOS[name][2] for name in names]
+    # Requests and payloads are fixed up front so runs with the same seed are comparable
+    plan: List[Tuple[str, str, Dict[str, Any]]] = []
+    for name in rng.choices(names, weights=weights, k=args.requests):
+        kwargs = {}
+        if name == "post_ai_suggest":
+            kwargs["json"] = {"current_form_data": build_intake(rng, 0)}
+        elif name == "patch_intake":
+            kwargs["json"] = build_patch(rng)
+        plan.append((name, rng.choice(patient_ids), kwargs))
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    error_statuses: Dict[str, Dict[str, int]] = {name: {} for name in names}
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    async def worker() -> None:
+        while True:
+            try:
+                name, patient_id, kwargs = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            method, template, _ = SCENARIOS[name]
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, template.format(patient_id=patient_id), **kwargs)
+                outcome = None if 200 <= response.status_code < 300 else str(response.status_code)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if outcome is None:
+                latencies[name].append(elapsed)
+            else:
+                errors[name] += 1
+                error_statuses[name][outcome] = error_statuses[name].get(outcome, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for name in names:
+        values = sorted(latencies[name])
+        endpoints[name] = {
+            "requests": len(values) + errors[name],
+            "errors": errors[name],
+            "error_statuses": error_statuses[name],
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000
+        }
+    all_values = sorted(value for values in latencies.values() for value in values)
+    return {
+        "created_at": datetime.now().isoformat(),
+        "config": {
+            "patients": args.patients, "versions": args.versions, "concurrency": args.concurrency,
+            "requests": args.requests, "seed": args.seed, "target": args.base_url or "in-process"
+        },
+        "elapsed_s": elapsed,
+        "throughput_rps": len(all_values) / elapsed if elapsed else 0.0,
+        "overall": {
+            "requests": len(all_values) + sum(errors.values()),
+            "errors": sum(errors.values()),
+            "p50_ms": percentile(all_values, 0.50) * 1000,
+            "p95_ms": percentile(all_values, 0.95) * 1000,
+            "p99_ms": percentile(all_values, 0.99) * 1000
+        },
+        "endpoints": endpoints
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n{'endpoint':<22}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in list(result["endpoints"].items()) + [("overall", result["overall"])]:
+        print(f"{name:<22}{stats['requests']:>10}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+        if stats.get("error_statuses"):
+            print(f"{'':<22}errors by status: {stats['error_statuses']}")
+    print(f"\nThroughput: {result['throughput_rps']:.1f} successful req/s over {result['elapsed_s']:.1f}s")
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return a description of every metric that regressed by more than `threshold`"""
+    regressions = []
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - threshold):
+        regressions.append(f"throughput {baseline['throughput_rps']:.1f} -> {result['throughput_rps']:.1f} req/s")
+
+    pairs = [("overall", result["overall"], baseline["overall"])]
+    pairs += [(name, stats, baseline["endpoints"].get(name)) for name, stats in result["endpoints"].items()]
+    for name, current, previous in pairs:
+        if not previous or not previous["requests"]:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{name} {metric} {previous[metric]:.2f} -> {current[metric]:.2f}")
+    return regressions
+
+
+async def main_async(args) -> int:
+    rng = random.Random(args.seed)
+    client, app = build_client(args)
+    async with AsyncExitStack() as stack:
+        if app is not None:
+            # Run startup/shutdown as a server would; ASGITransport does not
+            await stack.enter_async_context(app.router.lifespan_context(app))
+        await stack.enter_async_context(client)
+        patient_ids = await seed(client, args)
+        if not patient_ids:
+            print("No patients were seeded; aborting", file=sys.stderr)
+            return 2
+        if args.warmup:
+            warmup_args = argparse.Namespace(**{**vars(args), "requests": args.warmup})
+            await drive(client, warmup_args, patient_ids, random.Random(args.seed + 1))
+        result = await drive(client, args, patient_ids, rng)
+
+    print_report(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"\nFAIL: regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+
+    return 1 if result["overall"]["errors"] and args.fail_on_errors else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the patient intake API and check for latency regressions")
+    parser.add_argument("--database-url", help="PostgreSQL URL for the in-process app (sets DATABASE_URL)")
+    parser.add_argument("--base-url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--token", help="Bearer token sent with every request")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--versions", type=int, default=5, help="Intake form versions per patient")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests before the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", help="Write the result to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--fail-on-errors", action="store_true", help="Exit non-zero if any request failed (non-2xx status or transport error)")
+    args = parser.parse_args()
+
+    if not args.base_url and not args.database_url and "DATABASE_URL" not in os.environ:
+        parser.error("--database-url (or DATABASE_URL) is required for the in-process app")
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
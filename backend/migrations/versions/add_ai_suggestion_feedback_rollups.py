@@ -0,0 +1,38 @@
+"""add ai suggestion feedback rollups
+
+Revision ID: d5f2a9c3e1b4
+Revises: c41e8b2d7f90
+Create Date: 2025-06-09 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f2a9c3e1b4'
+down_revision: Union[str, None] = 'c41e8b2d7f90'  # add seed manifests table
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Feedback totals per model version, suggestion key and confidence bin.
+    # Existing feedback is loaded with: python -m backend.api.services.ai_feedback_rollups
+    op.create_table(
+        'ai_suggestion_feedback_rollups',
+        sa.Column('ai_model_version', sa.String(), nullable=False),
+        sa.Column('suggestion_key', sa.String(), nullable=False),
+        sa.Column('confidence_bin', sa.Integer(), nullable=False),
+        sa.Column('presented_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('accepted_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('confidence_sum', sa.Float(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('ai_model_version', 'suggestion_key', 'confidence_bin')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ai_suggestion_feedback_rollups')
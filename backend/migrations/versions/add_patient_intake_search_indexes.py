@@ -0,0 +1,77 @@
+"""add patient intake search indexes
+
+Revision ID: a3c7e1f09d42
+Revises: f5e3d9a71b3c
+Create Date: 2025-06-02 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c7e1f09d42'
+down_revision: Union[str, None] = 'f5e3d9a71b3c'  # add patient intake tables
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# GIN indexes serving JSONB containment (@>) queries on each searchable section
+GIN_INDEXES = [
+    ('ix_patient_intake_forms_medical_history_gin', 'medical_history'),
+    ('ix_patient_intake_forms_dental_history_gin', 'dental_history'),
+    ('ix_patient_intake_forms_insurance_info_gin', 'insurance_info'),
+]
+
+# Btree expression indexes for the most frequently searched keys
+EXPRESSION_INDEXES = [
+    ('ix_patient_intake_forms_has_diabetes', "(medical_history ->> 'has_diabetes')"),
+    ('ix_patient_intake_forms_insurance_provider', "(insurance_info ->> 'provider')"),
+    ('ix_patient_intake_forms_insurance_member_id', "(insurance_info ->> 'member_id')"),
+]
+
+
+def upgrade() -> None:
+    # Build indexes concurrently so existing intake tables stay writable
+    with op.get_context().autocommit_block():
+        for index_name, column in GIN_INDEXES:
+            op.create_index(
+                index_name,
+                'patient_intake_forms',
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'jsonb_path_ops'},
+                postgresql_concurrently=True
+            )
+
+        for index_name, expression in EXPRESSION_INDEXES:
+            op.create_index(
+                index_name,
+                'patient_intake_forms',
+                [sa.text(expression)],
+                unique=False,
+                postgresql_concurrently=True
+            )
+
+        # Keyset pagination over search results orders by (created_at, id)
+        op.create_index(
+            'ix_patient_intake_forms_created_at_id',
+            'patient_intake_forms',
+            ['created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_patient_intake_forms_created_at_id', table_name='patient_intake_forms', postgresql_concurrently=True)
+
+        for index_name, _ in reversed(EXPRESSION_INDEXES):
+            op.drop_index(index_name, table_name='patient_intake_forms', postgresql_concurrently=True)
+
+        for index_name, _ in reversed(GIN_INDEXES):
+            op.drop_index(index_name, table_name='patient_intake_forms', postgresql_concurrently=True)
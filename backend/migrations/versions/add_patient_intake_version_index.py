@@ -0,0 +1,38 @@
+"""add patient intake version index
+
+Revision ID: b8d2f4a61c07
+Revises: a3c7e1f09d42
+Create Date: 2025-06-04 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d2f4a61c07'
+down_revision: Union[str, None] = 'a3c7e1f09d42'  # add patient intake search indexes
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves version history pages (WHERE intake_form_id = ? AND version_num < ? ORDER BY version_num DESC)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_patient_intake_versioning_form_version',
+            'patient_intake_versioning',
+            ['intake_form_id', 'version_num'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_patient_intake_versioning_form_version',
+            table_name='patient_intake_versioning',
+            postgresql_concurrently=True
+        )
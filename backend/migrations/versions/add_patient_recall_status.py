@@ -0,0 +1,38 @@
+"""add patient recall status
+
+Revision ID: f2c9d7e3b5a1
+Revises: e8b1c6d4a2f7
+Create Date: 2025-06-13 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c9d7e3b5a1'
+down_revision: Union[str, None] = 'e8b1c6d4a2f7'  # add scheduled notifications queue
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nightly recall results, bulk upserted by services/recall_engine.py
+    op.create_table(
+        'patient_recall_status',
+        sa.Column('patient_id', sa.String(), nullable=False),
+        sa.Column('recall_type', sa.String(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=True),
+        sa.Column('days_overdue', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('patient_id', 'recall_type')
+    )
+    op.create_index('ix_patient_recall_status_status', 'patient_recall_status', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_patient_recall_status_status', table_name='patient_recall_status')
+    op.drop_table('patient_recall_status')
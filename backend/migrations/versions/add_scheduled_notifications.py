@@ -0,0 +1,59 @@
+"""add scheduled notifications queue
+
+Revision ID: e8b1c6d4a2f7
+Revises: d5f2a9c3e1b4
+Create Date: 2025-06-12 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b1c6d4a2f7'
+down_revision: Union[str, None] = 'd5f2a9c3e1b4'  # add ai suggestion feedback rollups
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Due-time queue of notifications, claimed by dispatchers with SKIP LOCKED
+    op.create_table(
+        'scheduled_notifications',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('dedupe_key', sa.String(), nullable=True),
+        sa.Column('patient_id', sa.String(), nullable=True),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('template', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('due_at', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(), server_default='pending', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('claimed_by', sa.String(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dedupe_key')
+    )
+    op.create_index('ix_scheduled_notifications_patient_id', 'scheduled_notifications', ['patient_id'])
+    # Partial indexes keep claiming proportional to the pending rows, not the sent history
+    op.create_index(
+        'ix_scheduled_notifications_due', 'scheduled_notifications', ['due_at'],
+        postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index(
+        'ix_scheduled_notifications_claimed', 'scheduled_notifications', ['claimed_at'],
+        postgresql_where=sa.text("status = 'claimed'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scheduled_notifications_claimed', table_name='scheduled_notifications')
+    op.drop_index('ix_scheduled_notifications_due', table_name='scheduled_notifications')
+    op.drop_index('ix_scheduled_notifications_patient_id', table_name='scheduled_notifications')
+    op.drop_table('scheduled_notifications')
@@ -0,0 +1,34 @@
+"""add seed manifests table
+
+Revision ID: c41e8b2d7f90
+Revises: b8d2f4a61c07
+Create Date: 2025-06-06 11:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8b2d7f90'
+down_revision: Union[str, None] = 'b8d2f4a61c07'  # add patient intake version index
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tracks the content hash of each applied seed data set
+    op.create_table(
+        'seed_manifests',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('version', sa.String(), nullable=False),
+        sa.Column('content_hash', sa.String(), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('seed_manifests')
@@ -0,0 +1,93 @@
+from datetime import date, datetime, time, timedelta
+
+from backend.api.services.availability_index import AvailabilityIndex
+
+# A Monday, so the default closed weekday (Sunday) does not interfere
+DAY = date(2024, 1, 8)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(DAY.year, DAY.month, DAY.day, hour, minute)
+
+
+def make_index() -> AvailabilityIndex:
+    return AvailabilityIndex(horizon_start=DAY, days=1)
+
+
+def test_cancel_keeps_slot_shared_with_adjacent_booking():
+    index = make_index()
+    index.book(["chair1"], at(9), at(9, 20))
+    index.book(["chair1"], at(9, 20), at(9, 45))
+    index.cancel(["chair1"], at(9), at(9, 20))
+
+    options = index.find_first(timedelta(minutes=30), required=["chair1"], not_before=at(9))
+    assert options[0]["start"] == at(9, 45)
+
+
+def test_cancel_keeps_overlapping_booking_and_block():
+    index = make_index()
+    index.book(["chair1"], at(9), at(10))
+    index.block("chair1", at(9, 30), at(10, 30))
+    index.book(["chair1"], at(9), at(10))
+    index.cancel(["chair1"], at(9), at(10))
+
+    # One of the two identical bookings remains
+    options = index.find_first(timedelta(minutes=30), required=["chair1"], not_before=at(9))
+    assert options[0]["start"] == at(10, 30)
+
+    index.cancel(["chair1"], at(9), at(10))
+    options = index.find_first(timedelta(minutes=30), required=["chair1"], not_before=at(9))
+    assert options[0]["start"] == at(9)
+    assert index.find_first(timedelta(minutes=30), required=["chair1"], not_before=at(9, 30))[0]["start"] == at(10, 30)
+
+
+def test_cancel_of_unknown_range_changes_nothing():
+    index = make_index()
+    index.book(["chair1"], at(9), at(10))
+    index.cancel(["chair1"], at(9), at(9, 30))
+
+    options = index.find_first(timedelta(minutes=15), required=["chair1"], not_before=at(9))
+    assert options[0]["start"] == at(10)
+
+
+def test_not_after_bounds_the_end_of_the_slot():
+    index = make_index()
+    options = index.find_first(
+        timedelta(minutes=60), required=["chair1"], not_before=at(9), not_after=at(10), limit=10
+    )
+    assert [option["start"] for option in options] == [at(9)]
+    assert options[0]["end"] == at(10)
+
+    assert index.find_first(timedelta(minutes=60), required=["chair1"], not_before=at(9, 15), not_after=at(10)) == []
+
+
+def test_advance_to_keeps_bookings_cancellable():
+    index = AvailabilityIndex(horizon_start=DAY, days=3)
+    tomorrow = at(9) + timedelta(days=1)
+    index.book(["chair1"], tomorrow, tomorrow + timedelta(minutes=20))
+    index.book(["chair1"], tomorrow + timedelta(minutes=20), tomorrow + timedelta(minutes=45))
+    index.advance_to(DAY + timedelta(days=1))
+    index.cancel(["chair1"], tomorrow, tomorrow + timedelta(minutes=20))
+
+    options = index.find_first(timedelta(minutes=30), required=["chair1"], not_before=tomorrow)
+    assert options[0]["start"] == tomorrow + timedelta(minutes=45)
+
+
+def test_not_before_inside_slot_starts_at_next_slot():
+    index = make_index()
+    options = index.find_first(timedelta(minutes=30), required=["chair1"], not_before=at(9, 5))
+    assert options[0]["start"] == at(9, 15)
+
+
+def test_advance_loads_bookings_on_added_days():
+    next_day = DAY + timedelta(days=1)
+    bookings = [(["chair1"], datetime.combine(next_day, time(7)), datetime.combine(next_day, time(8)))]
+
+    def load_bookings(start, end):
+        return [booking for booking in bookings if booking[1] < end and booking[2] > start]
+
+    index = AvailabilityIndex(horizon_start=DAY, days=1, load_bookings=load_bookings)
+    index.advance_to(next_day)
+
+    options = index.find_first(timedelta(minutes=30), required=["chair1"])
+    assert options[0]["start"] == datetime.combine(next_day, time(8))
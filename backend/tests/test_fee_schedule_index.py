@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from backend.api.services.fee_schedule_index import (
+    CoverageRule,
+    FeeScheduleIndex,
+    FeeScheduleSnapshot,
+    PlanLine
+)
+
+
+def make_index(fees) -> FeeScheduleIndex:
+    index = FeeScheduleIndex(loader=None)
+    index.snapshot = FeeScheduleSnapshot(
+        version="1",
+        fees=fees,
+        coverage={("ppo", "gold", "basic"): CoverageRule(coinsurance=Decimal("0.8"), deductible_applies=False)}
+    )
+    return index
+
+
+def test_in_network_patient_portion_uses_allowed_amount():
+    index = make_index({
+        ("D2391", None, None, None): Decimal("200"),
+        ("D2391", "ppo", "gold", None): Decimal("150"),
+    })
+    line = index.price_plan([PlanLine("D2391")], "ppo", "gold", None)["lines"][0]
+
+    assert line["fee"] == Decimal("200")
+    assert line["allowed"] == Decimal("150.00")
+    assert line["insurance_portion"] == Decimal("120.00")
+    assert line["patient_portion"] == Decimal("30.00")
+
+
+def test_out_of_network_patient_portion_uses_office_fee():
+    index = make_index({("D2391", None, None, None): Decimal("200")})
+    line = index.price_plan([PlanLine("D2391", quantity=2)], "ppo", "gold", None)["lines"][0]
+
+    assert line["insurance_portion"] == Decimal("320.00")
+    assert line["patient_portion"] == Decimal("80.00")
@@ -0,0 +1,54 @@
+"""
+Change detection for intake merge patches. These run against PostgreSQL
+(TEST_DATABASE_URL) in a transaction that is rolled back; the form table is
+a temporary table shadowing patient_intake_forms.
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from backend.api.services.intake_merge_patch import changed_paths  # noqa: E402
+
+FORM_ID = "form-1"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    with Session(engine) as session:
+        session.execute(text("""
+            CREATE TEMP TABLE patient_intake_forms (
+                id text PRIMARY KEY, patient_id text, personal_info jsonb NOT NULL,
+                medical_history jsonb, dental_history jsonb, insurance_info jsonb, emergency_contact jsonb,
+                consent boolean NOT NULL, is_completed boolean NOT NULL
+            ) ON COMMIT DROP
+        """))
+        session.execute(text("""
+            INSERT INTO patient_intake_forms (id, personal_info, medical_history, consent, is_completed)
+            VALUES (:id, '{"name": "A"}', '{"allergies": "none", "has_diabetes": false}', true, false)
+        """), {"id": FORM_ID})
+        yield session
+        session.rollback()
+
+
+def test_repeated_flag_values_are_not_changes(db):
+    assert changed_paths(db, FORM_ID, {}, {"consent": True, "is_completed": False}) == []
+    assert changed_paths(db, FORM_ID, {}, {"consent": True, "is_completed": True}) == ["is_completed"]
+
+
+def test_nested_null_under_non_object_parent_is_a_change(db):
+    # "allergies" is a string, so the patch replaces it with {} before removing "peanut"
+    patch = {"medical_history": {"allergies": {"peanut": None}}}
+    assert changed_paths(db, FORM_ID, patch) == ["medical_history.allergies.peanut"]
+
+
+def test_nested_null_of_absent_key_under_object_is_not_a_change(db):
+    assert changed_paths(db, FORM_ID, {"medical_history": {"medications": None}}) == []
@@ -0,0 +1,35 @@
+import warnings
+from datetime import date
+
+import numpy as np
+import pytest
+
+from backend.api.services.perio_arrays import PerioChart, PerioHistory, staging_inputs, trends
+
+EXAM = date(2024, 3, 1)
+
+
+def test_rejects_tooth_outside_range():
+    with pytest.raises(ValueError, match="outside 1-32"):
+        PerioChart.from_nested(EXAM, {"0": {"sites": {"MB": {"probing_depth": 3}}}})
+
+
+def test_rejects_unknown_site():
+    with pytest.raises(ValueError, match="Unknown site 'XX'"):
+        PerioChart.from_nested(EXAM, {"3": {"sites": {"XX": {"probing_depth": 3}}}})
+
+
+def test_missing_teeth_do_not_warn():
+    chart = PerioChart.from_nested(EXAM, {
+        "1": {"missing": True},
+        "3": {"sites": {"MB": {"probing_depth": 5, "bleeding": True}}}
+    })
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        inputs = staging_inputs(chart)
+        series = trends(PerioHistory.from_charts([chart]))
+
+    assert inputs["affected_teeth"] == 1
+    assert inputs["sites_pd_ge_5"] == 1
+    assert series["mean_pd"] == [5.0]
+    assert not np.isnan(series["mean_cal"][0])